@@ -0,0 +1,164 @@
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from pending_items import normalize_key_value
+
+# Colunas pelas quais os contadores podem ser filtrados (usuário, campanha, dimensão, capacidade)
+GROUP_COLUMNS = ('usuario', 'sistema', 'ano', 'dimensao', 'capacidade_chave')
+
+# Respostas contadas no resumo das validações
+SUMMARY_FIELDS = (
+    'adequacao_realidade_brasileira', 'grau_relevancia', 'tem_norma_exigente', 'tem_base_dados_publica',
+)
+
+
+def _encode(series, normalize):
+    """Códigos inteiros da coluna e os valores distintos (normalizados)"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return codes.astype(np.int64), [normalize(value) for value in uniques]
+
+
+def _field_value(value):
+    """Valor de resposta como texto (NaN/None viram 'nan', como no astype(str) do pandas)"""
+    if value is None:
+        return 'nan'
+    try:
+        if pd.isna(value):
+            return 'nan'
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def summary_from_counts(total, counts, columns):
+    """Monta o dicionário do resumo a partir dos contadores por resposta
+
+    Contadores cujas colunas não existem nas avaliações ficam ausentes do resultado.
+    """
+    summary = {'total': total}
+
+    if 'adequacao_realidade_brasileira' in columns:
+        adequacao = counts.get('adequacao_realidade_brasileira', Counter())
+        for chave, valor in (('adequados', 'Sim'), ('em_partes', 'Em partes'), ('nao_adequados', 'Não')):
+            summary[chave] = adequacao.get(valor, 0)
+
+    if 'grau_relevancia' in columns:
+        relevancia = counts.get('grau_relevancia', Counter())
+        summary['alta_relevancia'] = sum(n for nivel, n in relevancia.items() if '5' in nivel)
+        summary['relevancia_counts'] = {
+            nivel: n for nivel, n in sorted(relevancia.items())
+            if n and nivel.strip() not in ('', 'nan')
+        }
+
+    for coluna, com, sem in (('tem_norma_exigente', 'com_norma', 'sem_norma'),
+                             ('tem_base_dados_publica', 'com_base', 'sem_base')):
+        if coluna in columns:
+            respostas = counts.get(coluna, Counter())
+            summary[com] = respostas.get('Sim', 0)
+            summary[sem] = respostas.get('Não', 0)
+
+    return summary
+
+
+class ValidationAggregates:
+    """Contadores do resumo das validações para qualquer recorte (usuário, campanha, dimensão, capacidade)
+
+    Os contadores são calculados em uma única passada agrupada: cada coluna é
+    codificada como inteiro, as combinações viram uma chave única e np.unique
+    conta todas de uma vez. Avaliações novas são somadas com add(), sem recalcular.
+    """
+
+    def __init__(self, validations_df, group_columns=GROUP_COLUMNS, fields=SUMMARY_FIELDS):
+        self.group_columns = tuple(group_columns)
+        self.fields = tuple(fields)
+        self.columns = set(validations_df.columns)
+        self._lock = threading.Lock()
+        # (valores das colunas de grupo) → (total, {campo: Counter})
+        self._groups = {}
+        self._queries = {}
+        self._count(validations_df)
+
+    def _count(self, df):
+        if df.empty:
+            return
+        group_columns = [c for c in self.group_columns if c in df.columns]
+        fields = [f for f in self.fields if f in df.columns]
+        encoded = [_encode(df[c], normalize_key_value) for c in group_columns]
+        encoded += [_encode(df[f], _field_value) for f in fields]
+
+        radices = [max(len(uniques), 1) for _, uniques in encoded]
+        if np.prod(radices, dtype=float) < 2 ** 62:
+            # Chave única em base mista: uma única contagem para todas as combinações
+            key = np.zeros(len(df), dtype=np.int64)
+            for (codes, _), radix in zip(encoded, radices):
+                key = key * radix + codes
+            keys, counts = np.unique(key, return_counts=True)
+            combos = np.empty((len(keys), len(encoded)), dtype=np.int64)
+            for i in range(len(encoded) - 1, -1, -1):
+                keys, combos[:, i] = np.divmod(keys, radices[i])
+        else:
+            combos, counts = np.unique(np.column_stack([codes for codes, _ in encoded]), axis=0, return_counts=True)
+
+        n_groups = len(group_columns)
+        positions = [group_columns.index(c) if c in group_columns else None for c in self.group_columns]
+        for combo, count in zip(combos.tolist(), counts.tolist()):
+            values = [uniques[code] for code, (_, uniques) in zip(combo, encoded)]
+            group = tuple(values[i] if i is not None else '' for i in positions)
+            self._add_counts(group, dict(zip(fields, values[n_groups:])), count)
+
+    def _add_counts(self, group, answers, count):
+        total, counters = self._groups.get(group, (0, None))
+        if counters is None:
+            counters = {field: Counter() for field in self.fields}
+        for field, value in answers.items():
+            counters[field][value] += count
+        self._groups[group] = (total + count, counters)
+
+    def add(self, record):
+        """Soma uma avaliação recém-gravada aos contadores (e às consultas já calculadas)"""
+        group = tuple(normalize_key_value(record.get(c)) for c in self.group_columns)
+        answers = {f: _field_value(record.get(f)) for f in self.fields if f in record}
+        with self._lock:
+            self.columns.update(record.keys())
+            self._add_counts(group, answers, 1)
+            for filters, (total, counters) in self._queries.items():
+                if self._matches(group, filters):
+                    for field, value in answers.items():
+                        counters[field][value] += 1
+                    self._queries[filters] = (total + 1, counters)
+
+    def _matches(self, group, filters):
+        return all(group[i] == value for i, value in filters)
+
+    def counts(self, **filters):
+        """(total, {campo: Counter}) do recorte; filtros por coluna de grupo (ex.: usuario='ana', ano=2025)"""
+        unknown = set(filters) - set(self.group_columns)
+        if unknown:
+            raise ValueError(f"Colunas de agrupamento desconhecidas: {sorted(unknown)}")
+        key = tuple(sorted(
+            (self.group_columns.index(column), normalize_key_value(value))
+            for column, value in filters.items() if value is not None
+        ))
+        with self._lock:
+            cached = self._queries.get(key)
+            if cached is None:
+                total = 0
+                counters = {field: Counter() for field in self.fields}
+                for group, (group_total, group_counters) in self._groups.items():
+                    if self._matches(group, key):
+                        total += group_total
+                        for field, counter in group_counters.items():
+                            counters[field].update(counter)
+                cached = self._queries[key] = (total, counters)
+            total, counters = cached
+            return total, {field: Counter(counter) for field, counter in counters.items()}
+
+    def summary(self, **filters):
+        """Resumo (mesmo formato de summarize_validations) do recorte informado"""
+        total, counts = self.counts(**filters)
+        with self._lock:
+            columns = set(self.columns)
+        return summary_from_counts(total, counts, columns)
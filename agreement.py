@@ -0,0 +1,310 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from pending_items import build_validation_keys, normalize_key_value, record_key, validation_key_spec
+
+# Uma escala de avaliação: coluna na planilha, categorias em ordem e nível de medida
+# (nominal, ordinal ou interval, como no alfa de Krippendorff)
+RatingScale = namedtuple('RatingScale', ['name', 'column', 'categories', 'level', 'label'])
+
+RELEVANCIA = RatingScale('relevancia', 'grau_relevancia', ('1', '2', '3', '4', '5'), 'ordinal', "Grau de relevância")
+ADEQUACAO = RatingScale('adequacao', 'adequacao_realidade_brasileira', ('Não', 'Em partes', 'Sim'), 'nominal',
+                        "Adequação à realidade brasileira")
+
+SCALES = (RELEVANCIA, ADEQUACAO)
+
+# Atributos guardados por item (os de GROUP_COLUMNS servem de filtro e agrupamento)
+GROUP_COLUMNS = ('sistema', 'ano', 'dimensao', 'capacidade_chave')
+UNIT_COLUMNS = ('numero_questao',) + GROUP_COLUMNS
+
+# Itens com mais discordância listados por padrão
+DEFAULT_TOP_ITEMS = 10
+
+
+def scale_value(scale, value):
+    """Categoria (posição em ``scale.categories``) de uma resposta; -1 se vazia ou desconhecida"""
+    text = normalize_key_value(value)
+    if scale.level != 'nominal':
+        # "5 - Alta relevância" → "5"
+        text = text.split(' ', 1)[0]
+    try:
+        return scale.categories.index(text)
+    except ValueError:
+        return -1
+
+
+def _scale_codes(scale, series):
+    """Categorias de uma coluna inteira (a conversão é feita só nos valores distintos)"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapping = np.array([scale_value(scale, value) for value in uniques] + [-1], dtype=np.int64)
+    return mapping[codes]
+
+
+def coincidence_matrix(counts):
+    """Matriz de coincidências de Krippendorff a partir das contagens item × categoria
+
+    Só entram itens com duas ou mais avaliações; cada par de avaliações de um
+    item com ``m`` avaliações pesa 1 / (m - 1).
+    """
+    counts = np.asarray(counts, dtype=float)
+    m = counts.sum(axis=1)
+    pairable = m >= 2
+    n = counts[pairable]
+    weighted = n / (m[pairable] - 1)[:, None]
+    return weighted.T @ n - np.diag(weighted.sum(axis=0))
+
+
+def distance_matrix(level, marginals):
+    """Diferenças ao quadrado entre categorias (δ²) para o nível de medida"""
+    size = len(marginals)
+    c, k = np.meshgrid(np.arange(size), np.arange(size), indexing='ij')
+    if level == 'nominal':
+        return (c != k).astype(float)
+    if level == 'interval':
+        return (c - k).astype(float) ** 2
+    if level == 'ordinal':
+        # Distância pela massa de avaliações entre as duas categorias
+        cumulative = np.concatenate([[0.0], np.cumsum(marginals)])
+        low, high = np.minimum(c, k), np.maximum(c, k)
+        between = cumulative[high + 1] - cumulative[low]
+        return (between - (marginals[c] + marginals[k]) / 2) ** 2
+    raise ValueError(f"Nível de medida desconhecido: {level}")
+
+
+def krippendorff_alpha(counts, level='nominal'):
+    """Alfa de Krippendorff (NaN sem pares de avaliações ou sem variação entre as respostas)"""
+    coincidences = coincidence_matrix(counts)
+    marginals = coincidences.sum(axis=1)
+    total = marginals.sum()
+    if total <= 1:
+        return float('nan')
+    delta = distance_matrix(level, marginals)
+    expected = (np.outer(marginals, marginals) * delta).sum()
+    if expected == 0:
+        return float('nan')
+    return float(1 - (total - 1) * (coincidences * delta).sum() / expected)
+
+
+def fleiss_kappa(counts):
+    """Kappa de Fleiss, na forma que aceita quantidades diferentes de avaliadores por item"""
+    counts = np.asarray(counts, dtype=float)
+    m = counts.sum(axis=1)
+    pairable = m >= 2
+    if not pairable.any():
+        return float('nan')
+    n, m = counts[pairable], m[pairable]
+    observed = (((n ** 2).sum(axis=1) - m) / (m * (m - 1))).mean()
+    shares = n.sum(axis=0) / m.sum()
+    expected = (shares ** 2).sum()
+    if expected >= 1:
+        return float('nan')
+    return float((observed - expected) / (1 - expected))
+
+
+class AgreementAnalytics:
+    """Concordância entre avaliadores (alfa de Krippendorff, kappa de Fleiss e dispersão por item)
+
+    As avaliações formam a matriz esparsa item × avaliador de cada escala, guardada
+    como pares (item, avaliador) → categoria; vale a última resposta de cada
+    avaliador por item. Os índices só dependem das contagens item × categoria,
+    mantidas em arrays NumPy: uma avaliação nova (add) ajusta uma linha, e as
+    consultas são recalculadas de forma vetorizada e guardadas até a próxima
+    gravação.
+    """
+
+    def __init__(self, validations_df, scales=SCALES):
+        self.scales = tuple(scales)
+        self.key_spec = validation_key_spec(validations_df.columns)
+        self._lock = threading.Lock()
+        self._units = {}
+        self._attributes = {column: [] for column in UNIT_COLUMNS}
+        # Colunas de grupo também como códigos inteiros (valor → código), para filtrar e agrupar em NumPy
+        self._group_codes = {column: {} for column in GROUP_COLUMNS}
+        self._unit_groups = {column: [] for column in GROUP_COLUMNS}
+        self._ratings = {}
+        self._counts = {scale.name: np.zeros((0, len(scale.categories)), dtype=np.int64) for scale in self.scales}
+        self._size = 0
+        self._queries = {}
+        self._arrays = {}
+        self.version = 0
+        if not validations_df.empty and 'usuario' in validations_df.columns:
+            self._count(validations_df)
+
+    # --- Contagens ---------------------------------------------------------
+
+    def _count(self, df):
+        keys = build_validation_keys(df, self.key_spec)
+        unit_codes, unit_keys = pd.factorize(pd.Series(keys, dtype=object))
+        coders = df['usuario'].map(normalize_key_value).to_numpy(dtype=object)
+        codes = [
+            _scale_codes(scale, df[scale.column]) if scale.column in df.columns else np.full(len(df), -1)
+            for scale in self.scales
+        ]
+
+        # Atributos do item: os da primeira avaliação
+        _, first_rows = np.unique(unit_codes, return_index=True)
+        for column in UNIT_COLUMNS:
+            values = df[column].iloc[first_rows] if column in df.columns else pd.Series([''] * len(first_rows))
+            self._attributes[column] = [normalize_key_value(value) for value in values.tolist()]
+        for column in GROUP_COLUMNS:
+            codes_by_value = self._group_codes[column]
+            self._unit_groups[column] = [
+                codes_by_value.setdefault(value, len(codes_by_value)) for value in self._attributes[column]
+            ]
+        self._units = {key: unit for unit, key in enumerate(unit_keys.tolist())}
+        self._grow(len(unit_keys))
+
+        # Última resposta de cada avaliador por item
+        latest = ~pd.DataFrame({'unit': unit_codes, 'coder': coders}).duplicated(keep='last').to_numpy()
+        units = unit_codes[latest]
+        self._ratings = dict(zip(zip(units.tolist(), coders[latest].tolist()),
+                                 zip(*(scale_codes[latest].tolist() for scale_codes in codes))))
+        for scale, scale_codes in zip(self.scales, codes):
+            scale_codes = scale_codes[latest]
+            answered = scale_codes >= 0
+            np.add.at(self._counts[scale.name], (units[answered], scale_codes[answered]), 1)
+
+    def _grow(self, size):
+        """Garante espaço para ``size`` itens nos arrays de contagem (capacidade dobrada)"""
+        capacity = len(next(iter(self._counts.values()))) if self._counts else 0
+        if size > capacity:
+            capacity = max(size, 2 * capacity, 16)
+            for name, counts in self._counts.items():
+                grown = np.zeros((capacity, counts.shape[1]), dtype=np.int64)
+                grown[:len(counts)] = counts
+                self._counts[name] = grown
+        self._size = max(self._size, size)
+
+    def add(self, record):
+        """Inclui uma avaliação recém-gravada (substitui a resposta anterior do avaliador ao item)"""
+        key = record_key(record, self.key_spec)
+        coder = normalize_key_value(record.get('usuario'))
+        codes = tuple(scale_value(scale, record.get(scale.column)) for scale in self.scales)
+        with self._lock:
+            unit = self._units.get(key)
+            if unit is None:
+                unit = self._units[key] = len(self._units)
+                for column in UNIT_COLUMNS:
+                    self._attributes[column].append(normalize_key_value(record.get(column)))
+                for column in GROUP_COLUMNS:
+                    codes_by_value = self._group_codes[column]
+                    value = self._attributes[column][unit]
+                    self._unit_groups[column].append(codes_by_value.setdefault(value, len(codes_by_value)))
+                self._grow(unit + 1)
+            previous = self._ratings.get((unit, coder))
+            self._ratings[(unit, coder)] = codes
+            for i, scale in enumerate(self.scales):
+                counts = self._counts[scale.name]
+                if previous is not None and previous[i] >= 0:
+                    counts[unit, previous[i]] -= 1
+                if codes[i] >= 0:
+                    counts[unit, codes[i]] += 1
+            self.version += 1
+            self._queries = {}
+
+    # --- Consultas ---------------------------------------------------------
+
+    def _scale(self, name):
+        for scale in self.scales:
+            if scale.name == name:
+                return scale
+        raise ValueError(f"Escala desconhecida: {name}")
+
+    def _cached(self, query, compute):
+        with self._lock:
+            result = self._queries.get(query)
+            if result is None:
+                result = self._queries[query] = compute()
+            return result
+
+    def _mask(self, filters):
+        """Itens que atendem aos filtros (colunas de GROUP_COLUMNS)"""
+        unknown = set(filters) - set(GROUP_COLUMNS)
+        if unknown:
+            raise ValueError(f"Colunas de agrupamento desconhecidas: {sorted(unknown)}")
+        mask = np.ones(self._size, dtype=bool)
+        for column, value in filters.items():
+            if value is not None:
+                mask &= self._group_array(column) == self._group_codes[column].get(normalize_key_value(value), -1)
+        return mask
+
+    def _group_array(self, column):
+        """Códigos da coluna de grupo de todos os itens (array refeito só quando entram itens novos)"""
+        array = self._arrays.get(column)
+        if array is None or len(array) != self._size:
+            array = self._arrays[column] = np.array(self._unit_groups[column], dtype=np.int64)
+        return array
+
+    def _metrics(self, scale, counts):
+        answered = counts.sum(axis=1)
+        return {
+            'alpha': krippendorff_alpha(counts, scale.level),
+            'kappa': fleiss_kappa(counts),
+            'itens': int(np.count_nonzero(answered)),
+            'itens_pareaveis': int(np.count_nonzero(answered >= 2)),
+            'avaliacoes': int(answered.sum()),
+        }
+
+    def summary(self, scale, **filters):
+        """Alfa, kappa e contagens da escala para o recorte (ex.: sistema='Chile', dimensao='...')"""
+        scale = self._scale(scale)
+
+        def compute():
+            counts = self._counts[scale.name][:self._size]
+            return self._metrics(scale, counts[self._mask(filters)])
+
+        return self._cached(('summary', scale.name, tuple(sorted(filters.items()))), compute)
+
+    def breakdown(self, scale, by='dimensao', **filters):
+        """Índices por valor de ``by`` (dimensão ou capacidade chave), um DataFrame por recorte"""
+        scale = self._scale(scale)
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Coluna de agrupamento desconhecida: {by}")
+
+        def compute():
+            counts = self._counts[scale.name][:self._size]
+            mask = self._mask(filters)
+            codes = self._group_array(by)[mask]
+            selected = counts[mask]
+            labels = {code: value for value, code in self._group_codes[by].items()}
+            rows = [dict({by: labels[code]}, **self._metrics(scale, selected[codes == code]))
+                    for code in np.unique(codes).tolist()]
+            df = pd.DataFrame(rows, columns=[by, 'alpha', 'kappa', 'itens', 'itens_pareaveis', 'avaliacoes'])
+            return df.sort_values(by, kind='stable').reset_index(drop=True)
+
+        return self._cached(('breakdown', scale.name, by, tuple(sorted(filters.items()))), compute)
+
+    def item_dispersion(self, scale, top=DEFAULT_TOP_ITEMS, **filters):
+        """Itens com duas ou mais avaliações, do mais ao menos discordante
+
+        ``discordancia`` é 1 - fração da resposta mais comum (0 = unanimidade); nas
+        escalas ordinais e intervalares há também média e desvio padrão das notas.
+        """
+        scale = self._scale(scale)
+
+        def compute():
+            counts = self._counts[scale.name][:self._size]
+            answered = counts.sum(axis=1)
+            selected = np.flatnonzero(self._mask(filters) & (answered >= 2))
+            n = counts[selected].astype(float)
+            m = answered[selected].astype(float)
+            columns = {'avaliacoes': m.astype(np.int64), 'discordancia': 1 - n.max(axis=1, initial=0) / m}
+            if scale.level != 'nominal':
+                values = np.arange(1, len(scale.categories) + 1, dtype=float)
+                columns['media'] = n @ values / m
+                columns['desvio'] = np.sqrt(np.maximum(n @ values ** 2 / m - columns['media'] ** 2, 0))
+            # Ordenação nos arrays (a última chave do lexsort é a principal); só os ``top`` viram DataFrame
+            sort_keys = [columns['avaliacoes'], columns['discordancia']]
+            if 'desvio' in columns:
+                sort_keys.append(columns['desvio'])
+            order = np.lexsort([-key for key in sort_keys])[:top or None]
+            df = pd.DataFrame({column: [self._attributes[column][unit] for unit in selected[order].tolist()]
+                               for column in UNIT_COLUMNS})
+            for column, values in columns.items():
+                df[column] = values[order]
+            return df
+
+        return self._cached(('dispersion', scale.name, top, tuple(sorted(filters.items()))), compute)
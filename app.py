@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
 import json
 import os
 from pathlib import Path
+from pending_items import LEGACY_KEY, build_validation_index, compute_pending_items
+from sheets_client import SheetsClientPool
 
 # Configuração da página
 st.set_page_config(
@@ -42,9 +42,18 @@ def load_data():
         st.error(f"Erro ao carregar dados: {e}")
         return None, None
 
+# Pool de clientes compartilhado por todas as sessões do processo
+@st.cache_resource
+def get_client_pool():
+    """Retorna o pool de clientes do Google Sheets do processo"""
+    return SheetsClientPool(SCOPES)
+
 # Função para conectar ao Google Sheets
 def connect_to_sheets():
     """Conecta ao Google Sheets usando credenciais"""
+    # Pilha de autenticação do Google carregada só na primeira conexão
+    from google.oauth2.service_account import Credentials
+
     try:
         # Verificar se existe arquivo de credenciais
         creds_file = Path("credentials.json")
@@ -52,11 +61,11 @@ def connect_to_sheets():
             st.error("Arquivo credentials.json não encontrado. Por favor, configure as credenciais do Google Sheets.")
             return None
         
-        creds = Credentials.from_service_account_file(
-            "credentials.json", 
-            scopes=SCOPES
+        # Cliente autorizado uma única vez e reaproveitado entre reruns
+        client = get_client_pool().get_client(
+            f"credentials.json:{creds_file.stat().st_mtime}",
+            lambda scopes: Credentials.from_service_account_file("credentials.json", scopes=scopes)
         )
-        client = gspread.authorize(creds)
         return client
     except Exception as e:
         st.error(f"Erro ao conectar ao Google Sheets: {e}")
@@ -65,6 +74,8 @@ def connect_to_sheets():
 # Função para testar conexão com Google Sheets
 def test_google_sheets_connection():
     """Testa a conexão com o Google Sheets e retorna informações sobre o status"""
+    import gspread
+
     result = {
         'connected': False,
         'message': '',
@@ -196,6 +207,7 @@ def save_validation_to_sheets(validation_data):
         return True
         
     except Exception as e:
+        get_client_pool().report_error(client, e)
         st.error(f"Erro ao salvar no Google Sheets: {e}")
         return False
 
@@ -215,6 +227,7 @@ def load_existing_validations():
         return pd.DataFrame(data)
         
     except Exception as e:
+        get_client_pool().report_error(client, e)
         st.warning(f"Não foi possível carregar validações existentes: {e}")
         return pd.DataFrame()
 
@@ -362,12 +375,9 @@ def main():
     if 'current_item_index' not in st.session_state:
         st.session_state['current_item_index'] = 0
     
-    # Encontrar próximo item não validado
-    items_nao_validados = []
-    for idx, row in df_filtrado.iterrows():
-        existing = check_existing_validation(validations_df, row)
-        if existing is None:
-            items_nao_validados.append(idx)
+    # Encontrar itens não validados (índice de chaves construído uma vez por snapshot)
+    validation_index = build_validation_index(validations_df, usuario, key_specs=(LEGACY_KEY,))
+    items_nao_validados = compute_pending_items(df_filtrado, validation_index)
     
     if not items_nao_validados:
         st.success("🎉 Todos os itens foram validados!")
@@ -0,0 +1,310 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from pending_items import (NUMBER_KEY, TEXT_KEY, ValidationIndex, build_validation_keys, normalize_key_value,
+                           pending_positions, record_key, validation_key_spec)
+
+# Avaliações (de avaliadores distintos) desejadas por item; 0 desativa a distribuição
+DEFAULT_TARGET_REVIEWS = 3
+
+# Tempo (segundos) que um item fica reservado para o avaliador que o recebeu
+DEFAULT_LEASE_SECONDS = 600
+
+# Seleções (campanha + filtros) com fila de prioridade mantida ao mesmo tempo
+MAX_SELECTIONS = 16
+
+
+class ReviewCounts:
+    """Avaliadores distintos de cada item, por chave de item, a partir das avaliações
+
+    Calculado uma vez por snapshot e atualizado com add() a cada gravação. As
+    chaves alteradas ficam em ``changes``, na ordem de chegada, para que o
+    ReviewScheduler atualize suas filas sem recontar tudo.
+    """
+
+    def __init__(self, validations_df, key_specs=(NUMBER_KEY, TEXT_KEY)):
+        # Primeira especificação cujas colunas existem (a aplicação sempre grava numero_questao)
+        self.key_spec = validation_key_spec(validations_df.columns, key_specs)
+        self.reviewers = {}
+        self.by_user = {}
+        self.changes = []
+        if not validations_df.empty and 'usuario' in validations_df.columns:
+            keys = build_validation_keys(validations_df, self.key_spec)
+            users = validations_df['usuario'].map(normalize_key_value).tolist()
+            for key, usuario in zip(keys, users):
+                self._add(key, usuario)
+
+    def _add(self, key, usuario):
+        self.reviewers.setdefault(key, set()).add(usuario)
+        self.by_user.setdefault(usuario, set()).add(key)
+
+    def add(self, record):
+        """Conta uma avaliação recém-gravada"""
+        key = record_key(record, self.key_spec)
+        self._add(key, normalize_key_value(record.get('usuario')))
+        self.changes.append(key)
+
+    def count(self, key):
+        return len(self.reviewers.get(key, ()))
+
+    def reviewed(self, usuario, key):
+        return usuario in self.reviewers.get(key, ())
+
+    def user_keys(self, usuario):
+        """Chaves dos itens já avaliados pelo usuário"""
+        return self.by_user.get(normalize_key_value(usuario), set())
+
+
+class _SelectionHeap:
+    """Fila de prioridade dos itens de uma seleção: entradas (avaliações, ordem, posição)"""
+
+    def __init__(self, row_ids, counts):
+        self.order = {position: order for order, position in enumerate(row_ids.tolist())}
+        self.entries = [(int(counts[position]), order, position) for position, order in self.order.items()]
+        heapq.heapify(self.entries)
+
+
+class ReviewScheduler:
+    """Distribui os itens entre os avaliadores, priorizando os mais distantes da meta
+
+    Compartilhado por todas as sessões do processo. Cada seleção (campanha e
+    filtros) tem um heap de (avaliações, ordem na seleção, posição no catálogo);
+    quando uma avaliação chega, o item ganha uma entrada nova com a contagem
+    atualizada e a antiga é descartada ao sair do heap (remoção preguiçosa).
+    Quem recebe um item fica com uma reserva de ``lease_seconds``: enquanto ela
+    vale, o item só é entregue a outro avaliador se não houver alternativa.
+    """
+
+    def __init__(self, item_keys, target=DEFAULT_TARGET_REVIEWS, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 clock=time.monotonic):
+        # item_keys(key_spec) → chaves dos itens na ordem do catálogo (SharedCatalog.item_keys)
+        self._item_keys = item_keys
+        self.target = target
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._review_counts = None
+        self._cursor = 0
+        self._keys = None
+        self._positions = {}
+        self._counts = None
+        self._heaps = OrderedDict()
+        self._leases = {}
+        self._held = {}
+        self.version = 0
+
+    # --- Contagens ---------------------------------------------------------
+
+    def sync(self, review_counts):
+        """Aplica as avaliações novas de ``review_counts`` (recontando tudo se o snapshot foi recarregado)"""
+        with self._lock:
+            if review_counts is not self._review_counts:
+                self._rebuild(review_counts)
+                return
+            changes = review_counts.changes[self._cursor:]
+            self._cursor += len(changes)
+            for key in changes:
+                count = review_counts.count(key)
+                for position in self._positions.get(key, ()):
+                    if self._counts[position] == count:
+                        continue
+                    self._counts[position] = count
+                    for heap in self._heaps.values():
+                        order = heap.order.get(position)
+                        if order is not None:
+                            heapq.heappush(heap.entries, (count, order, position))
+            if changes:
+                self.version += 1
+
+    def _rebuild(self, review_counts):
+        keys = self._item_keys(review_counts.key_spec)
+        self._keys = keys if keys is not None else np.empty(0, dtype=object)
+        keys = self._keys.tolist()
+        self._positions = {}
+        for position, key in enumerate(keys):
+            self._positions.setdefault(key, []).append(position)
+        self._counts = np.fromiter(map(review_counts.count, keys), dtype=np.int64, count=len(keys))
+        self._review_counts = review_counts
+        self._cursor = len(review_counts.changes)
+        self._heaps.clear()
+        self.version += 1
+
+    def count(self, position):
+        """Avaliações (de avaliadores distintos) do item"""
+        with self._lock:
+            return int(self._counts[position]) if self._counts is not None else 0
+
+    def covered(self, row_ids):
+        """Quantos itens da seleção já atingiram a meta de avaliações"""
+        with self._lock:
+            if self._counts is None or not len(row_ids):
+                return 0
+            return int(np.count_nonzero(self._counts[np.asarray(row_ids, dtype=np.intp)] >= self.target))
+
+    def pending(self, usuario, row_ids):
+        """Posições dentre ``row_ids`` ainda não avaliadas pelo usuário"""
+        with self._lock:
+            review_counts = self._review_counts
+            keys = self._keys
+        if review_counts is None:
+            return np.asarray(row_ids, dtype=np.intp)
+        index = ValidationIndex(review_counts.key_spec, review_counts.user_keys(usuario))
+        return pending_positions(keys, row_ids, index)
+
+    # --- Distribuição ------------------------------------------------------
+
+    def _heap(self, selection, row_ids):
+        heap = self._heaps.get(selection)
+        if heap is None:
+            heap = self._heaps[selection] = _SelectionHeap(np.asarray(row_ids, dtype=np.intp), self._counts)
+            if len(self._heaps) > MAX_SELECTIONS:
+                self._heaps.popitem(last=False)
+        else:
+            self._heaps.move_to_end(selection)
+        return heap
+
+    def _leased_by_other(self, position, usuario, now):
+        lease = self._leases.get(position)
+        return lease is not None and lease[0] != usuario and lease[1] > now
+
+    def _grant(self, usuario, position, now):
+        previous = self._held.get(usuario)
+        if previous is not None and previous != position and self._leases.get(previous, (None,))[0] == usuario:
+            del self._leases[previous]
+        self._leases[position] = (usuario, now + self.lease_seconds)
+        self._held[usuario] = position
+        return position
+
+    def assign(self, usuario, selection, row_ids, exclude=()):
+        """Item (posição no catálogo) para o avaliador, ou None se ele não tiver pendentes
+
+        Enquanto a reserva do item atual valer, devolve o mesmo item (renovando a
+        reserva). Senão, entrega o item da seleção com menos avaliações que o
+        avaliador ainda não avaliou, não está em ``exclude`` (itens pulados) e
+        não está reservado para outro avaliador.
+        """
+        usuario = normalize_key_value(usuario)
+        with self._lock:
+            if self._review_counts is None:
+                return None
+            now = self._clock()
+            heap = self._heap(selection, row_ids)
+            review_counts = self._review_counts
+
+            held = self._held.get(usuario)
+            if (held is not None and held in heap.order and held not in exclude
+                    and not review_counts.reviewed(usuario, self._keys[held])
+                    and not self._leased_by_other(held, usuario, now)):
+                return self._grant(usuario, held, now)
+
+            chosen = fallback = None
+            popped = []
+            while heap.entries:
+                entry = heapq.heappop(heap.entries)
+                count, _, position = entry
+                if count != self._counts[position]:
+                    continue  # contagem antiga: já existe uma entrada mais nova
+                popped.append(entry)
+                if position in exclude or review_counts.reviewed(usuario, self._keys[position]):
+                    continue
+                if self._leased_by_other(position, usuario, now):
+                    # Reservado: só é entregue se todos os demais também estiverem
+                    if fallback is None:
+                        fallback = position
+                    continue
+                chosen = position
+                break
+            for entry in popped:
+                heapq.heappush(heap.entries, entry)
+
+            if chosen is None:
+                chosen = fallback
+            if chosen is None:
+                return None
+            return self._grant(usuario, chosen, now)
+
+    def release(self, usuario):
+        """Libera a reserva do avaliador (ao salvar ou pular o item)"""
+        usuario = normalize_key_value(usuario)
+        with self._lock:
+            position = self._held.pop(usuario, None)
+            if position is not None and self._leases.get(position, (None,))[0] == usuario:
+                del self._leases[position]
+
+    def status(self):
+        """Informações de diagnóstico (reservas ativas e seleções em memória)"""
+        with self._lock:
+            now = self._clock()
+            return {
+                'target': self.target,
+                'leases': sum(1 for _, expires in self._leases.values() if expires > now),
+                'selections': len(self._heaps),
+                'version': self.version,
+            }
+
+
+class AssignmentQueue:
+    """Fila do avaliador sobre o ReviewScheduler compartilhado (mesma interface de WorkQueue)
+
+    O item atual é pedido ao distribuidor a cada leitura, o que renova a reserva;
+    pular libera a reserva e guarda o item na lista de pulados da sessão, que é
+    esvaziada quando só restarem itens pulados.
+    """
+
+    def __init__(self, scheduler, usuario, selection, row_ids, key, load_item):
+        self.scheduler = scheduler
+        self.usuario = usuario
+        self.selection = selection
+        self.row_ids = np.asarray(row_ids, dtype=np.intp)
+        self.key = key
+        self._load_item = load_item
+        self._skipped = set()
+        self._pending = None
+        self._pending_version = None
+
+    def __len__(self):
+        if self._pending_version != self.scheduler.version:
+            self._pending = len(self.scheduler.pending(self.usuario, self.row_ids))
+            self._pending_version = self.scheduler.version
+        return self._pending
+
+    def is_current(self, key, version=None):
+        """True se a fila ainda vale para esta seleção (as contagens vêm do distribuidor)"""
+        return self.key == key
+
+    def current(self):
+        """Posição do item atribuído ao avaliador (None se não houver pendentes)"""
+        position = self.scheduler.assign(self.usuario, self.selection, self.row_ids, self._skipped)
+        if position is None and self._skipped:
+            self._skipped.clear()
+            position = self.scheduler.assign(self.usuario, self.selection, self.row_ids)
+        return position
+
+    def item(self, item_id):
+        return self._load_item(item_id)
+
+    def current_item(self):
+        position = self.current()
+        return None if position is None else self.item(position)
+
+    def review_count(self, item_id):
+        """Avaliações já feitas do item (para exibir junto da meta)"""
+        return self.scheduler.count(item_id)
+
+    def prefetch(self):
+        """Nada a preparar: o próximo item só é escolhido quando o atual termina"""
+
+    def skip(self):
+        """Pula o item atual, que só volta depois dos demais pendentes"""
+        position = self.current()
+        if position is not None:
+            self._skipped.add(position)
+        self.scheduler.release(self.usuario)
+
+    def pop(self, version=None):
+        """Libera a reserva do item avaliado; a contagem chega pelo snapshot (sync)"""
+        self.scheduler.release(self.usuario)
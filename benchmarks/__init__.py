@@ -0,0 +1 @@
+"""Benchmarks dos caminhos críticos da aplicação de validação"""
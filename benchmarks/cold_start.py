@@ -0,0 +1,284 @@
+"""Benchmark de partida a frio: importações e tempo até o primeiro elemento na tela
+
+Uso (a partir da raiz do repositório):
+
+    python -m benchmarks.cold_start                       # compara com o orçamento gravado
+    python -m benchmarks.cold_start --repeat 5 --output partida.json
+    python -m benchmarks.cold_start --update-baseline     # regrava o orçamento
+
+Cada repetição é um processo novo (``python -X importtime``), em um diretório
+temporário com uma cópia de data/ (sem o catálogo compilado, como em um deploy
+novo). O Streamlit e o AppTest são importados antes da medição; a partir daí o
+processo executa streamlit_app.py uma vez e registra:
+
+- ``first_render_s``: do início da execução até o primeiro elemento enviado
+  (importar a aplicação e seus módulos, ler secrets, desenhar o título);
+- ``first_run_s``: a primeira execução completa (catálogo carregado, índices
+  montados, conexão com o Sheets substituído pelo FakeClient);
+- ``import_s``: soma do ``-X importtime`` de tudo importado pela aplicação,
+  com a quebra por pacote no relatório.
+
+Os módulos de LAZY_MODULES (gspread e a autenticação do Google) não podem
+estar carregados quando o primeiro elemento é enviado. O processo termina com
+código 1 se isso acontecer ou se algum tempo passar do orçamento além da
+tolerância.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = REPO_ROOT / "streamlit_app.py"
+
+DEFAULT_REPEAT = 3
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "cold_start.json"
+
+# Mesma regra do hot_paths: regressão se o menor tempo passar de orçamento * (1 + tolerância)
+# e a diferença absoluta passar do piso (partida a frio oscila dezenas de ms entre processos)
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_MIN_DELTA = 0.1
+
+# Dependências de armazenamento/autenticação importadas só quando usadas (o toml não entra:
+# o próprio Streamlit o carrega ao ler config.toml e secrets.toml)
+LAZY_MODULES = ('gspread', 'google.oauth2', 'google.auth.transport.requests', 'google_auth_oauthlib')
+
+# Linha em stderr que separa as importações do framework das da aplicação
+MARKER = "### cold_start: aplicação ###"
+
+# Pacotes listados individualmente na quebra das importações (o resto entra em "outros")
+TOP_PACKAGES = 12
+
+SHEET_ID = "cold-start-sheet"
+
+# Tempo máximo da primeira execução (inclui compilar o catálogo)
+RUN_TIMEOUT = 120
+
+
+def app_module_names():
+    """Módulos da aplicação (arquivos .py na raiz do repositório)"""
+    return {path.stem for path in REPO_ROOT.glob("*.py")}
+
+
+def parse_importtime(stderr):
+    """Soma o tempo próprio (segundos) de cada pacote importado depois do MARKER"""
+    app_modules = app_module_names()
+    by_package = defaultdict(float)
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabeçalho "self [us] | cumulative | imported package"
+        package = fields[2].strip().split(".")[0]
+        if package in app_modules:
+            package = 'app'
+        by_package[package] += int(fields[0]) / 1e6
+    return dict(by_package)
+
+
+def summarize(values):
+    return {
+        'median_s': statistics.median(values),
+        'min_s': min(values),
+        'max_s': max(values),
+        'repeat': len(values),
+    }
+
+
+def run_worker():
+    """Modo interno: uma partida a frio; JSON na saída padrão"""
+    import logging
+    from unittest import mock
+
+    import streamlit.logger
+    streamlit.logger.set_log_level(logging.ERROR)
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+
+    workdir = tempfile.mkdtemp()
+    data_dir = Path(workdir) / "data"
+    data_dir.mkdir()
+    for csv_path in (REPO_ROOT / "data").glob("*.csv"):
+        shutil.copy(csv_path, data_dir / csv_path.name)
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=RUN_TIMEOUT)
+    at.secrets['google_sheets'] = {'google_sheets_id': SHEET_ID}
+    at.secrets['gcp_service_account'] = {'type': 'service_account', 'client_email': 'cold-start@example.invalid'}
+
+    first_render = {}
+    patches = []
+    enqueue = ScriptRunContext.enqueue
+
+    def on_first_render():
+        first_render['lazy_loaded'] = [name for name in LAZY_MODULES if name in sys.modules]
+        # Só depois do primeiro elemento o Sheets é substituído (importar o gspread aqui não conta)
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        from benchmarks.fake_sheets import FakeClient, FakeCredentials
+
+        client = FakeClient()
+        client.add_spreadsheet(SHEET_ID)
+        patches.extend([
+            mock.patch.object(gspread, 'authorize', lambda credentials, *args, **kwargs: client),
+            mock.patch.object(Credentials, 'from_service_account_info', lambda *args, **kwargs: FakeCredentials()),
+        ])
+        for patch in patches:
+            patch.start()
+
+    def timed_enqueue(self, msg):
+        if 'elapsed_s' not in first_render and msg.HasField('delta'):
+            first_render['elapsed_s'] = time.perf_counter() - start
+            on_first_render()
+        return enqueue(self, msg)
+
+    print(MARKER, file=sys.stderr, flush=True)
+    try:
+        with mock.patch.object(ScriptRunContext, 'enqueue', timed_enqueue):
+            start = time.perf_counter()
+            at.run()
+            first_run = time.perf_counter() - start
+    finally:
+        for patch in patches:
+            patch.stop()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({
+        'first_render_s': first_render.get('elapsed_s'),
+        'first_run_s': first_run,
+        'lazy_loaded': first_render.get('lazy_loaded', []),
+        'errors': [exception.message for exception in at.exception],
+    }))
+    return 0
+
+
+def run_once():
+    """Uma partida a frio em um processo novo; devolve as métricas e a quebra das importações"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'benchmarks.cold_start', '--worker'],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"partida a frio falhou:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(completed.stderr)
+    return result
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Compara os resultados com o orçamento; retorna a lista de regressões"""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        current, expected = stats['min_s'], reference['min_s']
+        if current > expected * (1 + tolerance) and current - expected > min_delta:
+            regressions.append({
+                'case': name,
+                'baseline_s': expected,
+                'current_s': current,
+                'ratio': current / expected if expected else float('inf'),
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--output', help="arquivo JSON com os resultados")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="grava os resultados como novo orçamento em vez de comparar")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker()
+
+    # A primeira partida aquece o cache de arquivos do sistema operacional e é descartada
+    run_once()
+    runs = [run_once() for _ in range(args.repeat)]
+
+    errors = sorted({error for run in runs for error in run['errors']})
+    lazy_loaded = sorted({name for run in runs for name in run['lazy_loaded']})
+    results = {
+        'first_render_s': summarize([run['first_render_s'] for run in runs]),
+        'first_run_s': summarize([run['first_run_s'] for run in runs]),
+        'import_s': summarize([sum(run['imports'].values()) for run in runs]),
+    }
+    packages = {package for run in runs for package in run['imports']}
+    imports = {package: statistics.median(run['imports'].get(package, 0.0) for run in runs) for package in packages}
+    ranked = sorted(imports.items(), key=lambda item: item[1], reverse=True)
+    breakdown = dict(ranked[:TOP_PACKAGES])
+    breakdown['outros'] = sum(seconds for _, seconds in ranked[TOP_PACKAGES:])
+
+    for name, stats in results.items():
+        print(f"{name:<28} {stats['median_s'] * 1000:10.1f} ms")
+    print("importações (tempo próprio, mediana):")
+    for package, seconds in breakdown.items():
+        print(f"  {package:<26} {seconds * 1000:10.1f} ms")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+        'imports': breakdown,
+    }
+
+    if errors:
+        for error in errors:
+            print(f"ERRO na execução: {error}")
+        return 1
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        if lazy_loaded:
+            print(f"Orçamento não gravado: {', '.join(lazy_loaded)} carregado(s) antes do primeiro elemento")
+            return 1
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Orçamento gravado em {baseline_path}")
+        return 0
+
+    regressions = []
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))['results']
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    report['regressions'] = regressions
+    report['lazy_loaded'] = lazy_loaded
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    for r in regressions:
+        print(f"REGRESSÃO {r['case']:<28} {r['baseline_s'] * 1000:.1f} ms → "
+              f"{r['current_s'] * 1000:.1f} ms ({r['ratio']:.1f}x)")
+    for name in lazy_loaded:
+        print(f"REGRESSÃO {name} importado antes do primeiro elemento (deveria ser carregado sob demanda)")
+    return 1 if regressions or lazy_loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""Substituto em memória da API do gspread (Client / Spreadsheet / Worksheet)
+
+Implementa apenas as chamadas usadas pela aplicação e contabiliza o número de
+chamadas e o volume de dados trafegado, para medir os caminhos de leitura e
+gravação sem acesso à rede. Cada chamada passa por ``http_client.request``
+(FakeHTTPClient), que pode simular latência e erros de cota (429) e é o ponto
+interceptado pelo agendador de cotas e pela instrumentação, como no gspread real.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+import requests
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, numericise_all
+
+API_ROOT = "https://sheets.googleapis.com/v4/spreadsheets"
+
+
+def _payload_size(rows):
+    return sum(len(str(v)) for row in rows for v in row)
+
+
+def _trim(rows):
+    """Remove células e linhas vazias à direita/abaixo, como a API do Sheets"""
+    trimmed = []
+    for row in rows:
+        row = [str(v) for v in row]
+        while row and row[-1] == "":
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+def quota_error(retry_after=None):
+    """APIError 429 (RESOURCE_EXHAUSTED) como o devolvido pela API ao estourar a cota"""
+    response = requests.Response()
+    response.status_code = 429
+    response._content = json.dumps({'error': {
+        'code': 429,
+        'message': "Quota exceeded for quota metric 'Read requests' (simulado)",
+        'status': 'RESOURCE_EXHAUSTED',
+    }}).encode()
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return APIError(response)
+
+
+class FakeHTTPClient:
+    """Camada HTTP simulada: latência por requisição e erros de cota com a probabilidade indicada"""
+
+    def __init__(self, latency=0.0, quota_error_rate=0.0, seed=None):
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.quota_errors = 0
+
+    def request(self, method, endpoint, params=None, **kwargs):
+        with self._lock:
+            self.requests[method.upper()] += 1
+            failed = self.quota_error_rate > 0 and self._rng.random() < self.quota_error_rate
+            if failed:
+                self.quota_errors += 1
+            # Latência com variação de ±50% em torno da média
+            delay = self.latency * self._rng.uniform(0.5, 1.5) if self.latency else 0
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise quota_error()
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'total_requests': sum(self.requests.values()),
+                'quota_errors': self.quota_errors,
+            }
+
+
+class FakeCredentials:
+    """Credenciais que nunca expiram (o pool não tenta renová-las)"""
+
+    expiry = None
+    token = "fake-token"
+    valid = True
+
+    def refresh(self, request):
+        pass
+
+
+class CallStats:
+    """Contadores de chamadas e bytes (compartilhados por cliente)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def record(self, method, read=0, written=0):
+        with self._lock:
+            self.calls[method] += 1
+            self.bytes_read += read
+            self.bytes_written += written
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'total_calls': sum(self.calls.values()),
+                'bytes_read': self.bytes_read,
+                'bytes_written': self.bytes_written,
+            }
+
+
+class FakeWorksheet:
+    """Worksheet em memória"""
+
+    def __init__(self, title, rows=None, stats=None, cols=26, http_client=None, spreadsheet_id="fake-sheet"):
+        self.title = title
+        self.id = abs(hash(title)) % 10 ** 6
+        self.spreadsheet_id = spreadsheet_id
+        self._rows = [list(map(str, row)) for row in (rows or [])]
+        self._cols = cols
+        self._lock = threading.Lock()
+        self.stats = stats or CallStats()
+        self.http_client = http_client or FakeHTTPClient()
+
+    def _request(self, method, action, a1_range=None):
+        # Mesmo formato de endpoint do gspread (a instrumentação extrai a operação dele)
+        target = f"{self.title}!{a1_range}" if a1_range else self.title
+        self.http_client.request(method, f"{API_ROOT}/{self.spreadsheet_id}/values/{target}{action}")
+
+    def __len__(self):
+        # Linhas gravadas, sem contar como chamada à API (uso dos benchmarks)
+        with self._lock:
+            return len(self._rows)
+
+    def column_snapshot(self, header):
+        """Valores de uma coluna (pelo cabeçalho), sem contar como chamada à API (uso dos benchmarks)"""
+        with self._lock:
+            if not self._rows or header not in self._rows[0]:
+                return []
+            col = self._rows[0].index(header)
+            return [row[col] if col < len(row) else '' for row in self._rows[1:]]
+
+    @property
+    def row_count(self):
+        return max(1000, len(self._rows))
+
+    @property
+    def col_count(self):
+        return self._cols
+
+    def _slice(self, a1_range):
+        grid = a1_range_to_grid_range(a1_range)
+        start_row = grid.get('startRowIndex', 0)
+        end_row = grid.get('endRowIndex', len(self._rows))
+        start_col = grid.get('startColumnIndex', 0)
+        end_col = grid.get('endColumnIndex')
+        return _trim([row[start_col:end_col] for row in self._rows[start_row:end_row]])
+
+    # --- Leitura ------------------------------------------------------------
+
+    def get_all_values(self, *args, **kwargs):
+        self._request('get', '')
+        with self._lock:
+            values = _trim(self._rows)
+        self.stats.record('get_all_values', read=_payload_size(values))
+        return values
+
+    def get_values(self, a1_range=None, *args, **kwargs):
+        self._request('get', '', a1_range)
+        with self._lock:
+            values = _trim(self._rows) if a1_range is None else self._slice(a1_range)
+        self.stats.record('get_values', read=_payload_size(values))
+        return values
+
+    def get(self, range_name=None, *args, **kwargs):
+        self._request('get', '', range_name)
+        with self._lock:
+            values = _trim(self._rows) if range_name is None else self._slice(range_name)
+        self.stats.record('get', read=_payload_size(values))
+        return values
+
+    def get_all_records(self, *args, **kwargs):
+        values = self.get_all_values()
+        if not values:
+            return []
+        header = values[0]
+        records = []
+        for row in values[1:]:
+            row = row + [""] * (len(header) - len(row))
+            records.append(dict(zip(header, numericise_all(row[:len(header)]))))
+        return records
+
+    def batch_get(self, ranges, *args, **kwargs):
+        self._request('get', ':batchGet', ",".join(ranges))
+        with self._lock:
+            result = [self._slice(r) for r in ranges]
+        self.stats.record('batch_get', read=sum(_payload_size(r) for r in result))
+        return result
+
+    def row_values(self, row, *args, **kwargs):
+        self._request('get', '', f"{row}:{row}")
+        with self._lock:
+            values = _trim([self._rows[row - 1]])[0] if len(self._rows) >= row else []
+        self.stats.record('row_values', read=_payload_size([values]))
+        return values
+
+    def col_values(self, col, *args, **kwargs):
+        self._request('get', '', f"C{col}")
+        with self._lock:
+            values = [row[col - 1] if len(row) >= col else "" for row in self._rows]
+        while values and values[-1] == "":
+            values.pop()
+        self.stats.record('col_values', read=_payload_size([values]))
+        return values
+
+    # --- Escrita ------------------------------------------------------------
+
+    def append_row(self, values, *args, **kwargs):
+        self.append_rows([values], _method='append_row')
+
+    def append_rows(self, values, *args, _method='append_rows', **kwargs):
+        self._request('post', ':append')
+        rows = [[("" if v is None else str(v)) for v in row] for row in values]
+        with self._lock:
+            self._rows.extend(rows)
+        self.stats.record(_method, written=_payload_size(rows))
+
+    def update_cell(self, row, col, value):
+        self._request('put', '', f"R{row}C{col}")
+        with self._lock:
+            while len(self._rows) < row:
+                self._rows.append([])
+            target = self._rows[row - 1]
+            target.extend([""] * (col - len(target)))
+            target[col - 1] = str(value)
+        self.stats.record('update_cell', written=len(str(value)))
+
+    def batch_update(self, data, *args, **kwargs):
+        self._request('post', ':batchUpdate')
+        written = 0
+        for item in data:
+            grid = a1_range_to_grid_range(item['range'])
+            for i, row in enumerate(item['values']):
+                for j, value in enumerate(row):
+                    r = grid.get('startRowIndex', 0) + i + 1
+                    c = grid.get('startColumnIndex', 0) + j + 1
+                    with self._lock:
+                        while len(self._rows) < r:
+                            self._rows.append([])
+                        target = self._rows[r - 1]
+                        target.extend([""] * (c - len(target)))
+                        target[c - 1] = str(value)
+                    written += len(str(value))
+        self.stats.record('batch_update', written=written)
+
+    def add_cols(self, cols):
+        self.http_client.request('post', f"{API_ROOT}/{self.spreadsheet_id}:batchUpdate")
+        self._cols += cols
+        self.stats.record('add_cols')
+
+
+class FakeSpreadsheet:
+    """Planilha em memória com várias worksheets"""
+
+    def __init__(self, sheet_id="fake-sheet", title="Validações (fake)", stats=None, http_client=None):
+        self.id = sheet_id
+        self.title = title
+        self.url = f"https://example.invalid/{sheet_id}"
+        self.stats = stats or CallStats()
+        self.http_client = http_client or FakeHTTPClient()
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    def worksheet(self, title):
+        self.http_client.request('get', f"{API_ROOT}/{self.id}")
+        self.stats.record('worksheet')
+        with self._lock:
+            if title not in self._worksheets:
+                raise WorksheetNotFound(title)
+            return self._worksheets[title]
+
+    def worksheets(self):
+        with self._lock:
+            return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self.http_client.request('post', f"{API_ROOT}/{self.id}:batchUpdate")
+        self.stats.record('add_worksheet')
+        with self._lock:
+            worksheet = FakeWorksheet(title, stats=self.stats, cols=cols,
+                                      http_client=self.http_client, spreadsheet_id=self.id)
+            self._worksheets[title] = worksheet
+            return worksheet
+
+
+class FakeClient:
+    """Cliente em memória: open_by_key/open retornam as planilhas registradas"""
+
+    def __init__(self, stats=None, http_client=None):
+        self.stats = stats or CallStats()
+        self.http_client = http_client or FakeHTTPClient()
+        self._spreadsheets = {}
+
+    def add_spreadsheet(self, sheet_id, title="Validações (fake)"):
+        spreadsheet = FakeSpreadsheet(sheet_id, title, stats=self.stats, http_client=self.http_client)
+        self._spreadsheets[sheet_id] = spreadsheet
+        return spreadsheet
+
+    def open_by_key(self, key):
+        self.http_client.request('get', f"{API_ROOT}/{key}")
+        self.stats.record('open_by_key')
+        if key not in self._spreadsheets:
+            raise SpreadsheetNotFound(key)
+        return self._spreadsheets[key]
+
+    def open(self, title):
+        self.http_client.request('get', "https://www.googleapis.com/drive/v3/files")
+        self.stats.record('open')
+        for spreadsheet in self._spreadsheets.values():
+            if spreadsheet.title == title:
+                return spreadsheet
+        raise SpreadsheetNotFound(title)
+
+    def openall(self):
+        return list(self._spreadsheets.values())
@@ -0,0 +1,316 @@
+"""Benchmark dos caminhos críticos com catálogos e validações sintéticos
+
+Uso (a partir da raiz do repositório):
+
+    python -m benchmarks.hot_paths                      # tamanhos padrão, compara com o baseline
+    python -m benchmarks.hot_paths --sizes 1000,1000000 --output resultados.json
+    python -m benchmarks.hot_paths --update-baseline    # regrava o baseline
+
+O processo termina com código 1 se algum caso ficar mais lento que o baseline
+além da tolerância.
+"""
+import argparse
+import gc
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agreement import AgreementAnalytics
+from aggregations import ValidationAggregates
+from assignment import ReviewCounts, ReviewScheduler
+from benchmarks import reference_paths
+from benchmarks.fake_sheets import FakeWorksheet
+from catalog import ITEM_FIELDS, SharedCatalog, load_catalog, split_questions
+from facets import FacetIndex
+from pending_items import build_validation_index, compute_pending_items, pending_positions
+from search import SearchIndex
+from sheets_io import IncrementalWorksheetReader
+from work_queue import WorkQueue
+from benchmarks.synthetic import generate_catalog, generate_validations, validations_to_rows
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_REPEAT = 5
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "hot_paths.json"
+
+# Um caso é regressão se o menor tempo ficar acima de baseline * (1 + tolerância)
+# e a diferença absoluta passar do piso (evita ruído em casos de microssegundos)
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_MIN_DELTA = 0.002
+
+# Campos exibidos por item (os mesmos lidos antes com safe_get na área principal)
+DISPLAY_FIELDS = [
+    'Numero_Questao', 'Texto_Questao', 'Respuesta', 'Dimensao', 'Capacidade_Chave',
+    'Pontuacao_Maxima_Dimensao', 'Pontuacao_Maxima_Capacidadclave', 'Pontuacao_Maxima_Questao',
+    'Pontuação_item', 'Nomble de la variable', 'sistema', 'ano',
+]
+
+# Consultas da busca por texto (com e sem acento, prefixo e vários termos)
+SEARCH_QUERIES = ['relevancia', 'Inovação', 'gest', 'dados públicos', 'institucion avaliacao']
+
+# Quantidade de itens usados nos casos por item (check_existing_validation, safe_get)
+SAMPLE_ITEMS = 200
+
+
+def import_app():
+    """Importa streamlit_app (filtros da barra lateral) fora do `streamlit run` (modo bare), sem o ruído de logs"""
+    import streamlit.logger
+    streamlit.logger.set_log_level(logging.ERROR)
+    import streamlit_app
+    return streamlit_app
+
+
+def measure(func, repeat):
+    """Executa ``func`` ``repeat`` vezes (após um aquecimento) e retorna estatísticas de tempo (segundos)"""
+    func()
+    # Como no timeit: sem coleta de lixo durante a medição (o lixo dos casos anteriores gera ruído)
+    gc.collect()
+    gc.disable()
+    timings = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'repeat': repeat,
+    }
+
+
+def run_size(app, size, repeat, workdir):
+    """Executa todos os casos para um tamanho de catálogo/validações"""
+    catalog = generate_catalog(size, seed=size)
+    validations = generate_validations(catalog, size, seed=size + 1)
+    usuario = validations['usuario'].iloc[0]
+
+    csv_path = Path(workdir) / f"catalog_{size}.csv"
+    catalog.to_csv(csv_path, index=False)
+    df_questoes = split_questions(load_catalog(csv_path))
+    # Catálogo como lido pela versão original (casos check_existing_validation e safe_get)
+    _, legacy_questoes = reference_paths.load_data(csv_path)
+
+    dimensao = sorted(df_questoes['Dimensao'].unique())[0]
+    capacidade = sorted(df_questoes[df_questoes['Dimensao'] == dimensao]['Capacidade_Chave'].unique())[0]
+    rng = np.random.default_rng(size)
+    sample_idx = df_questoes.index[rng.integers(0, len(df_questoes), min(SAMPLE_ITEMS, len(df_questoes)))]
+    sample_items = [legacy_questoes.loc[idx] for idx in sample_idx]
+
+    facet_index = FacetIndex(df_questoes)
+    search_index = SearchIndex(df_questoes)
+
+    rows = validations_to_rows(validations)
+    tail_rows = rows[-10:]
+
+    def filter_chain():
+        # Mesmo caminho da barra lateral: opções das facetas + IDs de linha filtrados pelos índices
+        facet_index.capabilities(dimensao)
+        app.filter_item_ids(facet_index, search_index, dimensao, '', '')
+        app.filter_item_ids(facet_index, search_index, dimensao, capacidade, '')
+        app.filter_item_ids(facet_index, search_index, '', '', 'relevância')
+
+    def search_queries():
+        # Consultas sem cache: prefixo, termo exato sem acento e vários termos (AND)
+        search_index._cache.clear()
+        for query in SEARCH_QUERIES:
+            search_index.search(query)
+
+    def pending_items():
+        index = build_validation_index(validations, usuario)
+        compute_pending_items(df_questoes, index)
+
+    def check_existing():
+        for item in sample_items:
+            reference_paths.check_existing_validation(validations, item, usuario)
+
+    def safe_get():
+        for item in sample_items:
+            for field in DISPLAY_FIELDS:
+                reference_paths.safe_get(item, field)
+
+    def summary_metrics():
+        user_validations = validations[validations['usuario'] == usuario]
+        reference_paths.summarize_validations(user_validations)
+
+    aggregates = ValidationAggregates(validations)
+    record = validations.iloc[0].to_dict()
+
+    def summary_incremental():
+        # Rerun após salvar: soma a avaliação nova e lê o resumo do usuário (consulta em cache)
+        aggregates.add(record)
+        aggregates.summary(usuario=usuario)
+
+    catalog = SharedCatalog(df_questoes)
+    validation_index = build_validation_index(validations, usuario)
+    view_ids = facet_index.row_ids(dimensao, '')
+
+    def pending_view():
+        # Mesmo caminho da fila de trabalho: chaves do catálogo já calculadas, só a seleção é consultada
+        pending_positions(catalog.item_keys(validation_index.key_spec), view_ids, validation_index)
+
+    pending = pending_positions(catalog.item_keys(validation_index.key_spec), facet_index.all_ids, validation_index)
+    queue = WorkQueue(pending.tolist(), None, 0, catalog.item)
+    sample_records = [catalog.item(position) for position in df_questoes.index.get_indexer(sample_idx)]
+
+    def item_fields():
+        # Mesmos campos do safe_get, lidos dos registros nativos do catálogo
+        for item in sample_records:
+            for attribute, _, _ in ITEM_FIELDS:
+                getattr(item, attribute)
+
+    def work_queue_next():
+        # "Próximo Item" em sequência: sem recalcular os pendentes, extraindo só o item seguinte
+        for _ in range(min(SAMPLE_ITEMS, len(queue))):
+            queue.skip()
+            queue.current_item()
+            queue.prefetch()
+
+    scheduler = ReviewScheduler(catalog.item_keys)
+    scheduler.sync(ReviewCounts(validations))
+    evaluators = sorted(validations['usuario'].unique())
+
+    def assignment_next():
+        # Avaliadores alternados recebendo e liberando itens (heap da seleção e reservas)
+        for i in range(SAMPLE_ITEMS):
+            evaluator = evaluators[i % len(evaluators)]
+            scheduler.assign(evaluator, 'todos', facet_index.all_ids)
+            scheduler.release(evaluator)
+
+    agreement = AgreementAnalytics(validations)
+
+    def agreement_incremental():
+        # Rerun após salvar: soma a avaliação e recalcula os índices da campanha, por dimensão e por item
+        agreement.add(record)
+        for scale in ('relevancia', 'adequacao'):
+            agreement.summary(scale)
+            agreement.breakdown(scale, by='dimensao')
+            agreement.item_dispersion(scale)
+
+    def load_validations_full():
+        IncrementalWorksheetReader().read(FakeWorksheet("Validações_Streamlit", rows))
+
+    reader = IncrementalWorksheetReader()
+    worksheet = FakeWorksheet("Validações_Streamlit", rows[:-len(tail_rows)])
+    reader.read(worksheet)
+
+    def load_validations_tail():
+        # Sem linhas novas: custo de um rerun em que ninguém salvou nada
+        reader.read(worksheet)
+
+    cases = {
+        'load_data': lambda: reference_paths.load_data(csv_path),
+        'load_catalog': lambda: split_questions(load_catalog(csv_path)),
+        'facet_index': lambda: FacetIndex(df_questoes),
+        'search_index': lambda: SearchIndex(df_questoes),
+        'search_queries': search_queries,
+        'filter_chain': filter_chain,
+        'pending_items': pending_items,
+        'pending_view': pending_view,
+        'check_existing_validation': check_existing,
+        'safe_get': safe_get,
+        'item_fields': item_fields,
+        'shared_catalog': lambda: SharedCatalog(df_questoes),
+        'summary_metrics': summary_metrics,
+        'summary_aggregates_build': lambda: ValidationAggregates(validations),
+        'summary_incremental': summary_incremental,
+        'work_queue_next': work_queue_next,
+        'review_counts_build': lambda: ReviewCounts(validations),
+        'assignment_next': assignment_next,
+        'agreement_build': lambda: AgreementAnalytics(validations),
+        'agreement_incremental': agreement_incremental,
+        'load_validations_full': load_validations_full,
+        'load_validations_tail': load_validations_tail,
+    }
+    return {name: measure(func, repeat) for name, func in cases.items()}
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Compara os resultados com o baseline; retorna a lista de regressões"""
+    regressions = []
+    for size, cases in results.items():
+        for name, stats in cases.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                continue
+            current, expected = stats['min_s'], reference['min_s']
+            if current > expected * (1 + tolerance) and current - expected > min_delta:
+                regressions.append({
+                    'size': size,
+                    'case': name,
+                    'baseline_s': expected,
+                    'current_s': current,
+                    'ratio': current / expected if expected else float('inf'),
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+                        help="tamanhos separados por vírgula (ex.: 1000,10000,100000,1000000)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--output', help="arquivo JSON com os resultados")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="grava os resultados como novo baseline em vez de comparar")
+    args = parser.parse_args(argv)
+
+    app = import_app()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            results[str(size)] = run_size(app, size, args.repeat, workdir)
+            for name, stats in results[str(size)].items():
+                print(f"{size:>9} {name:<28} {stats['median_s'] * 1000:10.2f} ms")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Baseline gravado em {baseline_path}")
+        return 0
+
+    regressions = []
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))['results']
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    report['regressions'] = regressions
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    for r in regressions:
+        print(f"REGRESSÃO {r['size']:>9} {r['case']:<28} {r['baseline_s'] * 1000:.2f} ms → "
+              f"{r['current_s'] * 1000:.2f} ms ({r['ratio']:.1f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
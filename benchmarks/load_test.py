@@ -0,0 +1,328 @@
+"""Teste de carga: avaliadores simultâneos contra um substituto em memória do Google Sheets
+
+Uso (a partir da raiz do repositório):
+
+    python -m benchmarks.load_test                                  # 1, 5, 10 e 20 sessões
+    python -m benchmarks.load_test --sessions 1,10,50 --saves 10 --latency 0.2 --quota-error-rate 0.02
+    python -m benchmarks.load_test --output carga.json
+    python -m benchmarks.load_test --target-reviews 0               # sem distribuição (ordem do catálogo)
+
+Cada sessão é uma execução headless de streamlit_app.py (AppTest) em sua própria
+thread, que informa o nome, filtra os itens, responde as cinco questões, salva e
+de tempos em tempos pula um item. Todas as sessões compartilham os caches do
+processo, como em um deploy. O gspread é substituído pelo FakeClient, com
+latência e erros de cota (429) configuráveis; as chamadas passam pelo agendador
+de cotas da aplicação.
+
+O AppTest troca estado global do Streamlit a cada execução (runtime, secrets),
+então os reruns das sessões entram em fila e executam um de cada vez, como
+reruns disputando o GIL em um servidor ocupado; as threads da aplicação em
+segundo plano (gravação no Sheets, atualização do snapshot) seguem em paralelo.
+A latência medida inclui a espera na fila, que é o que o avaliador percebe.
+
+Cada quantidade de sessões roda em um processo separado (caches e pico de
+memória independentes), em um diretório temporário com uma cópia de data/.
+O relatório traz os percentis p50/p95/p99 dos reruns, as requisições ao Sheets
+por avaliação salva, quantos itens distintos receberam avaliações e o pico de RSS.
+"""
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from assignment import DEFAULT_TARGET_REVIEWS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = REPO_ROOT / "streamlit_app.py"
+
+DEFAULT_SESSIONS = [1, 5, 10, 20]
+DEFAULT_SAVES = 5
+
+# Um "Próximo Item" a cada tantas avaliações salvas
+DEFAULT_SKIP_EVERY = 3
+
+# Latência média (segundos) e fração das requisições respondidas com 429
+DEFAULT_LATENCY = 0.05
+DEFAULT_QUOTA_ERROR_RATE = 0.01
+
+# Buscas usadas pelas sessões (alternadas; vazio = sem filtro)
+SEARCH_QUERIES = ['', 'gestion', 'datos', 'innovacion']
+
+# Reruns do AppTest não podem ser simultâneos (ver docstring do módulo)
+_RERUN_LOCK = threading.Lock()
+
+SHEET_ID = "load-test-sheet"
+WORKSHEET_NAME = "Validações_Streamlit"
+
+# Tempo máximo de um rerun e da espera pela sincronização em segundo plano
+RERUN_TIMEOUT = 120
+SYNC_TIMEOUT = 120
+
+# Respostas das cinco questões obrigatórias/de sim-não (prefixo da chave do widget → valor)
+ANSWERS = (
+    ('adequacao_', 'Sim'),
+    ('relevancia_', '5 - Alta relevância'),
+    ('tem_norma_', 'Não'),
+    ('tem_base_dados_', 'Não'),
+    ('tem_organismo_', 'Não'),
+)
+
+
+def percentiles(values):
+    """p50/p95/p99 e máximo (milissegundos) de uma lista de durações em segundos"""
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p95, p99 = (float(v) * 1000 for v in np.percentile(values, [50, 95, 99]))
+    return {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': max(values) * 1000}
+
+
+def peak_rss_mb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def app_secrets(read_per_minute, write_per_minute, burst, target_reviews):
+    return {
+        'google_sheets': {'google_sheets_id': SHEET_ID},
+        'gcp_service_account': {'type': 'service_account', 'client_email': 'load-test@example.invalid'},
+        'quota': {'read_per_minute': read_per_minute, 'write_per_minute': write_per_minute, 'burst': burst},
+        'assignment': {'target_reviews': target_reviews},
+    }
+
+
+class EvaluatorSession:
+    """Um avaliador: AppTest próprio, reruns cronometrados"""
+
+    def __init__(self, name, query, secrets):
+        from streamlit.testing.v1 import AppTest
+
+        self.name = name
+        self.query = query
+        self.at = AppTest.from_file(str(APP_PATH), default_timeout=RERUN_TIMEOUT)
+        for section, values in secrets.items():
+            self.at.secrets[section] = values
+        self.rerun_times = []
+        self.save_times = []
+        self.saves = 0
+        self.skips = 0
+        self.errors = []
+
+    def _run(self, widget=None, timings=None):
+        start = time.perf_counter()
+        with _RERUN_LOCK:
+            (widget or self.at).run()
+        elapsed = time.perf_counter() - start
+        self.rerun_times.append(elapsed)
+        if timings is not None:
+            timings.append(elapsed)
+        for exception in self.at.exception:
+            self.errors.append(exception.message)
+
+    def _key(self, prefix):
+        for element in list(self.at.radio) + list(self.at.selectbox) + list(self.at.button):
+            if element.key and element.key.startswith(prefix) and element.key[len(prefix):].isdigit():
+                return element.key
+        return None
+
+    def _widget(self, key):
+        for collection in (self.at.radio, self.at.selectbox, self.at.button):
+            try:
+                return collection(key=key)
+            except KeyError:
+                continue
+        return None
+
+    def run(self, saves, skip_every):
+        self._run()
+        self._run(self.at.text_input(key='usuario_input').input(self.name))
+        if self.query:
+            self._run(self.at.text_input(key='filtro_busca').input(self.query))
+        while self.saves < saves:
+            save_key = self._key('save_')
+            if save_key is None:
+                # Nenhum item pendente com este filtro
+                break
+            for prefix, value in ANSWERS:
+                key = self._key(prefix)
+                if key is not None:
+                    self._run(self._widget(key).set_value(value))
+            self._run(self._widget(save_key).click(), self.save_times)
+            self.saves += 1
+            if skip_every and self.saves % skip_every == 0:
+                next_key = self._key('next_')
+                if next_key is not None:
+                    self._run(self._widget(next_key).click())
+                    self.skips += 1
+
+
+def wait_for_sync(worksheet, expected_rows, timeout=SYNC_TIMEOUT):
+    """Espera a fila de gravação em segundo plano levar as avaliações para a worksheet"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if worksheet is not None and len(worksheet) - 1 >= expected_rows:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def run_sessions(sessions, saves, skip_every, latency, quota_error_rate, seed,
+                 read_per_minute, write_per_minute, burst, target_reviews):
+    """Executa ``sessions`` avaliadores simultâneos e devolve as métricas (processo atual)"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    from benchmarks.fake_sheets import FakeClient, FakeCredentials, FakeHTTPClient
+
+    http_client = FakeHTTPClient(latency=latency, quota_error_rate=quota_error_rate, seed=seed)
+    client = FakeClient(http_client=http_client)
+    spreadsheet = client.add_spreadsheet(SHEET_ID)
+    secrets = app_secrets(read_per_minute, write_per_minute, burst, target_reviews)
+
+    evaluators = [
+        EvaluatorSession(f"avaliador_{i:03d}", SEARCH_QUERIES[i % len(SEARCH_QUERIES)], secrets)
+        for i in range(sessions)
+    ]
+
+    def worker(evaluator):
+        try:
+            evaluator.run(saves, skip_every)
+        except Exception as e:
+            evaluator.errors.append(f"{type(e).__name__}: {e}")
+
+    with mock.patch.object(gspread, 'authorize', lambda credentials, *args, **kwargs: client), \
+            mock.patch.object(Credentials, 'from_service_account_info', lambda *args, **kwargs: FakeCredentials()):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(e,), name=e.name) for e in evaluators]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total_saves = sum(e.saves for e in evaluators)
+        worksheet = next((w for w in spreadsheet.worksheets() if w.title == WORKSHEET_NAME), None)
+        synced = wait_for_sync(worksheet, total_saves) if total_saves else True
+        # Cobertura: quantos itens distintos receberam as avaliações salvas
+        reviewed = Counter(worksheet.column_snapshot('numero_questao')) if worksheet is not None else Counter()
+
+    requests = http_client.snapshot()
+    writes = sum(count for method, count in requests['requests'].items() if method not in ('GET', 'HEAD'))
+    rerun_times = [t for e in evaluators for t in e.rerun_times]
+    errors = [error for e in evaluators for error in e.errors]
+    return {
+        'sessions': sessions,
+        'saves': total_saves,
+        'skips': sum(e.skips for e in evaluators),
+        'reruns': len(rerun_times),
+        'elapsed_s': elapsed,
+        'rerun': percentiles(rerun_times),
+        'save': percentiles([t for e in evaluators for t in e.save_times]),
+        'sheets_requests': requests['total_requests'],
+        'sheets_requests_per_save': requests['total_requests'] / total_saves if total_saves else None,
+        'sheets_writes_per_save': writes / total_saves if total_saves else None,
+        'quota_errors': requests['quota_errors'],
+        'items_reviewed': len(reviewed),
+        'max_reviews_per_item': max(reviewed.values(), default=0),
+        'synced': synced,
+        'peak_rss_mb': peak_rss_mb(),
+        'errors': errors[:20],
+    }
+
+
+def run_worker(args):
+    """Modo interno: uma quantidade de sessões, em um diretório temporário; JSON na saída padrão"""
+    import logging
+
+    import streamlit.logger
+    streamlit.logger.set_log_level(logging.ERROR)
+
+    sys.path.insert(0, str(REPO_ROOT))
+    import os
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = Path(workdir) / "data"
+        data_dir.mkdir()
+        for csv_path in (REPO_ROOT / "data").glob("*.csv"):
+            shutil.copy(csv_path, data_dir / csv_path.name)
+        os.chdir(workdir)
+        result = run_sessions(args.worker, args.saves, args.skip_every, args.latency, args.quota_error_rate,
+                              args.seed, args.read_per_minute, args.write_per_minute, args.burst,
+                              args.target_reviews)
+    print(json.dumps(result))
+    return 0
+
+
+def print_row(result):
+    rerun = result['rerun']
+    per_save = result['sheets_requests_per_save']
+    print(f"{result['sessions']:>8} {result['saves']:>6} {result['elapsed_s']:>8.1f}s "
+          f"{rerun['p50_ms'] or 0:>9.0f} {rerun['p95_ms'] or 0:>9.0f} {rerun['p99_ms'] or 0:>9.0f} "
+          f"{per_save if per_save is not None else float('nan'):>10.1f} {result['quota_errors']:>5} "
+          f"{result['items_reviewed']:>6} {result['peak_rss_mb']:>8.0f} MB{'' if result['synced'] else '  (sincronização incompleta)'}")
+    for error in result['errors'][:3]:
+        print(f"         erro: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', default=",".join(map(str, DEFAULT_SESSIONS)),
+                        help="quantidades de sessões simultâneas, separadas por vírgula")
+    parser.add_argument('--saves', type=int, default=DEFAULT_SAVES, help="avaliações salvas por sessão")
+    parser.add_argument('--skip-every', type=int, default=DEFAULT_SKIP_EVERY,
+                        help="clicar em Próximo Item a cada N avaliações (0 desativa)")
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help="latência média de cada requisição ao Sheets (segundos)")
+    parser.add_argument('--quota-error-rate', type=float, default=DEFAULT_QUOTA_ERROR_RATE,
+                        help="fração das requisições respondidas com 429")
+    parser.add_argument('--read-per-minute', type=float, default=600)
+    parser.add_argument('--write-per-minute', type=float, default=600)
+    parser.add_argument('--burst', type=int, default=50)
+    parser.add_argument('--target-reviews', type=int, default=DEFAULT_TARGET_REVIEWS,
+                        help="meta de avaliações por item da distribuição (0 = ordem do catálogo)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="arquivo JSON com os resultados")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(args)
+
+    forwarded = [
+        '--saves', str(args.saves), '--skip-every', str(args.skip_every),
+        '--latency', str(args.latency), '--quota-error-rate', str(args.quota_error_rate),
+        '--read-per-minute', str(args.read_per_minute), '--write-per-minute', str(args.write_per_minute),
+        '--burst', str(args.burst), '--seed', str(args.seed), '--target-reviews', str(args.target_reviews),
+    ]
+    print(f"{'sessões':>8} {'salvas':>6} {'tempo':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/salva':>10} {'429':>5} {'itens':>6} {'pico RSS':>11}")
+    results = []
+    for sessions in [int(s) for s in args.sessions.split(",") if s.strip()]:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.load_test', '--worker', str(sessions)] + forwarded,
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            print(f"{sessions:>8} falhou:\n{completed.stderr[-2000:]}")
+            return 1
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print_row(result)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'config': vars(args), 'results': results}, indent=2,
+                                                ensure_ascii=False) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Implementações anteriores dos caminhos críticos, mantidas como referência dos benchmarks
+
+A aplicação não usa mais estas funções, copiadas da versão original de
+streamlit_app.py sem as chamadas ao Streamlit: o catálogo tipado compilado
+(load_catalog), o índice de pendências, os registros nativos dos itens e os
+contadores do snapshot (ValidationAggregates) as substituíram. Elas ficam aqui
+para que ``benchmarks.hot_paths`` meça o caminho antigo ao lado do novo
+(load_data × load_catalog, check_existing_validation × pending_items,
+safe_get × item_fields, summary_metrics × summary_aggregates_build).
+"""
+import numpy as np
+import pandas as pd
+
+
+def load_data(csv_path):
+    """Carrega o arquivo CSV preparado (leitura sem mapa de tipos); retorna (df, df_questoes)"""
+    df = pd.read_csv(csv_path)
+
+    # Limpar dados
+    df = df.fillna("")
+
+    # Remover linhas completamente vazias
+    df = df.dropna(how='all')
+
+    # Filtrar apenas linhas que têm Texto_Questao (questões)
+    df_questoes = df[df['Texto_Questao'].notna() & (df['Texto_Questao'] != '')].copy()
+
+    return df, df_questoes
+
+
+def check_existing_validation(validations_df, item_data, usuario=''):
+    """Avaliação do usuário para o item (varredura das validações a cada chamada), ou None"""
+    if validations_df.empty:
+        return None
+
+    try:
+        numero_questao = str(item_data.get('Numero_Questao', '')) if 'Numero_Questao' in item_data.index else ''
+        sistema = str(item_data.get('sistema', '')) if 'sistema' in item_data.index else ''
+        ano = item_data.get('ano', None) if 'ano' in item_data.index else None
+    except (KeyError, AttributeError):
+        return None
+
+    if 'numero_questao' in validations_df.columns:
+        mask = (
+            (validations_df['usuario'] == usuario) &
+            (validations_df['sistema'] == sistema) &
+            (validations_df['ano'] == ano) &
+            (validations_df['numero_questao'] == numero_questao)
+        )
+    else:
+        try:
+            texto_questao = str(item_data.get('Texto_Questao', '')) if 'Texto_Questao' in item_data.index else ''
+        except (KeyError, AttributeError):
+            texto_questao = ''
+
+        if 'texto_questao' in validations_df.columns:
+            mask = (
+                (validations_df['usuario'] == usuario) &
+                (validations_df['sistema'] == sistema) &
+                (validations_df['texto_questao'] == texto_questao)
+            )
+        else:
+            return None
+
+    existing = validations_df[mask]
+    return existing.iloc[0] if not existing.empty else None
+
+
+def safe_get(item, key, default=''):
+    """Extrai valor do item (linha do DataFrame) de forma segura, convertendo para tipo nativo"""
+    try:
+        if hasattr(item, 'get'):
+            value = item.get(key, default)
+        elif hasattr(item, '__getitem__'):
+            if hasattr(item, 'index') and key in item.index:
+                value = item[key]
+            elif key in item:
+                value = item[key]
+            else:
+                value = default
+        else:
+            value = default
+
+        if pd.isna(value):
+            return default if default is not None else None
+
+        if isinstance(value, (np.integer, np.int64, np.int32, np.int16, np.int8)):
+            return int(value)
+        elif isinstance(value, (np.floating, np.float64, np.float32, np.float16)):
+            return float(value)
+        elif isinstance(value, np.bool_):
+            return bool(value)
+        else:
+            return str(value) if value else default
+    except (KeyError, IndexError, AttributeError, TypeError):
+        return default
+
+
+def summarize_validations(user_validations):
+    """Contadores do resumo calculados com uma máscara booleana por métrica, a cada rerun
+
+    Mesmo formato de ValidationAggregates.summary(): contadores cujas colunas não
+    existem na planilha ficam ausentes do resultado.
+    """
+    colunas_disponiveis = user_validations.columns.tolist()
+    summary = {'total': len(user_validations)}
+
+    if 'adequacao_realidade_brasileira' in colunas_disponiveis:
+        summary['adequados'] = len(user_validations[user_validations['adequacao_realidade_brasileira'] == 'Sim'])
+        summary['em_partes'] = len(user_validations[user_validations['adequacao_realidade_brasileira'] == 'Em partes'])
+        summary['nao_adequados'] = len(user_validations[user_validations['adequacao_realidade_brasileira'] == 'Não'])
+
+    if 'grau_relevancia' in colunas_disponiveis:
+        summary['alta_relevancia'] = len(user_validations[
+            user_validations['grau_relevancia'].astype(str).str.contains('5', na=False, regex=False)
+        ])
+        relevancia_counts = user_validations['grau_relevancia'].astype(str).value_counts().sort_index()
+        summary['relevancia_counts'] = {
+            nivel: int(count) for nivel, count in relevancia_counts.items()
+            if nivel and str(nivel).strip() != 'nan' and str(nivel).strip() != ''
+        }
+
+    if 'tem_norma_exigente' in colunas_disponiveis:
+        summary['com_norma'] = len(user_validations[user_validations['tem_norma_exigente'] == 'Sim'])
+        summary['sem_norma'] = len(user_validations[user_validations['tem_norma_exigente'] == 'Não'])
+
+    if 'tem_base_dados_publica' in colunas_disponiveis:
+        summary['com_base'] = len(user_validations[user_validations['tem_base_dados_publica'] == 'Sim'])
+        summary['sem_base'] = len(user_validations[user_validations['tem_base_dados_publica'] == 'Não'])
+
+    return summary
@@ -0,0 +1,134 @@
+"""Gerador de catálogos e validações sintéticos com o esquema real dos dados"""
+import numpy as np
+import pandas as pd
+
+# Colunas do CSV preparado (a última coluna do arquivo original não tem nome)
+CATALOG_COLUMNS = [
+    'sistema', 'ano', 'Dimensao', 'Pontuacao_Maxima_Dimensao', 'Capacidade_Chave',
+    'Pontuacao_Maxima_Capacidadclave', 'Nomble de la variable', 'Numero_Questao',
+    'Texto_Questao', 'Respuesta', 'Pontuacao_Maxima_Questao', 'Pontuação_item', '',
+]
+
+# Colunas gravadas por save_validation_to_sheets_streamlit (na mesma ordem)
+VALIDATION_COLUMNS = [
+    'timestamp', 'usuario', 'sistema', 'ano', 'dimensao', 'pontuacao_maxima_dimensao',
+    'capacidade_chave', 'pontuacao_maxima_capacidade_chave', 'nome_variavel',
+    'numero_questao', 'texto_questao', 'respuesta', 'pontuacao_maxima_questao',
+    'pontuacao_item', 'adequacao_realidade_brasileira', 'justificativa_adequacao',
+    'grau_relevancia', 'tem_norma_exigente', 'detalhes_norma', 'tem_base_dados_publica',
+    'link_base_dados', 'tem_organismo_exigente', 'qual_organismo', 'comentario', 'record_id',
+]
+
+DIMENSOES = [
+    'Dimensión Recursos institucionales',
+    'Dimensión Prácticas y procesos',
+    'Dimensión Colaboración y apertura',
+    'Dimensión Resultados',
+]
+
+CAPACIDADES = [
+    'Talento humano', 'Liderazgo', 'Gestión de la innovación', 'Datos e información',
+    'Tecnología', 'Participación ciudadana', 'Redes y alianzas', 'Aprendizaje',
+    'Resultados de innovación', 'Institucionalidad',
+]
+
+# Vocabulário com acentuação (português e espanhol), como nos textos reais
+VOCABULARIO = (
+    "instituição institución inovação innovación relevância relevancia pública público "
+    "gestão gestión processos procesos dados datos equipe equipo período período "
+    "analisado servidores funcionarios programas formação formación capacitação "
+    "participação participación cidadã ciudadana avaliação evaluación resultados "
+    "estratégia estrategia orçamento presupuesto tecnologia tecnología colaboração "
+    "colaboración práticas prácticas lideranças liderazgo aprendizagem aprendizaje"
+).split()
+
+RESPUESTAS = [
+    "Respuesta numérica. Levantamiento administrativo.",
+    "A. Sí B. No",
+    "A. Entre 1 y 10 B. Entre 11 y 20 C. Más de 20",
+    "Respuesta abierta.",
+]
+
+RELEVANCIAS = ["1 - Baixa relevância", "2", "3", "4", "5 - Alta relevância"]
+
+
+def generate_catalog(n_items, seed=0, sistema='chile', ano=2025):
+    """Gera um catálogo com ``n_items`` questões no formato do CSV preparado"""
+    rng = np.random.default_rng(seed)
+    dim_idx = rng.integers(0, len(DIMENSOES), n_items)
+    cap_idx = (dim_idx * 3 + rng.integers(0, 3, n_items)) % len(CAPACIDADES)
+
+    # Numeração no estilo do catálogo real: "12", "12.3", "12A"
+    base = np.arange(n_items) // 4 + 1
+    sub = np.arange(n_items) % 4
+    numeros = [
+        str(b) if s == 0 else (f"{b}.{s}" if s < 3 else f"{b}A")
+        for b, s in zip(base.tolist(), sub.tolist())
+    ]
+
+    words = rng.integers(0, len(VOCABULARIO), (n_items, 12))
+    vocab = np.array(VOCABULARIO, dtype=object)
+    textos = [" ".join(row) + "?" for row in vocab[words].tolist()]
+    variaveis = [" ".join(row) for row in vocab[words[:, :2]].tolist()]
+
+    return pd.DataFrame({
+        'sistema': sistema,
+        'ano': ano,
+        'Dimensao': np.array(DIMENSOES, dtype=object)[dim_idx],
+        'Pontuacao_Maxima_Dimensao': 20,
+        'Capacidade_Chave': np.array(CAPACIDADES, dtype=object)[cap_idx],
+        'Pontuacao_Maxima_Capacidadclave': rng.integers(2, 8, n_items),
+        'Nomble de la variable': variaveis,
+        'Numero_Questao': numeros,
+        'Texto_Questao': textos,
+        'Respuesta': np.array(RESPUESTAS, dtype=object)[rng.integers(0, len(RESPUESTAS), n_items)],
+        'Pontuacao_Maxima_Questao': 1,
+        'Pontuação_item': "",
+        '': "",
+    }, columns=CATALOG_COLUMNS)
+
+
+def generate_validations(catalog, n_validations, n_users=None, seed=1):
+    """Gera ``n_validations`` avaliações de itens do catálogo por ``n_users`` avaliadores"""
+    rng = np.random.default_rng(seed)
+    if n_users is None:
+        n_users = max(5, n_validations // 200)
+    items = catalog.iloc[rng.integers(0, len(catalog), n_validations)]
+    usuarios = np.array([f"avaliador_{i:04d}" for i in range(n_users)], dtype=object)
+
+    adequacao = np.array(["Sim", "Não", "Em partes"], dtype=object)[rng.integers(0, 3, n_validations)]
+    sim_nao = np.array(["Não", "Sim"], dtype=object)
+    df = pd.DataFrame({
+        'timestamp': "2025-01-01 12:00:00",
+        'usuario': usuarios[rng.integers(0, n_users, n_validations)],
+        'sistema': items['sistema'].to_numpy(),
+        'ano': items['ano'].to_numpy(),
+        'dimensao': items['Dimensao'].to_numpy(),
+        'pontuacao_maxima_dimensao': items['Pontuacao_Maxima_Dimensao'].to_numpy(),
+        'capacidade_chave': items['Capacidade_Chave'].to_numpy(),
+        'pontuacao_maxima_capacidade_chave': items['Pontuacao_Maxima_Capacidadclave'].to_numpy(),
+        'nome_variavel': items['Nomble de la variable'].to_numpy(),
+        'numero_questao': items['Numero_Questao'].to_numpy(),
+        'texto_questao': items['Texto_Questao'].to_numpy(),
+        'respuesta': items['Respuesta'].to_numpy(),
+        'pontuacao_maxima_questao': items['Pontuacao_Maxima_Questao'].to_numpy(),
+        'pontuacao_item': "",
+        'adequacao_realidade_brasileira': adequacao,
+        'justificativa_adequacao': np.where(adequacao == "Em partes", "Depende do órgão", ""),
+        'grau_relevancia': np.array(RELEVANCIAS, dtype=object)[rng.integers(0, 5, n_validations)],
+        'tem_norma_exigente': sim_nao[rng.integers(0, 2, n_validations)],
+        'detalhes_norma': "",
+        'tem_base_dados_publica': sim_nao[rng.integers(0, 2, n_validations)],
+        'link_base_dados': "",
+        'tem_organismo_exigente': sim_nao[rng.integers(0, 2, n_validations)],
+        'qual_organismo': "",
+        'comentario': "",
+        'record_id': [f"{seed:02d}{i:010d}" for i in range(n_validations)],
+    }, columns=VALIDATION_COLUMNS)
+    return df.reset_index(drop=True)
+
+
+def validations_to_rows(validations):
+    """Converte as avaliações para linhas de worksheet (cabeçalho + valores como texto)"""
+    header = list(validations.columns)
+    return [header] + validations.astype(str).values.tolist()
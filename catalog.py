@@ -0,0 +1,314 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pending_items import NUMBER_KEY, build_item_keys
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow acompanha o Streamlit
+    pa = None
+    feather = None
+
+# Versão do formato compilado (incrementar ao mudar o mapa de tipos)
+CATALOG_FORMAT_VERSION = "1"
+
+# Pasta com os catálogos preparados (um CSV por sistema/ano)
+DEFAULT_DATA_DIR = Path("data")
+
+# Nome dos CSVs preparados: <sistema>_iip_<ano>_preparado.csv
+PARTITION_FILE_PATTERN = re.compile(r"^(?P<sistema>.+)_iip_(?P<ano>\d{4})_preparado\.csv$")
+
+# Pasta do catálogo compilado, relativa ao CSV de origem
+CACHE_DIR_NAME = ".cache"
+
+# Colunas com poucos valores distintos (viram categorias)
+CATEGORICAL_COLUMNS = ('sistema', 'Dimensao', 'Capacidade_Chave', 'Nomble de la variable')
+
+# Ano e pontuações máximas (Int64 anulável; Float64 se houver valores como 14.5)
+NUMERIC_COLUMNS = ('ano', 'Pontuacao_Maxima_Dimensao', 'Pontuacao_Maxima_Capacidadclave')
+
+# Demais colunas conhecidas permanecem texto; Pontuacao_Maxima_Questao e Pontuação_item
+# têm valores como "0.4; 0.6" e "sim: 0.1; não 0" e não podem ser numéricas
+TEXT_COLUMNS = (
+    'Numero_Questao', 'Texto_Questao', 'Respuesta', 'Pontuacao_Maxima_Questao', 'Pontuação_item',
+)
+
+# Campos dos itens: (atributo, coluna do catálogo, valor quando vazio). Os atributos têm
+# os nomes das colunas da planilha de validações
+ITEM_FIELDS = (
+    ('numero_questao', 'Numero_Questao', ''),
+    ('texto_questao', 'Texto_Questao', ''),
+    ('respuesta', 'Respuesta', ''),
+    ('dimensao', 'Dimensao', ''),
+    ('capacidade_chave', 'Capacidade_Chave', ''),
+    ('pontuacao_maxima_dimensao', 'Pontuacao_Maxima_Dimensao', None),
+    ('pontuacao_maxima_capacidade_chave', 'Pontuacao_Maxima_Capacidadclave', None),
+    ('pontuacao_maxima_questao', 'Pontuacao_Maxima_Questao', None),
+    ('pontuacao_item', 'Pontuação_item', ''),
+    ('nome_variavel', 'Nomble de la variable', ''),
+    ('sistema', 'sistema', ''),
+    ('ano', 'ano', None),
+)
+
+_METADATA_HASH = b'source_sha256'
+_METADATA_VERSION = b'catalog_format'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hash SHA-256 do conteúdo do arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_path_for(csv_path):
+    """Caminho do catálogo compilado (Arrow IPC) correspondente ao CSV"""
+    csv_path = Path(csv_path)
+    return csv_path.parent / CACHE_DIR_NAME / f"{csv_path.stem}.arrow"
+
+
+def _to_number(series):
+    """Converte para número anulável (Int64 ou Float64); mantém texto se houver valores não numéricos"""
+    numeric = pd.to_numeric(series, errors='coerce')
+    lost = numeric.isna() & series.notna() & (series.astype(str).str.strip() != '')
+    if lost.any():
+        return series.fillna('').astype(object)
+    if (numeric.dropna() % 1 == 0).all():
+        return numeric.astype('Int64')
+    return numeric.astype('Float64')
+
+
+def read_catalog_csv(csv_path):
+    """Lê o CSV com o mapa de tipos explícito do catálogo"""
+    dtypes = {column: str for column in CATEGORICAL_COLUMNS + TEXT_COLUMNS}
+    df = pd.read_csv(csv_path, dtype=dtypes, keep_default_na=True)
+
+    # Remover colunas finais sem nome e sem nenhum valor (vírgula sobrando no cabeçalho)
+    while len(df.columns) and str(df.columns[-1]).startswith('Unnamed:') and df[df.columns[-1]].isna().all():
+        df = df.drop(columns=df.columns[-1])
+
+    # Remover linhas completamente vazias
+    df = df.dropna(how='all').reset_index(drop=True)
+
+    for column in df.columns:
+        if column in NUMERIC_COLUMNS:
+            df[column] = _to_number(df[column])
+        elif column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].fillna('').astype('category')
+        else:
+            df[column] = df[column].fillna('').astype(object)
+    return df
+
+
+def compile_catalog(csv_path, output_path=None, source_hash=None):
+    """Compila o CSV para um arquivo Arrow IPC (não comprimido, mapeável em memória)"""
+    csv_path = Path(csv_path)
+    output_path = Path(output_path) if output_path else compiled_path_for(csv_path)
+    source_hash = source_hash or file_sha256(csv_path)
+    df = read_catalog_csv(csv_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_METADATA_HASH] = source_hash.encode()
+    metadata[_METADATA_VERSION] = CATALOG_FORMAT_VERSION.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Grava em arquivo temporário e troca atomicamente (outros processos podem estar lendo)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f"{output_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        feather.write_feather(table, str(tmp_path), compression='uncompressed')
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return df
+
+
+def _compiled_hash(compiled_path):
+    """Hash do CSV de origem gravado no catálogo compilado (None se ausente ou de outra versão)"""
+    try:
+        with pa.memory_map(str(compiled_path)) as source:
+            schema = pa.ipc.open_file(source).schema
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadata = schema.metadata or {}
+    if metadata.get(_METADATA_VERSION) != CATALOG_FORMAT_VERSION.encode():
+        return None
+    hash_value = metadata.get(_METADATA_HASH)
+    return hash_value.decode() if hash_value else None
+
+
+def load_catalog(csv_path, compiled_path=None):
+    """Carrega o catálogo tipado, recompilando apenas quando o hash do CSV muda"""
+    if feather is None:
+        return read_catalog_csv(csv_path)
+
+    compiled_path = Path(compiled_path) if compiled_path else compiled_path_for(csv_path)
+    source_hash = file_sha256(csv_path)
+    if not compiled_path.exists() or _compiled_hash(compiled_path) != source_hash:
+        try:
+            compile_catalog(csv_path, compiled_path, source_hash)
+        except OSError:
+            # Sistema de arquivos somente leitura: usa o CSV diretamente
+            return read_catalog_csv(csv_path)
+    # Os metadados do pandas gravados no arquivo restauram categorias e Int64
+    return feather.read_table(str(compiled_path), memory_map=True).to_pandas()
+
+
+def split_questions(df):
+    """Separa as linhas que são questões (com Texto_Questao preenchido)"""
+    return df[df['Texto_Questao'] != ''].copy()
+
+
+def native_value(value, default=''):
+    """Valor Python nativo de uma célula (inteiro, float, bool ou texto); vazio/NA vira ``default``"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return default
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return default if value != value else float(value)
+    return str(value) if value != '' else default
+
+
+# Item do catálogo com valores Python nativos (tupla imutável, campos por nome)
+CatalogItem = namedtuple('CatalogItem', ['item_id', 'position'] + [attribute for attribute, _, _ in ITEM_FIELDS])
+
+
+def native_column(series, default=''):
+    """Valores nativos de uma coluna inteira (native_value só para o que não é texto já limpo)"""
+    return [
+        value if type(value) is str and value != '' else native_value(value, default)
+        for value in series.tolist()
+    ]
+
+
+def build_items(df_questoes, item_ids):
+    """Registros nativos (CatalogItem) de todas as questões, na ordem das linhas"""
+    columns = [
+        native_column(df_questoes[column], default) if column in df_questoes.columns
+        else [default] * len(df_questoes)
+        for _, column, default in ITEM_FIELDS
+    ]
+    return tuple(map(CatalogItem._make, zip(item_ids, range(len(df_questoes)), *columns)))
+
+
+def stable_item_ids(keys):
+    """IDs estáveis dos itens (sistema/ano/número da questão); repetições ganham sufixo #n"""
+    seen = {}
+    item_ids = []
+    for key in keys:
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        item_ids.append(key if count == 0 else f"{key}#{count}")
+    return item_ids
+
+
+class SharedCatalog:
+    """Catálogo de questões somente leitura, mantido uma vez por processo
+
+    As sessões não copiam o DataFrame: trabalham com posições de linha (as mesmas
+    de FacetIndex e SearchIndex). Os itens são convertidos uma única vez em
+    registros com valores nativos (CatalogItem), e exibir ou salvar um item é só
+    leitura de atributos. Derivados como as chaves dos itens também são
+    calculados uma vez e compartilhados.
+    """
+
+    def __init__(self, df_questoes):
+        # Usado apenas para construir os índices; tratado como somente leitura
+        self.frame = df_questoes
+        self.size = len(df_questoes)
+        self.columns = tuple(df_questoes.columns)
+        self._lock = threading.Lock()
+        self._item_keys = {}
+        # Registros nativos de todos os itens, por posição e por ID estável
+        keys = self.item_keys(NUMBER_KEY)
+        item_ids = stable_item_ids(keys.tolist() if keys is not None else map(str, range(self.size)))
+        self.items = build_items(df_questoes, item_ids)
+        self._by_id = {item.item_id: item for item in self.items}
+
+    def __len__(self):
+        return self.size
+
+    def item(self, position):
+        """Item (CatalogItem) na posição informada"""
+        return self.items[position]
+
+    def item_by_id(self, item_id):
+        """Item pelo ID estável (None se não existir nesta versão do catálogo)"""
+        return self._by_id.get(item_id)
+
+    def item_keys(self, key_spec):
+        """Chaves dos itens para a especificação (None se faltar coluna no catálogo)"""
+        if key_spec is None:
+            return None
+        with self._lock:
+            if key_spec in self._item_keys:
+                return self._item_keys[key_spec]
+        keys = None
+        if all(catalog_col in self.columns for _, catalog_col in key_spec):
+            keys = build_item_keys(self.frame, key_spec)
+            keys.flags.writeable = False
+        with self._lock:
+            return self._item_keys.setdefault(key_spec, keys)
+
+
+# Uma edição do índice (sistema/ano) e o CSV preparado correspondente
+CatalogPartition = namedtuple('CatalogPartition', ['sistema', 'ano', 'path'])
+
+
+def load_shared_catalog(csv_path):
+    """Carrega o CSV da campanha e monta o SharedCatalog (sem depender do Streamlit)"""
+    return SharedCatalog(split_questions(load_catalog(csv_path)))
+
+
+def partition_label(partition):
+    """Rótulo exibido para a campanha (ex.: "Chile 2025")"""
+    return f"{str(partition.sistema).replace('_', ' ').title()} {partition.ano}"
+
+
+def _partition_from_contents(path):
+    """Lê sistema/ano da primeira linha do CSV (para arquivos fora do padrão de nome)"""
+    try:
+        first = pd.read_csv(path, nrows=1, usecols=['sistema', 'ano'], dtype=str)
+        if first.empty or first.isna().any(axis=None):
+            return None
+        # Ano não numérico (ou "inf"): o arquivo não é um catálogo preparado
+        ano = int(float(first['ano'].iloc[0]))
+    except (ValueError, OverflowError, OSError, pd.errors.ParserError):
+        return None
+    return CatalogPartition(first['sistema'].iloc[0].strip(), ano, path)
+
+
+def discover_partitions(data_dir=DEFAULT_DATA_DIR):
+    """Lista os catálogos preparados da pasta, um por sistema/ano (sem carregar os dados)
+
+    O sistema e o ano vêm do nome do arquivo; arquivos fora do padrão têm só a
+    primeira linha lida. Em caso de duplicidade vale o primeiro arquivo em ordem
+    alfabética.
+    """
+    partitions = {}
+    for path in sorted(Path(data_dir).glob("*.csv")):
+        match = PARTITION_FILE_PATTERN.match(path.name)
+        if match:
+            partition = CatalogPartition(match.group('sistema'), int(match.group('ano')), path)
+        else:
+            partition = _partition_from_contents(path)
+        if partition is not None:
+            partitions.setdefault((partition.sistema, partition.ano), partition)
+    # Edições mais recentes primeiro
+    return sorted(partitions.values(), key=lambda p: (-p.ano, p.sistema))
@@ -0,0 +1,310 @@
+"""Exportação das validações para CSV ou Parquet particionado, lendo a planilha em blocos
+
+Uso (a partir da raiz do repositório, com as credenciais em .streamlit/secrets.toml):
+
+    python -m export --format csv --output validacoes.csv
+    python -m export --format parquet --output validacoes_parquet/
+    python -m export --format csv --output - --chunk-rows 500      # CSV na saída padrão
+
+A worksheet é lida em faixas de ``--chunk-rows`` linhas e cada bloco é gravado
+antes do próximo ser lido, de modo que a memória não cresce com a planilha.
+"""
+import argparse
+import csv
+import io
+import shutil
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from sheets_io import column_letter, records_from_values
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow acompanha o Streamlit
+    pa = None
+    pq = None
+
+# Linhas lidas da planilha por requisição
+DEFAULT_CHUNK_ROWS = 1000
+
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+
+# Colunas que definem as pastas do Parquet particionado (sistema=.../ano=.../usuario=...)
+PARTITION_COLUMNS = ('sistema', 'ano', 'usuario')
+
+# Pasta usada para valores vazios da partição (mesmo nome do Hive/pyarrow)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Colunas numéricas no Parquet; as demais são gravadas como texto
+INTEGER_COLUMNS = ('ano',)
+FLOAT_COLUMNS = ('pontuacao_maxima_dimensao', 'pontuacao_maxima_capacidade_chave')
+
+DEFAULT_WORKSHEET = "Validações_Streamlit"
+DEFAULT_SECRETS_PATH = Path(".streamlit/secrets.toml")
+
+
+# Função para converter tipos numpy/pandas para tipos Python nativos
+def convert_to_native_types(obj):
+    """Converte tipos numpy/pandas para tipos Python nativos (JSON serializáveis)"""
+    try:
+        if obj is None:
+            return None
+        elif isinstance(obj, (np.integer, np.int64, np.int32, np.int16, np.int8)):
+            return int(obj)
+        elif isinstance(obj, (np.floating, np.float64, np.float32, np.float16)):
+            if pd.isna(obj) or np.isnan(obj):
+                return None
+            return float(obj)
+        elif isinstance(obj, np.bool_):
+            return bool(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        elif isinstance(obj, dict):
+            return {str(key): convert_to_native_types(value) for key, value in obj.items()}
+        elif isinstance(obj, (list, tuple)):
+            return [convert_to_native_types(item) for item in obj]
+        elif pd.isna(obj):
+            return None
+        elif isinstance(obj, str):
+            return str(obj)
+        else:
+            return str(obj) if obj else None
+    except Exception as e:
+        return None
+
+
+def _native_value(value):
+    # Valores já nativos (saída de numericise) são mantidos; NaN vira None
+    kind = type(value)
+    if kind is str or kind is int or kind is bool:
+        return value
+    if kind is float:
+        return None if value != value else value
+    return convert_to_native_types(value)
+
+
+def native_record(record):
+    """Registro com valores nativos do Python (tipos numpy/pandas pelas regras de convert_to_native_types)"""
+    return {str(key): _native_value(value) for key, value in record.items()}
+
+
+# --- Leitura em blocos -------------------------------------------------------
+
+def iter_worksheet_ranges(worksheet, chunk_rows=DEFAULT_CHUNK_ROWS, start_row=2, header=None):
+    """(última linha da faixa, registros) da worksheet, em faixas de até ``chunk_rows`` linhas
+
+    Os valores recebem a mesma conversão de get_all_records() e depois a de
+    native_record. A leitura termina no fim da grade ou no primeiro bloco
+    totalmente vazio (linhas em branco após os dados). ``start_row`` permite
+    retomar uma leitura interrompida.
+
+    Sem ``header``, a linha 1 é o cabeçalho; com ``header`` (worksheets sem
+    cabeçalho, como a da versão original), as colunas são mapeadas pela posição
+    e a leitura pode começar na linha 1.
+    """
+    if header is None:
+        header = worksheet.row_values(1)
+        first_row = 2
+    else:
+        header = list(header)
+        first_row = 1
+    if not header:
+        return
+    last_col = column_letter(len(header))
+    last_row = worksheet.row_count
+    start = max(start_row, first_row)
+    while start <= last_row:
+        end = min(start + chunk_rows - 1, last_row)
+        rows = [row for row in worksheet.get(f"A{start}:{last_col}{end}") if any(str(v) != "" for v in row)]
+        if not rows:
+            return
+        yield end, [native_record(record) for record in records_from_values(header, rows)]
+        start = end + 1
+
+
+def iter_worksheet_chunks(worksheet, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Blocos de registros da worksheet, lidos em faixas de até ``chunk_rows`` linhas"""
+    for _, records in iter_worksheet_ranges(worksheet, chunk_rows):
+        yield records
+
+
+def iter_dataframe_chunks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Blocos de registros de um DataFrame já carregado (backends SQLite e memória)"""
+    for start in range(0, len(df), chunk_rows):
+        yield [native_record(record) for record in df.iloc[start:start + chunk_rows].to_dict('records')]
+
+
+# --- Gravação ----------------------------------------------------------------
+
+def write_csv(chunks, output):
+    """Grava os blocos em CSV (caminho ou arquivo texto aberto); retorna o número de linhas"""
+    owns_file = not hasattr(output, 'write')
+    f = open(output, 'w', newline='', encoding='utf-8') if owns_file else output
+    writer = None
+    total = 0
+    try:
+        for records in chunks:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(records[0].keys()), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerows(records)
+            total += len(records)
+    finally:
+        if owns_file:
+            f.close()
+    return total
+
+
+def _partition_dir(values):
+    return Path(*(
+        f"{column}={quote(str(value), safe='') if value not in (None, '') else NULL_PARTITION}"
+        for column, value in values
+    ))
+
+
+def _arrow_column(name, values):
+    if name in INTEGER_COLUMNS:
+        return pa.array(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('Int64'), type=pa.int64())
+    if name in FLOAT_COLUMNS:
+        return pa.array(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce'), type=pa.float64())
+    return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def write_partitioned_parquet(chunks, output_dir, partition_columns=PARTITION_COLUMNS):
+    """Grava os blocos em Parquet particionado por pastas coluna=valor; retorna o número de linhas
+
+    Cada partição tem um único arquivo, aberto na primeira linha e acrescido de um
+    row group por bloco. As colunas de partição ficam apenas no caminho (como em
+    pyarrow.dataset com partitioning="hive").
+    """
+    if pq is None:
+        raise RuntimeError("pyarrow é necessário para exportar em Parquet")
+    output_dir = Path(output_dir)
+    writers = {}
+    columns = None
+    total = 0
+    try:
+        for records in chunks:
+            if columns is None:
+                partition_columns = [c for c in partition_columns if c in records[0]]
+                columns = [c for c in records[0] if c not in partition_columns]
+                schema = pa.schema([(c, _arrow_column(c, []).type) for c in columns])
+            groups = {}
+            for record in records:
+                key = tuple((c, record.get(c)) for c in partition_columns)
+                groups.setdefault(key, []).append(record)
+            for key, group in groups.items():
+                writer = writers.get(key)
+                if writer is None:
+                    path = output_dir / _partition_dir(key) / "part-0.parquet"
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    writer = writers[key] = pq.ParquetWriter(str(path), schema)
+                writer.write_table(pa.table(
+                    [_arrow_column(c, [r.get(c) for r in group]) for c in columns], schema=schema
+                ))
+            total += len(records)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return total
+
+
+def export_validations(chunks, output, fmt=FORMAT_CSV):
+    """Grava os blocos no formato pedido ('csv' ou 'parquet'); retorna o número de linhas"""
+    if fmt == FORMAT_CSV:
+        return write_csv(chunks, output)
+    if fmt == FORMAT_PARQUET:
+        return write_partitioned_parquet(chunks, output)
+    raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+
+
+def export_to_bytes(chunks, fmt=FORMAT_CSV):
+    """Exporta para um arquivo temporário e devolve (bytes, nome do arquivo) para download
+
+    O Parquet particionado é compactado em um .zip com a estrutura de pastas.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        if fmt == FORMAT_CSV:
+            path = Path(workdir) / "validacoes.csv"
+            export_validations(chunks, path, fmt)
+            return path.read_bytes(), path.name
+        export_validations(chunks, Path(workdir) / "validacoes", fmt)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for path in sorted((Path(workdir) / "validacoes").rglob("*.parquet")):
+                archive.write(path, path.relative_to(workdir))
+        return buffer.getvalue(), "validacoes_parquet.zip"
+
+
+# --- Linha de comando --------------------------------------------------------
+
+def sheet_id_from_secrets(secrets):
+    """ID da planilha nos secrets (mesmas chaves de get_sheet_id); None se ausente"""
+    if 'google_sheets' in secrets and 'google_sheets_id' in secrets['google_sheets']:
+        return secrets['google_sheets']['google_sheets_id']
+    return secrets.get('google_sheets_id') or secrets.get('sheet_id')
+
+
+def authorize_from_secrets(secrets, scopes):
+    """Cliente gspread com a conta de serviço dos secrets (sem o Streamlit)"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    from sheets_quota import SheetsRequestScheduler
+
+    credentials = Credentials.from_service_account_info(secrets['gcp_service_account'], scopes=scopes)
+    # Mesmas cotas e novas tentativas da aplicação
+    return SheetsRequestScheduler().wrap_client(gspread.authorize(credentials))
+
+
+def open_worksheet_from_secrets(secrets_path, worksheet_name, sheet_id=None):
+    """Abre a worksheet (somente leitura) com a conta de serviço do secrets.toml"""
+    import toml
+
+    secrets = toml.load(secrets_path)
+    sheet_id = sheet_id or sheet_id_from_secrets(secrets)
+    if not sheet_id:
+        raise ValueError(f"ID da planilha não encontrado em {secrets_path}; use --sheet-id")
+    client = authorize_from_secrets(secrets, ['https://www.googleapis.com/auth/spreadsheets.readonly'])
+    return client.open_by_key(sheet_id).worksheet(worksheet_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=[FORMAT_CSV, FORMAT_PARQUET], default=FORMAT_CSV)
+    parser.add_argument('--output', required=True,
+                        help="arquivo CSV (ou - para a saída padrão) ou pasta do Parquet particionado")
+    parser.add_argument('--worksheet', default=DEFAULT_WORKSHEET)
+    parser.add_argument('--sheet-id', help="ID da planilha (padrão: o dos secrets)")
+    parser.add_argument('--secrets', default=str(DEFAULT_SECRETS_PATH))
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--overwrite', action='store_true', help="apaga a pasta do Parquet se já existir")
+    args = parser.parse_args(argv)
+
+    if args.format == FORMAT_PARQUET:
+        if args.output == '-':
+            parser.error("o Parquet particionado precisa de uma pasta em --output")
+        output = Path(args.output)
+        if output.exists() and any(output.iterdir()):
+            if not args.overwrite:
+                parser.error(f"{output} já existe e não está vazia (use --overwrite)")
+            shutil.rmtree(output)
+    else:
+        output = sys.stdout if args.output == '-' else args.output
+
+    worksheet = open_worksheet_from_secrets(args.secrets, args.worksheet, args.sheet_id)
+    total = export_validations(iter_worksheet_chunks(worksheet, args.chunk_rows), output, args.format)
+    print(f"{total} validações exportadas para {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Colunas usadas nos filtros da barra lateral
+DIMENSION_COLUMN = 'Dimensao'
+CAPABILITY_COLUMN = 'Capacidade_Chave'
+
+_EMPTY_IDS = np.array([], dtype=np.intp)
+
+
+def _group_positions(codes, n_groups):
+    """Posições (ordenadas) das linhas de cada código, em uma única ordenação"""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=n_groups))[:-1]
+    return np.split(order.astype(np.intp), bounds)
+
+
+def _factorize(series):
+    """Códigos inteiros e valores distintos ('' e NaN viram o mesmo valor vazio)"""
+    values = series.astype(object).where(series.notna(), '')
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes.astype(np.intp), [str(u) for u in uniques]
+
+
+class FacetIndex:
+    """Índice de facetas (dimensão → capacidades chave) do catálogo de questões
+
+    Construído uma vez por versão do catálogo. Os IDs de linha são posições em
+    df_questoes (para uso com ``iloc``); filtrar por dimensão e capacidade é a
+    interseção de dois arrays ordenados, sem copiar o DataFrame.
+    """
+
+    def __init__(self, df_questoes, dimension_column=DIMENSION_COLUMN, capability_column=CAPABILITY_COLUMN):
+        self.size = len(df_questoes)
+        self.all_ids = np.arange(self.size, dtype=np.intp)
+
+        self._dimension_codes, dimension_values = _factorize(df_questoes[dimension_column])
+        self._capability_codes, capability_values = _factorize(df_questoes[capability_column])
+        self._dimension_values = dimension_values
+        self._capability_values = capability_values
+
+        self._dimension_ids = dict(zip(dimension_values, _group_positions(self._dimension_codes, len(dimension_values))))
+        self._capability_ids = dict(zip(capability_values, _group_positions(self._capability_codes, len(capability_values))))
+
+        # Capacidades de cada dimensão (pares distintos dimensão/capacidade)
+        pairs = np.unique(np.stack([self._dimension_codes, self._capability_codes], axis=1), axis=0) if self.size else []
+        capabilities_by_dimension = {}
+        for dimension_code, capability_code in pairs:
+            capabilities_by_dimension.setdefault(dimension_values[dimension_code], set()).add(
+                capability_values[capability_code]
+            )
+        self._capabilities_by_dimension = {
+            dimension: sorted(c for c in capabilities if c)
+            for dimension, capabilities in capabilities_by_dimension.items()
+        }
+
+        self.dimensions = sorted(d for d in dimension_values if d)
+        self.all_capabilities = sorted(c for c in capability_values if c)
+
+    def capabilities(self, dimension=''):
+        """Capacidades chave (ordenadas) da dimensão; todas se a dimensão for vazia"""
+        if not dimension:
+            return self.all_capabilities
+        return self._capabilities_by_dimension.get(dimension, [])
+
+    def item_count(self, dimension='', capability=''):
+        """Quantidade de questões com a dimensão e/ou capacidade informadas"""
+        return len(self.row_ids(dimension, capability))
+
+    def row_ids(self, dimension='', capability=''):
+        """Posições ordenadas das questões que atendem aos filtros (vazio = sem filtro)"""
+        if dimension:
+            ids = self._dimension_ids.get(dimension, _EMPTY_IDS)
+            if capability:
+                ids = np.intersect1d(ids, self._capability_ids.get(capability, _EMPTY_IDS), assume_unique=True)
+            return ids
+        if capability:
+            return self._capability_ids.get(capability, _EMPTY_IDS)
+        return self.all_ids
+
+    def counts(self, row_ids):
+        """Quantidade de dimensões e capacidades chave distintas (não vazias) entre as linhas"""
+        return {
+            DIMENSION_COLUMN: self._distinct(self._dimension_codes, self._dimension_values, row_ids),
+            CAPABILITY_COLUMN: self._distinct(self._capability_codes, self._capability_values, row_ids),
+        }
+
+    @staticmethod
+    def _distinct(codes, values, row_ids):
+        present = np.bincount(codes[row_ids], minlength=len(values)) > 0
+        return int(sum(1 for value, found in zip(values, present) if found and value))
@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+# Caminho padrão do log local de avaliações
+DEFAULT_LOG_PATH = Path("validations/log_validacoes.sqlite3")
+
+# Coluna com o identificador idempotente de cada avaliação
+RECORD_ID_COLUMN = 'record_id'
+
+# Tempo (segundos) que uma entrada fica reservada para um sincronizador
+DEFAULT_CLAIM_SECONDS = 60
+
+
+class ValidationLog:
+    """Log local append-only das avaliações (SQLite em modo WAL)
+
+    É o primeiro destino de toda gravação: a avaliação recebe um record_id, é
+    persistida com fsync e só depois replicada para o Google Sheets. Entradas
+    ainda não sincronizadas continuam contando como validadas.
+    """
+
+    def __init__(self, path=DEFAULT_LOG_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS log_validacoes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                record_id TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                synced_at REAL,
+                claimed_by TEXT,
+                claimed_until REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_log_validacoes_pendentes ON log_validacoes (synced_at, seq)"
+        )
+
+    def append(self, validation_data):
+        """Grava a avaliação no log e retorna o record_id atribuído"""
+        record_id = validation_data.get(RECORD_ID_COLUMN) or uuid.uuid4().hex
+        payload = dict(validation_data)
+        payload[RECORD_ID_COLUMN] = record_id
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO log_validacoes (record_id, payload, created_at) VALUES (?, ?, ?)",
+                (record_id, json.dumps(payload, ensure_ascii=False, default=str), time.time()),
+            )
+        return record_id
+
+    def claim_unsynced(self, owner, limit=200, claim_seconds=DEFAULT_CLAIM_SECONDS):
+        """Reserva até ``limit`` entradas não sincronizadas para o sincronizador informado"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT seq, payload FROM log_validacoes
+                    WHERE synced_at IS NULL AND (claimed_until IS NULL OR claimed_until < ? OR claimed_by = ?)
+                    ORDER BY seq LIMIT ?
+                    """,
+                    (now, owner, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE log_validacoes SET claimed_by = ?, claimed_until = ? WHERE seq = ?",
+                    [(owner, now + claim_seconds, seq) for seq, _ in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [json.loads(payload) for _, payload in rows]
+
+    def mark_synced(self, record_ids):
+        """Marca as entradas como replicadas no Google Sheets"""
+        if not record_ids:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE log_validacoes SET synced_at = ?, claimed_by = NULL, claimed_until = NULL WHERE record_id = ?",
+                [(now, record_id) for record_id in record_ids],
+            )
+
+    def release_claims(self, record_ids):
+        """Libera a reserva das entradas (outro sincronizador pode assumi-las de imediato)"""
+        if not record_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE log_validacoes SET claimed_by = NULL, claimed_until = NULL "
+                "WHERE record_id = ? AND synced_at IS NULL",
+                [(record_id,) for record_id in record_ids],
+            )
+
+    def records(self, unsynced_only=False):
+        """Lista as avaliações do log (opcionalmente só as não sincronizadas)"""
+        query = "SELECT payload FROM log_validacoes"
+        if unsynced_only:
+            query += " WHERE synced_at IS NULL"
+        query += " ORDER BY seq"
+        with self._lock:
+            rows = self._conn.execute(query).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def counts(self):
+        """Total de entradas e quantas ainda aguardam sincronização"""
+        with self._lock:
+            total, unsynced = self._conn.execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(synced_at) FROM log_validacoes"
+            ).fetchone()
+        return {'total': total, 'unsynced': unsynced or 0}
+
+    def merge_with(self, remote_df, offline=False):
+        """Combina o snapshot remoto com as avaliações locais ainda não replicadas
+
+        Offline, todas as avaliações do log são usadas (o snapshot remoto é o último
+        lido antes de a conexão cair e pode não ter as já sincronizadas); online,
+        apenas as não sincronizadas que ainda não aparecem na planilha.
+        """
+        local = self.records(unsynced_only=not offline)
+        if not local:
+            return remote_df
+        local_df = pd.DataFrame(local)
+        if remote_df is None or remote_df.empty:
+            return local_df
+        if RECORD_ID_COLUMN in remote_df.columns:
+            remote_ids = set(remote_df[RECORD_ID_COLUMN].astype(str))
+            local_df = local_df[~local_df[RECORD_ID_COLUMN].isin(remote_ids)]
+            if local_df.empty:
+                return remote_df
+        return pd.concat([remote_df, local_df], ignore_index=True, sort=False)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_owner():
+    """Identificador do sincronizador deste processo"""
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
@@ -0,0 +1,309 @@
+"""Migração das validações da versão original (app.py) para o formato atual
+
+A versão original grava um registro de 15 colunas na worksheet "Validações" da
+planilha "Validações Índice Inovação" (aberta pelo nome); a atual grava 24 colunas
+em "Validações_Streamlit" (planilha aberta pelo ID). Uso (a partir da raiz do
+repositório, com as credenciais em .streamlit/secrets.toml):
+
+    python -m migrate_legacy --dry-run      # relatório, sem gravar nada
+    python -m migrate_legacy                # migra, retomando de onde parou
+    python -m migrate_legacy --restart      # ignora o checkpoint e começa do início
+
+A versão original nunca grava cabeçalho (só append_row dos valores), então as
+colunas da worksheet antiga são mapeadas pela posição (LEGACY_COLUMNS); a linha 1
+só é tratada como cabeçalho se tiver exatamente esses nomes.
+
+A worksheet antiga é lida em faixas de linhas; registros cuja chave de
+check_existing_validation (usuário, sistema, ano, número da questão) já existe
+no destino, ou que se repetem na origem, são ignorados. As gravações são feitas
+em lotes com append_rows, e o checkpoint guarda a próxima linha a ler.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+
+from export import (DEFAULT_CHUNK_ROWS, DEFAULT_SECRETS_PATH, authorize_from_secrets, iter_worksheet_chunks,
+                    iter_worksheet_ranges, sheet_id_from_secrets)
+from local_log import RECORD_ID_COLUMN
+from pending_items import KEY_SEPARATOR, NUMBER_KEY, normalize_key_value
+from sheets_io import build_row, ensure_header_column
+
+# Origem (app.py) e destino (streamlit_app.py)
+LEGACY_SPREADSHEET = "Validações Índice Inovação"
+LEGACY_WORKSHEET = "Validações"
+TARGET_WORKSHEET = "Validações_Streamlit"
+
+# Progresso da migração (próxima linha da origem e contadores)
+DEFAULT_CHECKPOINT_PATH = Path("validations/migracao_app_py.json")
+
+# Linhas enviadas por chamada append_rows
+DEFAULT_BATCH_SIZE = 500
+
+# Colunas gravadas por streamlit_app.py, na mesma ordem
+CURRENT_COLUMNS = (
+    'timestamp', 'usuario', 'sistema', 'ano', 'dimensao', 'pontuacao_maxima_dimensao',
+    'capacidade_chave', 'pontuacao_maxima_capacidade_chave', 'nome_variavel', 'numero_questao',
+    'texto_questao', 'respuesta', 'pontuacao_maxima_questao', 'pontuacao_item',
+    'adequacao_realidade_brasileira', 'justificativa_adequacao', 'grau_relevancia',
+    'tem_norma_exigente', 'detalhes_norma', 'tem_base_dados_publica', 'link_base_dados',
+    'tem_organismo_exigente', 'qual_organismo', 'comentario',
+)
+
+# Colunas gravadas por app.py (save_validation_to_sheets), na ordem da linha
+LEGACY_COLUMNS = (
+    'timestamp', 'usuario', 'sistema', 'ano', 'dimensao_padrao', 'subdimensao', 'questao',
+    'elemento', 'nivel', 'tipo_elemento', 'texto_completo', 'status', 'comentario',
+    'novo_item', 'texto_novo_item',
+)
+
+# Coluna do registro antigo → coluna atual (na hierarquia antiga o item é o elemento)
+LEGACY_FIELD_MAP = {
+    'timestamp': 'timestamp',
+    'usuario': 'usuario',
+    'sistema': 'sistema',
+    'ano': 'ano',
+    'dimensao_padrao': 'dimensao',
+    'subdimensao': 'capacidade_chave',
+    'questao': 'nome_variavel',
+    'elemento': 'numero_questao',
+    'texto_completo': 'texto_questao',
+    'comentario': 'comentario',
+}
+
+# Status antigo → adequação à realidade brasileira
+LEGACY_STATUS_MAP = {
+    'Aprovar': 'Sim',
+    'Reprovar': 'Não',
+    'Sugerir Redação': 'Em partes',
+    'Incluir Novo Item': '',
+}
+
+# Chave de check_existing_validation: usuário + (sistema, ano, numero_questao)
+KEY_COLUMNS = ('usuario',) + tuple(sheet_col for sheet_col, _ in NUMBER_KEY)
+
+
+def record_key(record):
+    """Chave de deduplicação do registro no formato atual"""
+    return KEY_SEPARATOR.join(normalize_key_value(record.get(column)) for column in KEY_COLUMNS)
+
+
+def legacy_record_id(record):
+    """record_id determinístico do registro antigo (a mesma linha gera sempre o mesmo ID)"""
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+    return "legacy-" + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def _is_true(value):
+    return str(value).strip().lower() in ('true', '1', 'sim', 'verdadeiro')
+
+
+def map_legacy_record(record):
+    """Converte um registro de app.py para as colunas de streamlit_app.py"""
+    mapped = {column: '' for column in CURRENT_COLUMNS}
+    for legacy_column, column in LEGACY_FIELD_MAP.items():
+        value = record.get(legacy_column)
+        mapped[column] = '' if value is None else value
+
+    status = str(record.get('status') or '').strip()
+    mapped['adequacao_realidade_brasileira'] = LEGACY_STATUS_MAP.get(status, '')
+    if status and status != 'Aprovar':
+        mapped['justificativa_adequacao'] = f"Status na versão original: {status}"
+    if _is_true(record.get('novo_item')) and record.get('texto_novo_item'):
+        novo_item = f"Novo item sugerido: {record['texto_novo_item']}"
+        mapped['comentario'] = f"{mapped['comentario']}\n{novo_item}" if mapped['comentario'] else novo_item
+
+    mapped[RECORD_ID_COLUMN] = legacy_record_id(record)
+    return mapped
+
+
+def load_checkpoint(path):
+    """Estado salvo da migração (None se não houver)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_checkpoint(path, state):
+    """Grava o estado da migração (troca atômica do arquivo)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class LegacyMigration:
+    """Migra a worksheet antiga para a atual em faixas de leitura e lotes de gravação
+
+    As chaves já existentes no destino são lidas uma vez (também em faixas). Após
+    cada lote gravado, o checkpoint avança para a linha seguinte à última faixa
+    lida; se a execução for interrompida entre a gravação e o checkpoint, os
+    registros já gravados são reconhecidos pela chave ao retomar.
+    """
+
+    def __init__(self, legacy_worksheet, target_worksheet, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+                 batch_size=DEFAULT_BATCH_SIZE, chunk_rows=DEFAULT_CHUNK_ROWS, dry_run=False):
+        self.legacy_worksheet = legacy_worksheet
+        self.target_worksheet = target_worksheet
+        self.checkpoint_path = Path(checkpoint_path)
+        self.batch_size = batch_size
+        self.chunk_rows = chunk_rows
+        self.dry_run = dry_run
+        # next_row None: a primeira linha de dados depende de a origem ter cabeçalho
+        self.state = {'next_row': None, 'read': 0, 'written': 0, 'existing': 0, 'duplicates': 0, 'invalid': 0}
+        self.unknown_status = Counter()
+        self.by_user = Counter()
+
+    def resume(self):
+        """Continua a partir do checkpoint salvo, se houver"""
+        saved = load_checkpoint(self.checkpoint_path)
+        if saved:
+            self.state.update(saved)
+
+    def _target_headers(self):
+        headers = self.target_worksheet.row_values(1)
+        if self.dry_run:
+            return headers or list(CURRENT_COLUMNS) + [RECORD_ID_COLUMN]
+        if not headers:
+            headers = list(CURRENT_COLUMNS) + [RECORD_ID_COLUMN]
+            self.target_worksheet.append_row(headers)
+        return ensure_header_column(self.target_worksheet, headers, RECORD_ID_COLUMN)
+
+    def _legacy_first_row(self):
+        """Primeira linha de dados da origem: 2 se a linha 1 for o cabeçalho de LEGACY_COLUMNS, senão 1"""
+        first = [str(value).strip() for value in self.legacy_worksheet.row_values(1)]
+        return 2 if first == list(LEGACY_COLUMNS) else 1
+
+    def _existing_keys(self):
+        keys = set()
+        for records in iter_worksheet_chunks(self.target_worksheet, self.chunk_rows):
+            keys.update(record_key(record) for record in records)
+        return keys
+
+    def _flush(self, headers, pending, next_row):
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            if not self.dry_run:
+                self.target_worksheet.append_rows([build_row(headers, record) for record in batch])
+            self.state['written'] += len(batch)
+        pending.clear()
+        self.state['next_row'] = next_row
+        if not self.dry_run:
+            save_checkpoint(self.checkpoint_path, self.state)
+
+    def run(self):
+        """Executa a migração (ou a simulação); retorna o relatório"""
+        headers = self._target_headers()
+        keys = self._existing_keys()
+        target_keys = frozenset(keys)
+        pending = []
+        next_row = self.state['next_row'] or self._legacy_first_row()
+
+        for end_row, records in iter_worksheet_ranges(self.legacy_worksheet, self.chunk_rows, next_row,
+                                                      header=LEGACY_COLUMNS):
+            for record in records:
+                self.state['read'] += 1
+                mapped = map_legacy_record(record)
+                status = str(record.get('status') or '').strip()
+                if status not in LEGACY_STATUS_MAP:
+                    self.unknown_status[status] += 1
+                if not normalize_key_value(mapped['usuario']):
+                    self.state['invalid'] += 1
+                    continue
+                key = record_key(mapped)
+                if key in keys:
+                    # Mesma regra de check_existing_validation: vale a primeira avaliação
+                    self.state['existing' if key in target_keys else 'duplicates'] += 1
+                    continue
+                keys.add(key)
+                self.by_user[mapped['usuario']] += 1
+                pending.append(mapped)
+            next_row = end_row + 1
+            if len(pending) >= self.batch_size:
+                self._flush(headers, pending, next_row)
+
+        self._flush(headers, pending, next_row)
+        return self.report()
+
+    def report(self):
+        """Contadores da migração (no dry-run, 'written' é o que seria gravado)"""
+        return dict(
+            self.state,
+            dry_run=self.dry_run,
+            unknown_status=dict(self.unknown_status),
+            by_user=dict(self.by_user.most_common()),
+        )
+
+
+def format_report(report):
+    """Relatório legível da migração"""
+    verbo = "seriam migradas" if report['dry_run'] else "migradas"
+    lines = [
+        f"Linhas lidas da versão original: {report['read']}",
+        f"Avaliações {verbo}: {report['written']}",
+        f"Já existentes no destino: {report['existing']}",
+        f"Repetidas na origem: {report['duplicates']}",
+        f"Sem usuário (ignoradas): {report['invalid']}",
+    ]
+    if report['unknown_status']:
+        lines.append("Status desconhecidos: " + ", ".join(
+            f"{status or '(vazio)'} ({count})" for status, count in report['unknown_status'].items()
+        ))
+    for usuario, count in report['by_user'].items():
+        lines.append(f"  {usuario}: {count}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help="apenas relata o que seria migrado")
+    parser.add_argument('--restart', action='store_true', help="ignora o checkpoint e relê a origem do início")
+    parser.add_argument('--legacy-spreadsheet', default=LEGACY_SPREADSHEET, help="nome da planilha antiga")
+    parser.add_argument('--legacy-sheet-id', help="ID da planilha antiga (em vez do nome)")
+    parser.add_argument('--legacy-worksheet', default=LEGACY_WORKSHEET)
+    parser.add_argument('--sheet-id', help="ID da planilha atual (padrão: o dos secrets)")
+    parser.add_argument('--worksheet', default=TARGET_WORKSHEET)
+    parser.add_argument('--secrets', default=str(DEFAULT_SECRETS_PATH))
+    parser.add_argument('--checkpoint', default=str(DEFAULT_CHECKPOINT_PATH))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--report', help="grava o relatório em JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    import toml
+
+    secrets = toml.load(args.secrets)
+    sheet_id = args.sheet_id or sheet_id_from_secrets(secrets)
+    if not sheet_id:
+        parser.error(f"ID da planilha não encontrado em {args.secrets}; use --sheet-id")
+    client = authorize_from_secrets(secrets, [
+        'https://www.googleapis.com/auth/spreadsheets',
+        'https://www.googleapis.com/auth/drive',
+    ])
+    legacy = client.open_by_key(args.legacy_sheet_id) if args.legacy_sheet_id else client.open(args.legacy_spreadsheet)
+
+    migration = LegacyMigration(
+        legacy.worksheet(args.legacy_worksheet),
+        client.open_by_key(sheet_id).worksheet(args.worksheet),
+        checkpoint_path=args.checkpoint,
+        batch_size=args.batch_size,
+        chunk_rows=args.chunk_rows,
+        dry_run=args.dry_run,
+    )
+    if not args.restart:
+        migration.resume()
+    report = migration.run()
+
+    print(format_report(report))
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+# Separador entre as partes da chave (não aparece nos textos do catálogo)
+KEY_SEPARATOR = "\x1f"
+
+# Especificações de chave: pares (coluna na planilha de validações, coluna no catálogo)
+NUMBER_KEY = (
+    ('sistema', 'sistema'),
+    ('ano', 'ano'),
+    ('numero_questao', 'Numero_Questao'),
+)
+
+# Fallback usado quando a planilha não tem a coluna numero_questao
+TEXT_KEY = (
+    ('sistema', 'sistema'),
+    ('texto_questao', 'Texto_Questao'),
+)
+
+# Chave da versão original (app.py)
+LEGACY_KEY = (
+    ('sistema', 'sistema'),
+    ('ano', 'ano'),
+    ('dimensao_padrao', 'dimensao_padrao'),
+    ('subdimensao', 'subdimensao'),
+    ('questao', 'questao'),
+    ('elemento', 'elemento'),
+)
+
+ValidationIndex = namedtuple('ValidationIndex', ['key_spec', 'keys'])
+
+EMPTY_INDEX = ValidationIndex(None, frozenset())
+
+
+def normalize_key_value(value):
+    """Normaliza um valor de chave para string (2025, 2025.0 e '2025' viram '2025')"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    try:
+        if pd.isna(value):
+            return ''
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    try:
+        as_float = float(value)
+        if as_float.is_integer():
+            return str(int(as_float))
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return str(value).strip()
+
+
+def _key_series(df, columns):
+    """Monta a série de chaves compostas de um DataFrame em uma única passada"""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    # Em colunas categóricas o map normaliza apenas as categorias; astype volta a texto
+    parts = [df[column].map(normalize_key_value).astype(object) for column in columns]
+    keys = parts[0]
+    for part in parts[1:]:
+        keys = keys + KEY_SEPARATOR + part
+    return keys
+
+
+def build_validation_index(validations_df, usuario, key_specs=(NUMBER_KEY, TEXT_KEY)):
+    """Constrói o índice (hash) das chaves já validadas pelo usuário em um snapshot"""
+    if validations_df is None or validations_df.empty or 'usuario' not in validations_df.columns:
+        return EMPTY_INDEX
+
+    # Primeira especificação cujas colunas existem na planilha (mesma prioridade de check_existing_validation)
+    key_spec = None
+    for spec in key_specs:
+        if all(sheet_col in validations_df.columns for sheet_col, _ in spec):
+            key_spec = spec
+            break
+    if key_spec is None:
+        return EMPTY_INDEX
+
+    user_rows = validations_df[validations_df['usuario'] == usuario]
+    keys = _key_series(user_rows, [sheet_col for sheet_col, _ in key_spec])
+    return ValidationIndex(key_spec, frozenset(keys.tolist()))
+
+
+def compute_pending_items(df_items, validation_index):
+    """Retorna, na ordem do catálogo, os índices dos itens ainda não validados (anti-join)"""
+    if df_items is None or df_items.empty:
+        return []
+    if validation_index.key_spec is None or not validation_index.keys:
+        return df_items.index.tolist()
+
+    catalog_columns = [catalog_col for _, catalog_col in validation_index.key_spec]
+    if not all(column in df_items.columns for column in catalog_columns):
+        return df_items.index.tolist()
+
+    item_keys = _key_series(df_items, catalog_columns)
+    pending_mask = ~item_keys.isin(validation_index.keys)
+    return df_items.index[pending_mask.to_numpy()].tolist()
+
+
+def build_item_keys(df_items, key_spec):
+    """Chaves compostas dos itens do catálogo (array na ordem das linhas) para a especificação de chave"""
+    return _key_series(df_items, [catalog_col for _, catalog_col in key_spec]).to_numpy()
+
+
+def build_validation_keys(validations_df, key_spec):
+    """Chaves compostas das avaliações (lista na ordem das linhas), pelas colunas da planilha"""
+    return _key_series(validations_df, [sheet_col for sheet_col, _ in key_spec]).tolist()
+
+
+def record_key(record, key_spec):
+    """Chave composta de uma avaliação (dicionário), com a mesma normalização de build_validation_keys"""
+    return KEY_SEPARATOR.join(normalize_key_value(record.get(sheet_col)) for sheet_col, _ in key_spec)
+
+
+def validation_key_spec(columns, key_specs=(NUMBER_KEY, TEXT_KEY)):
+    """Primeira especificação de chave cujas colunas existem nas avaliações (a primeira, se nenhuma)"""
+    columns = set(columns)
+    return next((spec for spec in key_specs if all(sheet_col in columns for sheet_col, _ in spec)), key_specs[0])
+
+
+def pending_positions(item_keys, row_ids, validation_index):
+    """Posições dentre ``row_ids`` (na mesma ordem) dos itens ainda não validados
+
+    ``item_keys`` são as chaves de todo o catálogo (build_item_keys), calculadas
+    uma vez por processo; só as posições da seleção são consultadas.
+    """
+    row_ids = np.asarray(row_ids, dtype=np.intp)
+    if item_keys is None or validation_index.key_spec is None or not validation_index.keys:
+        return row_ids
+    keys = validation_index.keys
+    pending_mask = np.fromiter((key not in keys for key in item_keys[row_ids]), dtype=bool, count=len(row_ids))
+    return row_ids[pending_mask]
@@ -0,0 +1,211 @@
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import marshal
+import pstats
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Arquivo JSONL com um registro por rerun
+DEFAULT_TRACE_PATH = Path("logs/perf_trace.jsonl")
+
+# Tamanho a partir do qual o trace é rotacionado (o anterior fica em <arquivo>.1)
+DEFAULT_TRACE_MAX_BYTES = 5 * 1024 * 1024
+
+# Trace do rerun em andamento (cada sessão do Streamlit roda o script na sua própria thread)
+_current_trace = contextvars.ContextVar('perf_current_trace', default=None)
+
+# Chamadas feitas fora de um rerun (flusher, sincronizador, renovador de token)
+_background = Counter()
+_background_bytes = 0
+_background_lock = threading.Lock()
+
+_trace_file_lock = threading.Lock()
+
+
+class RerunTrace:
+    """Spans de tempo e chamadas à API do Google Sheets de um único rerun (da página ou de um fragmento)"""
+
+    def __init__(self, session_id=None, fragment=None):
+        self.session_id = session_id
+        self.fragment = fragment
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self._depth = 0
+        self.spans = []
+        self.sheets_calls = Counter()
+        self.sheets_bytes = 0
+        self.total_s = None
+
+    def add_call(self, method, nbytes):
+        self.sheets_calls[method] += 1
+        self.sheets_bytes += nbytes
+
+    def finish(self):
+        self.total_s = time.perf_counter() - self._t0
+
+    def as_dict(self):
+        return {
+            'timestamp': self.started_at.isoformat(timespec='milliseconds'),
+            'session_id': self.session_id,
+            'fragment': self.fragment,
+            'total_s': self.total_s,
+            'spans': self.spans,
+            'sheets_calls': dict(self.sheets_calls),
+            'sheets_call_count': sum(self.sheets_calls.values()),
+            'sheets_bytes': self.sheets_bytes,
+        }
+
+
+def current_trace():
+    """Trace do rerun em andamento (ou None fora de um rerun instrumentado)"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name):
+    """Mede o bloco como um span nomeado do rerun atual"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    trace._depth += 1
+    try:
+        yield
+    finally:
+        trace._depth -= 1
+        trace.spans.append({
+            'name': name,
+            'start_s': round(start - trace._t0, 6),
+            'duration_s': round(time.perf_counter() - start, 6),
+            'depth': trace._depth,
+        })
+
+
+def timed(name):
+    """Decorador: registra cada chamada da função como um span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_sheets_call(method, nbytes):
+    """Contabiliza uma chamada à API no rerun atual (ou no total de segundo plano)"""
+    global _background_bytes
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_call(method, nbytes)
+        return
+    with _background_lock:
+        _background[method] += 1
+        _background_bytes += nbytes
+
+
+def background_calls():
+    """Chamadas feitas por threads em segundo plano desde o início do processo"""
+    with _background_lock:
+        return {'calls': dict(_background), 'bytes': _background_bytes}
+
+
+# Recursos e ações da API usados para nomear as chamadas sem IDs nem ranges
+_RESOURCES = ('spreadsheets', 'values', 'sheets', 'files', 'permissions')
+_ACTIONS = ('append', 'clear', 'batchGet', 'batchUpdate', 'batchClear', 'copyTo')
+
+
+def _operation_name(endpoint):
+    """Nome da operação (ex.: "values:batchGet", "values:append", "spreadsheets:batchUpdate")"""
+    parts = str(endpoint).split('?')[0].rstrip('/').split('/')
+    for i in range(len(parts) - 1, -1, -1):
+        base, _, action = parts[i].rpartition(':')
+        if action not in _ACTIONS:
+            base, action = parts[i], ''
+        if base in _RESOURCES:
+            return f"{base}:{action}" if action else base
+        if action and i > 0:
+            # ID da planilha ou range seguido de ação: usar o recurso anterior
+            return f"{parts[i - 1]}:{action}"
+    return parts[-1]
+
+
+def instrument_client(client):
+    """Intercepta as requisições HTTP do cliente gspread para contar chamadas e bytes"""
+    # gspread >= 6 concentra as requisições em client.http_client; versões anteriores em client.request
+    target = getattr(client, 'http_client', client)
+    original = getattr(target, 'request', None)
+    if original is None or getattr(original, '_perf_instrumented', False):
+        return client
+
+    @functools.wraps(original)
+    def request(method, endpoint, *args, **kwargs):
+        response = original(method, endpoint, *args, **kwargs)
+        content = getattr(response, 'content', b'') or b''
+        record_sheets_call(f"{method.upper()} {_operation_name(endpoint)}", len(content))
+        return response
+
+    request._perf_instrumented = True
+    target.request = request
+    return client
+
+
+def begin_rerun(session_id=None, fragment=None):
+    """Inicia o trace de um rerun (``fragment``: nome do fragmento reexecutado sozinho); retorna (trace, token)"""
+    trace = RerunTrace(session_id, fragment)
+    return trace, _current_trace.set(trace)
+
+
+def _rotate_trace(trace_path, max_bytes):
+    """Move o trace para <arquivo>.1 (substituindo o anterior) quando passar de max_bytes"""
+    try:
+        if max_bytes and trace_path.stat().st_size >= max_bytes:
+            trace_path.replace(trace_path.with_name(trace_path.name + '.1'))
+    except FileNotFoundError:
+        pass
+
+
+def end_rerun(trace, token, trace_path=DEFAULT_TRACE_PATH, max_bytes=DEFAULT_TRACE_MAX_BYTES):
+    """Finaliza o trace e o acrescenta ao arquivo JSONL (se informado)
+
+    O arquivo é rotacionado ao atingir ``max_bytes`` (0 desativa a rotação), de
+    modo que o disco ocupado fica limitado a cerca de duas vezes esse tamanho.
+    """
+    trace.finish()
+    _current_trace.reset(token)
+    if trace_path:
+        try:
+            trace_path = Path(trace_path)
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(trace.as_dict(), ensure_ascii=False)
+            with _trace_file_lock:
+                _rotate_trace(trace_path, max_bytes)
+                with open(trace_path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+        except OSError:
+            # O trace é diagnóstico; falha de disco não pode derrubar a página
+            pass
+    return trace
+
+
+def profile_call(func, *args, **kwargs):
+    """Executa a função sob cProfile; retorna (resultado, dump .prof, resumo em texto)"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    dump = marshal.dumps(profiler.stats)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(30)
+    return result, dump, summary.getvalue()
@@ -0,0 +1,163 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+
+# Campos indexados e seus pesos na ordenação dos resultados
+SEARCH_FIELDS = (
+    ('Texto_Questao', 3.0),
+    ('Nomble de la variable', 2.0),
+    ('Respuesta', 1.0),
+)
+
+# Bônus de um termo que casa com o token inteiro (em vez de apenas prefixo)
+EXACT_MATCH_BONUS = 2.0
+
+# Termos e consultas recentes mantidos em cache (cada rerun repete a busca atual)
+TERM_CACHE_SIZE = 256
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_EMPTY_IDS = np.array([], dtype=np.intp)
+_EMPTY_SCORES = np.array([], dtype=np.float64)
+
+
+def normalize_text(text):
+    """Minúsculas sem acentos ("Relevância" e "relevancia" viram "relevancia")"""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text):
+    """Tokens normalizados do texto"""
+    return _TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def _raw_tokens(text):
+    """Tokens em minúsculas, ainda com acentos (a remoção é feita uma vez por token distinto)"""
+    return _TOKEN_PATTERN.findall(unicodedata.normalize('NFC', str(text)).casefold())
+
+
+class SearchIndex:
+    """Índice invertido do catálogo para a busca por texto da barra lateral
+
+    Construído uma vez por versão do catálogo. Os IDs de linha são posições em
+    df_questoes (como no índice de facetas). Cada termo da consulta casa por
+    prefixo com os tokens normalizados, e os termos são combinados com AND.
+    """
+
+    def __init__(self, df_questoes, fields=SEARCH_FIELDS):
+        self.size = len(df_questoes)
+        vocabulary = {}
+        raw_to_id = {}
+        token_ids, positions, weights = [], [np.array([], dtype=np.int64)], [np.array([], dtype=np.float64)]
+
+        for column, weight in fields:
+            if column not in df_questoes.columns:
+                continue
+            values = df_questoes[column].astype(object).where(df_questoes[column].notna(), '').tolist()
+            ids_by_text = {}
+            lengths = []
+            for text in values:
+                ids = ids_by_text.get(text)
+                if ids is None:
+                    raw_tokens = _raw_tokens(text)
+                    ids = [raw_to_id.get(raw) for raw in raw_tokens]
+                    if None in ids:
+                        for raw in raw_tokens:
+                            if raw not in raw_to_id:
+                                raw_to_id[raw] = vocabulary.setdefault(normalize_text(raw), len(vocabulary))
+                        ids = [raw_to_id[raw] for raw in raw_tokens]
+                    ids_by_text[text] = ids
+                token_ids.extend(ids)
+                lengths.append(len(ids))
+            positions.append(np.repeat(np.arange(len(values), dtype=np.int64), lengths))
+            weights.append(np.full(sum(lengths), weight))
+
+        # Postings ordenados por (token, posição), somando as ocorrências repetidas
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        positions = np.concatenate(positions)
+        keys, inverse = np.unique(token_ids * max(self.size, 1) + positions, return_inverse=True)
+        summed = np.bincount(inverse.ravel(), weights=np.concatenate(weights), minlength=len(keys))
+        key_tokens = keys // max(self.size, 1)
+        key_positions = (keys % max(self.size, 1)).astype(np.intp)
+        bounds = np.searchsorted(key_tokens, np.arange(1, len(vocabulary)))
+        postings = np.split(key_positions, bounds)
+        scores = np.split(summed, bounds)
+
+        # Vocabulário ordenado para a busca por prefixo (bisect)
+        by_token = sorted(vocabulary.items())
+        self.vocabulary = [token for token, _ in by_token]
+        self._postings = [postings[token_id] for _, token_id in by_token]
+        self._scores = [scores[token_id] for _, token_id in by_token]
+        # O índice é compartilhado entre sessões (threads); o cache precisa de trava
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _cached(self, key, compute):
+        """Resultado do cache de termos/consultas recentes, calculando se necessário"""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        result = compute()
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > TERM_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _term_matches(self, term):
+        """(posições ordenadas, pontuações) das linhas com algum token que começa com o termo"""
+        return self._cached(('term', term), lambda: self._match_prefix(term))
+
+    def _match_prefix(self, term):
+        lo = bisect_left(self.vocabulary, term)
+        hi = bisect_left(self.vocabulary, term + "\U0010ffff", lo)
+        if lo == hi:
+            result = (_EMPTY_IDS, _EMPTY_SCORES)
+        elif hi - lo == 1:
+            bonus = EXACT_MATCH_BONUS if self.vocabulary[lo] == term else 1.0
+            result = (self._postings[lo], self._scores[lo] * bonus)
+        else:
+            all_positions = np.concatenate(self._postings[lo:hi])
+            all_scores = np.concatenate([
+                self._scores[i] * (EXACT_MATCH_BONUS if self.vocabulary[i] == term else 1.0)
+                for i in range(lo, hi)
+            ])
+            unique_positions, inverse = np.unique(all_positions, return_inverse=True)
+            result = (unique_positions, np.bincount(inverse.ravel(), weights=all_scores))
+        return result
+
+    def search(self, query):
+        """IDs de linha que contêm todos os termos, do mais para o menos relevante
+
+        Retorna None se a consulta não tiver nenhum termo (sem filtro de texto).
+        """
+        terms = tuple(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return None
+        # Reruns sem mudança na busca repetem a mesma consulta
+        return self._cached(('query', terms), lambda: self._ranked(terms))
+
+    def _ranked(self, terms):
+        positions, scores = self._term_matches(terms[0])
+        for term in terms[1:]:
+            if not len(positions):
+                break
+            term_positions, term_scores = self._term_matches(term)
+            positions, left, right = np.intersect1d(
+                positions, term_positions, assume_unique=True, return_indices=True
+            )
+            scores = scores[left] + term_scores[right]
+
+        if not len(positions):
+            return _EMPTY_IDS
+        # Maior pontuação primeiro; empates na ordem do catálogo
+        ranked = positions[np.lexsort((positions, -scores))]
+        # O resultado fica em cache e é compartilhado entre sessões
+        ranked.setflags(write=False)
+        return ranked
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Renovar o token quando faltar menos que isso para expirar
+DEFAULT_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Intervalo entre verificações do renovador em segundo plano
+DEFAULT_CHECK_INTERVAL = 60
+
+# Clientes sem uso por mais tempo que isso deixam de ser renovados
+DEFAULT_IDLE_TIMEOUT = timedelta(hours=1)
+
+
+def credentials_fingerprint(info):
+    """Gera uma impressão digital estável das credenciais (para compor a chave do pool)"""
+    payload = json.dumps(dict(info), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def is_auth_error(exc):
+    """Indica se a exceção representa falha de autenticação (token inválido ou revogado)"""
+    import gspread
+    from google.auth.exceptions import RefreshError
+
+    if isinstance(exc, RefreshError):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        response = getattr(exc, 'response', None)
+        return getattr(response, 'status_code', None) == 401
+    return False
+
+
+def _utcnow():
+    # google-auth usa datetimes UTC "naive" em Credentials.expiry
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _PoolEntry:
+    """Cliente autorizado, suas credenciais e os handles abertos a partir dele"""
+
+    def __init__(self, client, credentials):
+        self.client = client
+        self.credentials = credentials
+        self.spreadsheets = {}
+        self.worksheets = {}
+        self.last_used = _utcnow()
+        self.lock = threading.Lock()
+
+
+class SheetsClientPool:
+    """Pool de clientes gspread compartilhado pelo processo (thread-safe)
+
+    Os clientes são indexados pela origem das credenciais; cada um é autorizado uma
+    única vez e reaproveitado entre reruns e sessões. Uma thread em segundo plano
+    renova o token antes de expirar, e o cliente só é reconstruído em caso de falha
+    de autenticação.
+    """
+
+    def __init__(self, scopes, refresh_margin=DEFAULT_REFRESH_MARGIN,
+                 check_interval=DEFAULT_CHECK_INTERVAL, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 instrument=None, scheduler=None):
+        self.scopes = list(scopes)
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self.idle_timeout = idle_timeout
+        # Função opcional aplicada a cada cliente criado (ex.: contagem de chamadas)
+        self.instrument = instrument
+        # Agendador opcional (cotas, novas tentativas) por onde passam as requisições dos clientes
+        self.scheduler = scheduler
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._by_client = {}
+        self._refresher = None
+        self._stop = threading.Event()
+
+    # --- Clientes ---------------------------------------------------------
+
+    def get_client(self, source_key, credentials_factory):
+        """Retorna o cliente da origem informada, criando-o apenas na primeira vez"""
+        with self._lock:
+            entry = self._entries.get(source_key)
+            if entry is None:
+                # gspread e google-auth só são importados quando o primeiro cliente é criado
+                import gspread
+
+                credentials = credentials_factory(self.scopes)
+                client = gspread.authorize(credentials)
+                if self.instrument is not None:
+                    client = self.instrument(client)
+                if self.scheduler is not None:
+                    client = self.scheduler.wrap_client(client)
+                entry = _PoolEntry(client, credentials)
+                self._entries[source_key] = entry
+                self._by_client[id(client)] = source_key
+                self._ensure_refresher()
+            entry.last_used = _utcnow()
+            return entry.client
+
+    def invalidate(self, source_key):
+        """Descarta o cliente (e seus handles) para forçar nova autorização"""
+        with self._lock:
+            entry = self._entries.pop(source_key, None)
+            if entry is not None:
+                self._by_client.pop(id(entry.client), None)
+
+    def report_error(self, client, exc):
+        """Trata um erro de API: reconstrói o cliente em falha de auth, senão limpa os handles"""
+        with self._lock:
+            source_key = self._by_client.get(id(client))
+            if source_key is None:
+                return
+            if is_auth_error(exc):
+                self.invalidate(source_key)
+            else:
+                entry = self._entries[source_key]
+                entry.spreadsheets.clear()
+                entry.worksheets.clear()
+
+    # --- Handles memoizados -----------------------------------------------
+
+    def _entry_for(self, client):
+        source_key = self._by_client.get(id(client))
+        return self._entries.get(source_key) if source_key is not None else None
+
+    def open_by_key(self, client, sheet_id):
+        """Abre a planilha pelo ID reaproveitando o handle já aberto"""
+        with self._lock:
+            entry = self._entry_for(client)
+            if entry is None:
+                return client.open_by_key(sheet_id)
+            spreadsheet = entry.spreadsheets.get(sheet_id)
+        if spreadsheet is None:
+            spreadsheet = client.open_by_key(sheet_id)
+            with self._lock:
+                spreadsheet = entry.spreadsheets.setdefault(sheet_id, spreadsheet)
+        return spreadsheet
+
+    def worksheet(self, client, sheet_id, title):
+        """Retorna a worksheet pelo título reaproveitando o handle já aberto"""
+        spreadsheet = self.open_by_key(client, sheet_id)
+        with self._lock:
+            entry = self._entry_for(client)
+            cached = entry.worksheets.get((sheet_id, title)) if entry is not None else None
+        if cached is not None:
+            return cached
+        worksheet = spreadsheet.worksheet(title)
+        self.remember_worksheet(client, sheet_id, worksheet)
+        return worksheet
+
+    def remember_worksheet(self, client, sheet_id, worksheet):
+        """Registra um handle de worksheet (por exemplo, recém-criada)"""
+        with self._lock:
+            entry = self._entry_for(client)
+            if entry is not None:
+                entry.worksheets[(sheet_id, worksheet.title)] = worksheet
+
+    # --- Renovação do token -----------------------------------------------
+
+    def _ensure_refresher(self):
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="sheets-token-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.check_interval):
+            self.refresh_expiring()
+
+    def refresh_expiring(self):
+        """Renova os tokens que expiram dentro da margem configurada"""
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+
+        now = _utcnow()
+        with self._lock:
+            entries = list(self._entries.items())
+        for source_key, entry in entries:
+            credentials = entry.credentials
+            expiry = getattr(credentials, 'expiry', None)
+            # Sem token ainda (nenhuma chamada feita) ou cliente ocioso: nada a fazer
+            if expiry is None or now - entry.last_used > self.idle_timeout:
+                continue
+            if expiry - now > self.refresh_margin:
+                continue
+            with entry.lock:
+                try:
+                    credentials.refresh(Request())
+                except RefreshError:
+                    self.invalidate(source_key)
+                except Exception:
+                    # Falha transitória de rede: a próxima verificação tenta de novo
+                    pass
+
+    def close(self):
+        """Interrompe o renovador em segundo plano"""
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=1)
+        self._refresher = None
+
+    def stats(self):
+        """Resumo do estado do pool (para diagnóstico)"""
+        with self._lock:
+            return {
+                key: {
+                    'expiry': getattr(entry.credentials, 'expiry', None),
+                    'spreadsheets': len(entry.spreadsheets),
+                    'worksheets': len(entry.worksheets),
+                    'idle_seconds': int((_utcnow() - entry.last_used).total_seconds()),
+                }
+                for key, entry in self._entries.items()
+            }
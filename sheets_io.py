@@ -0,0 +1,438 @@
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import pandas as pd
+
+# Separador usado no cálculo dos checksums de linha
+_CHECKSUM_SEPARATOR = "\x1f"
+
+# Edições no meio da planilha não alteram os checksums; uma recarga completa
+# periódica garante que elas também sejam refletidas
+DEFAULT_FULL_RELOAD_EVERY = 100
+
+
+def row_checksum(row):
+    """Checksum barato de uma linha (células vazias à direita são ignoradas, como na API)"""
+    values = [str(v) for v in row]
+    while values and values[-1] == "":
+        values.pop()
+    return zlib.crc32(_CHECKSUM_SEPARATOR.join(values).encode("utf-8"))
+
+
+def column_letter(col):
+    """Converte o número da coluna (1 = A) para a letra correspondente"""
+    from gspread.utils import rowcol_to_a1
+
+    return rowcol_to_a1(1, col)[:-1]
+
+
+def records_from_values(header, rows):
+    """Converte linhas cruas em registros com a mesma conversão de get_all_records()"""
+    from gspread.utils import numericise_all
+
+    width = len(header)
+    records = []
+    for row in rows:
+        values = list(row[:width]) + [""] * (width - len(row))
+        records.append(dict(zip(header, numericise_all(values))))
+    return records
+
+
+class IncrementalWorksheetReader:
+    """Leitor incremental de uma worksheet (baixa apenas as linhas novas)
+
+    Mantém o último snapshot convertido em DataFrame, o número de linhas conhecido
+    e os checksums do cabeçalho e da última linha lida. A cada leitura uma única
+    chamada batch_get traz o cabeçalho, a última linha conhecida e as linhas
+    posteriores a ela; se o cabeçalho ou a última linha mudaram (linhas removidas
+    ou editadas), a worksheet é recarregada por inteiro. A cada
+    ``full_reload_every`` leituras incrementais também é feita uma recarga completa.
+    """
+
+    def __init__(self, full_reload_every=DEFAULT_FULL_RELOAD_EVERY):
+        self.full_reload_every = full_reload_every
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Descarta o snapshot (a próxima leitura será completa)"""
+        self.header = []
+        self.row_count = 0
+        self.header_checksum = None
+        self.last_row_checksum = None
+        self.dataframe = pd.DataFrame()
+        self.version = 0
+        self.full_reloads = 0
+        self.incremental_reads = 0
+        self._reads_since_reload = 0
+
+    def read(self, worksheet):
+        """Retorna o DataFrame atualizado da worksheet"""
+        with self._lock:
+            if self.row_count == 0 or self._reads_since_reload >= self.full_reload_every:
+                self._full_reload(worksheet)
+            else:
+                self._read_tail(worksheet)
+            return self.dataframe
+
+    def _full_reload(self, worksheet):
+        values = worksheet.get_all_values()
+        self.full_reloads += 1
+        self._reads_since_reload = 0
+        if not values:
+            self.header = []
+            self.row_count = 0
+            self.header_checksum = None
+            self.last_row_checksum = None
+            self.dataframe = pd.DataFrame()
+        else:
+            self.header = list(values[0])
+            self.row_count = len(values)
+            self.header_checksum = row_checksum(self.header)
+            self.last_row_checksum = row_checksum(values[-1])
+            self.dataframe = pd.DataFrame(
+                records_from_values(self.header, values[1:]), columns=self.header
+            )
+        self.version += 1
+
+    def _read_tail(self, worksheet):
+        last_col = column_letter(max(len(self.header), 1))
+        n = self.row_count
+        header_range, last_row_range, tail_range = worksheet.batch_get([
+            "1:1",
+            f"A{n}:{last_col}{n}",
+            f"A{n + 1}:{last_col}",
+        ])
+        header = list(header_range[0]) if header_range else []
+        last_row = list(last_row_range[0]) if last_row_range else []
+
+        # Cabeçalho alterado ou linhas removidas/editadas: recarregar tudo
+        if row_checksum(header) != self.header_checksum or row_checksum(last_row) != self.last_row_checksum:
+            self._full_reload(worksheet)
+            return
+
+        self.incremental_reads += 1
+        self._reads_since_reload += 1
+        new_rows = [list(row) for row in tail_range if any(str(v) != "" for v in row)]
+        if not new_rows:
+            return
+
+        new_df = pd.DataFrame(records_from_values(self.header, new_rows), columns=self.header)
+        if self.dataframe.empty:
+            self.dataframe = new_df
+        else:
+            self.dataframe = pd.concat([self.dataframe, new_df], ignore_index=True)
+        self.row_count = n + len(tail_range)
+        self.last_row_checksum = row_checksum(tail_range[-1])
+        self.version += 1
+
+
+# Parâmetros padrão da fila de gravação
+DEFAULT_QUEUE_SIZE = 500
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+
+def build_row(headers, validation_data):
+    """Monta a linha de dados na ordem dos headers da worksheet"""
+    row = []
+    for h in headers:
+        v = validation_data.get(h, "")
+        if v is None:
+            row.append("")
+        elif isinstance(v, (int, float, bool, str)):
+            row.append(str(v))
+        else:
+            try:
+                row.append(str(v))
+            except Exception:
+                row.append("")
+    return row
+
+
+class WriteTicket:
+    """Confirmação de uma gravação: enfileirada na criação, persistida após o flush"""
+
+    def __init__(self, validation_data):
+        self.validation_data = validation_data
+        self.enqueued = True
+        self.persisted = False
+        self.error = None
+        self._done = threading.Event()
+
+    def _resolve(self, error=None):
+        self.error = error
+        self.persisted = error is None
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Aguarda o resultado do flush; retorna False se o tempo esgotar"""
+        return self._done.wait(timeout)
+
+
+class WriteBehindQueue:
+    """Fila limitada de gravações enviadas em lote com append_rows
+
+    Um flusher em segundo plano agrupa as avaliações até ``batch_size`` itens ou
+    ``flush_interval`` segundos após a primeira da fila, o que ocorrer antes. O
+    cabeçalho da worksheet é lido uma única vez e mantido em cache.
+    """
+
+    def __init__(self, max_pending=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._worksheet = None
+        self._headers = None
+        self._flusher = None
+        self._pending = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_at = None
+        self.last_error = None
+
+    def set_headers(self, headers):
+        """Define o cabeçalho conhecido (por exemplo, ao criar a worksheet)"""
+        with self._lock:
+            self._headers = list(headers)
+
+    def invalidate_headers(self):
+        """Força nova leitura do cabeçalho no próximo flush"""
+        with self._lock:
+            self._headers = None
+
+    def submit(self, validation_data, worksheet, timeout=5):
+        """Enfileira uma avaliação; levanta queue.Full se a fila estiver cheia"""
+        ticket = WriteTicket(validation_data)
+        with self._lock:
+            self._worksheet = worksheet
+            self._pending += 1
+        try:
+            self._queue.put(ticket, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._ensure_flusher()
+        return ticket
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="sheets-write-behind", daemon=True)
+            self._flusher.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush_loop(self):
+        while True:
+            batch = self._next_batch()
+            self._write_batch(batch)
+
+    def headers_for(self, worksheet, validation_data):
+        """Cabeçalho da worksheet (lido uma única vez; criado a partir dos dados se vazio)"""
+        with self._lock:
+            headers = self._headers
+        if headers:
+            return headers
+        headers = worksheet.row_values(1)
+        if not headers:
+            headers = list(validation_data.keys())
+            worksheet.append_row(headers)
+        self.set_headers(headers)
+        return headers
+
+    def _write_batch(self, batch):
+        with self._lock:
+            worksheet = self._worksheet
+        try:
+            headers = self.headers_for(worksheet, batch[0].validation_data)
+            rows = [build_row(headers, ticket.validation_data) for ticket in batch]
+            worksheet.append_rows(rows)
+        except Exception as e:
+            # Cabeçalho pode estar desatualizado; será relido no próximo flush
+            self.invalidate_headers()
+            with self._lock:
+                self._pending -= len(batch)
+                self.failed += len(batch)
+                self.last_error = str(e)
+            for ticket in batch:
+                ticket._resolve(e)
+            return
+        with self._lock:
+            self._pending -= len(batch)
+            self.flushed += len(batch)
+            self.batches += 1
+            self.last_flush_at = datetime.now()
+        for ticket in batch:
+            ticket._resolve()
+
+    def flush(self, timeout=None):
+        """Aguarda até que não haja gravações pendentes; retorna False se o tempo esgotar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.status()['pending'] > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def status(self):
+        """Contadores da fila para exibição na barra lateral"""
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'flushed': self.flushed,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_flush_at': self.last_flush_at,
+                'last_error': self.last_error,
+            }
+
+
+# Intervalo padrão entre tentativas de sincronização do log local (segundos)
+DEFAULT_SYNC_INTERVAL = 5
+
+
+def ensure_header_column(worksheet, headers, column):
+    """Garante que a coluna exista no cabeçalho da worksheet; retorna o cabeçalho atualizado"""
+    if column in headers:
+        return list(headers)
+    new_col = len(headers) + 1
+    if worksheet.col_count < new_col:
+        worksheet.add_cols(new_col - worksheet.col_count)
+    worksheet.update_cell(1, new_col, column)
+    return list(headers) + [column]
+
+
+class LogSyncWorker:
+    """Replica para a worksheet as entradas do log local ainda não sincronizadas
+
+    Cada entrada carrega um record_id; antes de enviar, o sincronizador descarta as
+    que já existem na planilha (lidas da coluna record_id), de modo que uma nova
+    tentativa após falha ou timeout nunca duplica linhas. O envio usa a fila de
+    gravação em lote, e a entrada só é marcada como sincronizada após a confirmação.
+    """
+
+    def __init__(self, log, write_queue, owner, id_column='record_id',
+                 interval=DEFAULT_SYNC_INTERVAL, batch_size=DEFAULT_QUEUE_SIZE // 2):
+        self.log = log
+        self.write_queue = write_queue
+        self.owner = owner
+        self.id_column = id_column
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worksheet = None
+        self._thread = None
+        self._remote_ids = None
+        self.synced = 0
+        self.last_sync_at = None
+        self.last_error = None
+
+    def kick(self, worksheet):
+        """Informa a worksheet atual e solicita uma sincronização imediata"""
+        with self._lock:
+            self._worksheet = worksheet
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="validation-log-sync", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.sync_once()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = str(e)
+                    # Resultado incerto: reler os IDs remotos antes de reenviar
+                    self._remote_ids = None
+
+    def _load_remote_ids(self, worksheet, headers):
+        col = headers.index(self.id_column) + 1
+        return set(worksheet.col_values(col)[1:])
+
+    def sync_once(self):
+        """Executa uma rodada de sincronização; retorna quantas entradas foram confirmadas"""
+        with self._lock:
+            worksheet = self._worksheet
+        if worksheet is None:
+            return 0
+        entries = self.log.claim_unsynced(self.owner, limit=self.batch_size)
+        if not entries:
+            return 0
+
+        headers = self.write_queue.headers_for(worksheet, entries[0])
+        if self.id_column not in headers:
+            headers = ensure_header_column(worksheet, headers, self.id_column)
+            self.write_queue.set_headers(headers)
+        with self._lock:
+            if self._remote_ids is None:
+                self._remote_ids = self._load_remote_ids(worksheet, headers)
+            remote_ids = self._remote_ids
+
+        already = [e[self.id_column] for e in entries if e[self.id_column] in remote_ids]
+        self.log.mark_synced(already)
+        pending = [e for e in entries if e[self.id_column] not in remote_ids]
+
+        tickets = []
+        queue_full = False
+        for i, entry in enumerate(pending):
+            try:
+                tickets.append((entry[self.id_column], self.write_queue.submit(entry, worksheet)))
+            except queue.Full:
+                # Fila cheia: aguarda os já enviados e devolve o restante do lote ao log
+                queue_full = True
+                self.log.release_claims([rest[self.id_column] for rest in pending[i:]])
+                break
+        confirmed = []
+        for record_id, ticket in tickets:
+            ticket.wait()
+            if ticket.persisted:
+                confirmed.append(record_id)
+        self.log.mark_synced(confirmed)
+
+        with self._lock:
+            remote_ids.update(confirmed)
+            self.synced += len(confirmed) + len(already)
+            self.last_sync_at = datetime.now()
+            if len(confirmed) < len(tickets):
+                self.last_error = str(next(t.error for _, t in tickets if not t.persisted))
+                self._remote_ids = None
+            elif queue_full:
+                self.last_error = "Fila de gravação cheia"
+            else:
+                self.last_error = None
+        return len(confirmed) + len(already)
+
+    def status(self):
+        """Contadores do sincronizador e do log local"""
+        counts = self.log.counts()
+        with self._lock:
+            return {
+                'unsynced': counts['unsynced'],
+                'synced': self.synced,
+                'last_sync_at': self.last_sync_at,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,236 @@
+import functools
+import random
+import threading
+import time
+
+# Cotas padrão da API do Google Sheets por usuário (a conta de serviço): requisições por minuto
+DEFAULT_READ_PER_MINUTE = 60
+DEFAULT_WRITE_PER_MINUTE = 60
+
+# Requisições liberadas de uma vez antes de o ritmo da cota valer
+DEFAULT_BURST = 10
+
+# Novas tentativas após erro de cota (429) ou do servidor (5xx), com espera exponencial
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 32.0
+
+READ = 'read'
+WRITE = 'write'
+
+# Métodos HTTP que apenas leem (podem ser repetidos e agrupados)
+READ_METHODS = ('GET', 'HEAD')
+
+SERVER_ERRORS = (500, 502, 503, 504)
+
+# Espera mínima (segundos) de uma leitura que cede a vez a uma gravação já liberada
+WRITE_TURN = 0.01
+
+
+def status_code(exc):
+    """Código HTTP de um APIError do gspread (None se não houver resposta)"""
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def retry_after(exc):
+    """Segundos pedidos pelo servidor no cabeçalho Retry-After (None se ausente)"""
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Espera exponencial com jitter: entre metade e o total de base * 2^tentativa"""
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """Balde de fichas: ``per_minute`` fichas por minuto, até ``burst`` acumuladas"""
+
+    def __init__(self, per_minute, burst=DEFAULT_BURST):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def wait_time(self, now):
+        """Segundos até haver uma ficha disponível (0 se já houver), sem consumi-la"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """Consome uma ficha; retorna 0 se conseguiu, senão os segundos até a próxima"""
+        wait = self.wait_time(now)
+        if wait <= 0:
+            self.tokens -= 1
+        return wait
+
+
+class _InflightRead:
+    """Leitura em andamento cujo resultado é entregue a todas as chamadas idênticas"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.response = None
+        self.error = None
+
+    def resolve(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self._done.set()
+
+    def result(self):
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class SheetsRequestScheduler:
+    """Agendador central das requisições à API do Google Sheets (compartilhado pelo processo)
+
+    Leituras e gravações consomem baldes de fichas separados, dimensionados pela
+    cota por minuto; acima dela as chamadas esperam em vez de falhar. Erros 429
+    pausam o tipo de requisição com espera exponencial (ou o Retry-After do
+    servidor) e a chamada é repetida. Gravações só são repetidas em 429, que
+    garante que nada foi aplicado; em 5xx o erro sobe e o sincronizador reenvia
+    sem duplicar (pelo record_id). Leituras cedem a vez às gravações na fila que
+    não estão pausadas, e leituras idênticas simultâneas viram uma única requisição.
+    """
+
+    def __init__(self, read_per_minute=DEFAULT_READ_PER_MINUTE, write_per_minute=DEFAULT_WRITE_PER_MINUTE,
+                 burst=DEFAULT_BURST, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._buckets = {READ: TokenBucket(read_per_minute, burst), WRITE: TokenBucket(write_per_minute, burst)}
+        self._paused_until = {READ: 0.0, WRITE: 0.0}
+        self._waiting = {READ: 0, WRITE: 0}
+        self._inflight = {}
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.last_error = None
+
+    # --- Fichas -----------------------------------------------------------
+
+    def acquire(self, kind):
+        """Bloqueia até haver ficha para o tipo de requisição (READ ou WRITE)"""
+        with self._cond:
+            self._waiting[kind] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._paused_until[kind] - now
+                    if wait <= 0 and kind == READ and self._waiting[WRITE] and self._paused_until[WRITE] <= now:
+                        # Gravações na fila (fora da pausa de um 429) têm prioridade: a leitura
+                        # espera até a próxima ficha de gravação, quando a gravação segue
+                        wait = max(self._buckets[WRITE].wait_time(now), WRITE_TURN)
+                    elif wait <= 0:
+                        wait = self._buckets[kind].take(now)
+                        if wait <= 0:
+                            self.requests += 1
+                            return
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[kind] -= 1
+                self._cond.notify_all()
+
+    def _should_retry(self, kind, code, attempt):
+        if attempt >= self.max_retries:
+            return False
+        return code == 429 or (kind == READ and code in SERVER_ERRORS)
+
+    def execute(self, kind, call):
+        """Executa a requisição respeitando a cota, repetindo após 429/5xx"""
+        from gspread.exceptions import APIError
+
+        attempt = 0
+        while True:
+            self.acquire(kind)
+            try:
+                return call()
+            except APIError as e:
+                code = status_code(e)
+                if not self._should_retry(kind, code, attempt):
+                    with self._cond:
+                        self.failed += 1
+                        self.last_error = str(e)
+                    raise
+                delay = retry_after(e) or backoff_delay(attempt, self.base_delay, self.max_delay)
+                attempt += 1
+                with self._cond:
+                    self.retries += 1
+                    if code == 429:
+                        self.throttled += 1
+                    # Cota estourada: todas as requisições do mesmo tipo esperam
+                    self._paused_until[kind] = max(self._paused_until[kind], time.monotonic() + delay)
+
+    def _coalesced(self, key, call):
+        """Leitura agrupada: chamadas idênticas simultâneas esperam a que já está em andamento"""
+        with self._cond:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = _InflightRead()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return inflight.result()
+        try:
+            response = self.execute(READ, call)
+        except Exception as e:
+            inflight.resolve(error=e)
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+        inflight.resolve(response)
+        return response
+
+    # --- Clientes ---------------------------------------------------------
+
+    def wrap_client(self, client):
+        """Faz todas as requisições HTTP do cliente gspread passarem pelo agendador"""
+        # gspread >= 6 concentra as requisições em client.http_client; versões anteriores em client.request
+        target = getattr(client, 'http_client', client)
+        original = getattr(target, 'request', None)
+        if original is None or getattr(original, '_quota_scheduled', False):
+            return client
+
+        @functools.wraps(original)
+        def request(method, endpoint, *args, **kwargs):
+            call = functools.partial(original, method, endpoint, *args, **kwargs)
+            if method.upper() in READ_METHODS:
+                key = (method.upper(), str(endpoint), repr(args), repr(sorted(kwargs.items())))
+                return self._coalesced(key, call)
+            return self.execute(WRITE, call)
+
+        request._quota_scheduled = True
+        target.request = request
+        return client
+
+    def status(self):
+        """Contadores do agendador para exibição na barra lateral"""
+        with self._cond:
+            return {
+                'waiting_reads': self._waiting[READ],
+                'waiting_writes': self._waiting[WRITE],
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'coalesced': self.coalesced,
+                'failed': self.failed,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,337 @@
+import json
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from local_log import RECORD_ID_COLUMN
+from pending_items import normalize_key_value
+from sheets_io import column_letter, records_from_values
+
+# Backends disponíveis (valor de [storage] backend nos secrets)
+BACKEND_SHEETS = 'sheets'
+BACKEND_SQLITE = 'sqlite'
+BACKEND_MEMORY = 'memory'
+
+DEFAULT_SQLITE_PATH = Path("validations/validacoes.sqlite3")
+
+# Colunas indexadas no SQLite (chave de check_existing_validation + fallback por texto)
+INDEXED_COLUMNS = ('usuario', 'sistema', 'ano', 'numero_questao', 'texto_questao')
+
+
+class BackendUnavailable(Exception):
+    """O backend não está acessível no momento (por exemplo, sem conexão)"""
+
+
+class StaleRowError(Exception):
+    """A linha localizada na planilha mudou antes da gravação (edição concorrente)"""
+
+
+def _matches(record, key):
+    """Compara um registro com a chave usando a mesma normalização do índice de pendências"""
+    return all(
+        normalize_key_value(record.get(column)) == normalize_key_value(value)
+        for column, value in key.items()
+    )
+
+
+def _with_record_id(record):
+    record = dict(record)
+    if not record.get(RECORD_ID_COLUMN):
+        record[RECORD_ID_COLUMN] = uuid.uuid4().hex
+    return record
+
+
+class StorageBackend:
+    """Interface comum de armazenamento das avaliações
+
+    Os cursores de load_since são posições na ordem de gravação: load_since(0)
+    equivale a load_all(), e o cursor retornado aponta para depois do último
+    registro lido.
+    """
+
+    name = None
+
+    def append(self, record):
+        """Grava uma avaliação; retorna o record_id"""
+        return self.append_many([record])[0]
+
+    def append_many(self, records):
+        """Grava várias avaliações de uma vez; retorna os record_ids"""
+        raise NotImplementedError
+
+    def load_all(self):
+        """Retorna todas as avaliações como DataFrame"""
+        return self.load_since(0)[0]
+
+    def load_since(self, cursor):
+        """Retorna (avaliações gravadas a partir do cursor, novo cursor)"""
+        raise NotImplementedError
+
+    def lookup(self, key):
+        """Retorna as avaliações cujas colunas batem com a chave (dicionário coluna → valor)"""
+        df = self.load_all()
+        if df.empty:
+            return df
+        mask = [_matches(record, key) for record in df.to_dict('records')]
+        return df[mask]
+
+    def update(self, key, changes):
+        """Atualiza as avaliações que batem com a chave; retorna quantas foram alteradas"""
+        raise NotImplementedError
+
+    def status(self):
+        """Informações de diagnóstico para a barra lateral"""
+        return {'backend': self.name}
+
+
+class MemoryBackend(StorageBackend):
+    """Backend em memória (testes, benchmarks e uso sem persistência)"""
+
+    name = BACKEND_MEMORY
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = []
+        self._ids = set()
+
+    def append_many(self, records):
+        ids = []
+        with self._lock:
+            for record in records:
+                record = _with_record_id(record)
+                if record[RECORD_ID_COLUMN] not in self._ids:
+                    self._ids.add(record[RECORD_ID_COLUMN])
+                    self._records.append(record)
+                ids.append(record[RECORD_ID_COLUMN])
+        return ids
+
+    def load_since(self, cursor):
+        with self._lock:
+            records = list(self._records[cursor:])
+            new_cursor = len(self._records)
+        return pd.DataFrame(records), new_cursor
+
+    def lookup(self, key):
+        with self._lock:
+            records = [r for r in self._records if _matches(r, key)]
+        return pd.DataFrame(records)
+
+    def update(self, key, changes):
+        updated = 0
+        with self._lock:
+            for record in self._records:
+                if _matches(record, key):
+                    record.update(changes)
+                    updated += 1
+        return updated
+
+    def status(self):
+        with self._lock:
+            return {'backend': self.name, 'records': len(self._records)}
+
+
+class SQLiteBackend(StorageBackend):
+    """Backend em banco SQLite local, com índice pelas colunas de chave"""
+
+    name = BACKEND_SQLITE
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, table='validacoes'):
+        self.path = Path(path)
+        self.table = table
+        if str(path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{column} TEXT" for column in INDEXED_COLUMNS)
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                record_id TEXT NOT NULL UNIQUE,
+                {columns},
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_chave ON {table} (usuario, sistema, ano, numero_questao)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_texto ON {table} (usuario, sistema, texto_questao)"
+        )
+
+    def _row_values(self, record):
+        return [normalize_key_value(record.get(column)) for column in INDEXED_COLUMNS]
+
+    def append_many(self, records):
+        records = [_with_record_id(record) for record in records]
+        placeholders = ", ".join("?" for _ in range(len(INDEXED_COLUMNS) + 2))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (record_id, {', '.join(INDEXED_COLUMNS)}, payload) "
+                f"VALUES ({placeholders})",
+                [
+                    [r[RECORD_ID_COLUMN]] + self._row_values(r) + [json.dumps(r, ensure_ascii=False, default=str)]
+                    for r in records
+                ],
+            )
+            self._conn.execute("COMMIT")
+        return [r[RECORD_ID_COLUMN] for r in records]
+
+    def load_since(self, cursor):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, payload FROM {self.table} WHERE seq > ? ORDER BY seq", (cursor,)
+            ).fetchall()
+        new_cursor = rows[-1][0] if rows else cursor
+        return pd.DataFrame([json.loads(payload) for _, payload in rows]), new_cursor
+
+    def _select(self, key):
+        indexed = {c: normalize_key_value(v) for c, v in key.items() if c in INDEXED_COLUMNS}
+        where = " AND ".join(f"{column} = ?" for column in indexed) or "1 = 1"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, payload FROM {self.table} WHERE {where} ORDER BY seq", list(indexed.values())
+            ).fetchall()
+        # Colunas fora do índice são filtradas sobre o payload
+        return [(seq, record) for seq, record in ((s, json.loads(p)) for s, p in rows) if _matches(record, key)]
+
+    def lookup(self, key):
+        return pd.DataFrame([record for _, record in self._select(key)])
+
+    def update(self, key, changes):
+        matches = self._select(key)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for seq, record in matches:
+                record.update(changes)
+                self._conn.execute(
+                    f"UPDATE {self.table} SET {', '.join(f'{c} = ?' for c in INDEXED_COLUMNS)}, payload = ? WHERE seq = ?",
+                    self._row_values(record) + [json.dumps(record, ensure_ascii=False, default=str), seq],
+                )
+            self._conn.execute("COMMIT")
+        return len(matches)
+
+    def status(self):
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {'backend': self.name, 'records': total}
+
+
+class GoogleSheetsBackend(StorageBackend):
+    """Backend Google Sheets: log local + fila de gravação em lote + leitor incremental
+
+    As gravações vão primeiro para o log local e são replicadas em segundo plano.
+    A worksheet é informada com attach() pela thread do script (onde há contexto do
+    Streamlit); sem worksheet anexada o backend opera em modo offline, usando o
+    último snapshot lido da planilha somado ao log local.
+    """
+
+    name = BACKEND_SHEETS
+
+    def __init__(self, log, write_queue, reader, sync_worker):
+        self.log = log
+        self.write_queue = write_queue
+        self.reader = reader
+        self.sync_worker = sync_worker
+        self._worksheet = None
+
+    def attach(self, worksheet):
+        """Define a worksheet atual e dispara a sincronização das entradas pendentes"""
+        self._worksheet = worksheet
+        self.sync_worker.kick(worksheet)
+
+    def detach(self):
+        """Passa a operar em modo offline"""
+        self._worksheet = None
+
+    @property
+    def online(self):
+        return self._worksheet is not None
+
+    def append_many(self, records):
+        ids = [self.log.append(record) for record in records]
+        if self._worksheet is not None:
+            self.sync_worker.kick(self._worksheet)
+        return ids
+
+    def load_all(self):
+        if self._worksheet is None:
+            # Offline: as avaliações remotas já lidas continuam no snapshot
+            return self.log.merge_with(self.reader.dataframe, offline=True)
+        return self.log.merge_with(self.reader.read(self._worksheet))
+
+    def load_since(self, cursor):
+        # Cursor = posição na worksheet (entradas ainda só no log local não entram)
+        if self._worksheet is None:
+            raise BackendUnavailable("Google Sheets indisponível (modo offline)")
+        df = self.reader.read(self._worksheet)
+        return df.iloc[cursor:].reset_index(drop=True), len(df)
+
+    def update(self, key, changes):
+        if self._worksheet is None:
+            raise BackendUnavailable("Google Sheets indisponível (modo offline)")
+        # As linhas são localizadas nos valores lidos agora, não nas posições do snapshot
+        # em cache (linhas removidas ou reordenadas fariam a edição cair em outro registro)
+        values = self._worksheet.get_all_values()
+        if not values:
+            return 0
+        headers = values[0]
+        if RECORD_ID_COLUMN in key and RECORD_ID_COLUMN in headers:
+            key = {RECORD_ID_COLUMN: key[RECORD_ID_COLUMN]}
+        rows = {}
+        for offset, record in enumerate(records_from_values(headers, values[1:])):
+            if _matches(record, key):
+                rows[offset + 2] = record.get(RECORD_ID_COLUMN)  # linha 1 é o cabeçalho
+        cells = []
+        for sheet_row in rows:
+            for column, value in changes.items():
+                if column in headers:
+                    cell = f"{column_letter(headers.index(column) + 1)}{sheet_row}"
+                    cells.append({'range': cell, 'values': [["" if value is None else str(value)]]})
+        if cells and RECORD_ID_COLUMN in headers:
+            # Confere os IDs das linhas logo antes de gravar
+            current_ids = self._worksheet.col_values(headers.index(RECORD_ID_COLUMN) + 1)
+            for sheet_row, record_id in rows.items():
+                current = current_ids[sheet_row - 1] if len(current_ids) >= sheet_row else ""
+                if normalize_key_value(current) != normalize_key_value(record_id):
+                    raise StaleRowError(
+                        f"Linha {sheet_row} da planilha mudou durante a atualização "
+                        f"(esperado {record_id!r}, encontrado {current!r})"
+                    )
+        if cells:
+            self._worksheet.batch_update(cells)
+            # Edição no meio da planilha: a próxima leitura precisa ser completa
+            self.reader.reset()
+        return len(rows)
+
+    def status(self):
+        write_status = self.write_queue.status()
+        sync_status = self.sync_worker.status()
+        return {
+            'backend': self.name,
+            'online': self.online,
+            'unsynced': sync_status['unsynced'],
+            'pending': write_status['pending'],
+            'flushed': write_status['flushed'],
+            'failed': write_status['failed'],
+            'last_error': sync_status['last_error'],
+        }
+
+
+def create_backend(backend_name, sqlite_path=DEFAULT_SQLITE_PATH, sheets_factory=None):
+    """Cria o backend configurado; ``sheets_factory`` monta o backend do Google Sheets"""
+    if backend_name == BACKEND_SQLITE:
+        return SQLiteBackend(sqlite_path)
+    if backend_name == BACKEND_MEMORY:
+        return MemoryBackend()
+    if backend_name == BACKEND_SHEETS:
+        if sheets_factory is None:
+            raise ValueError("sheets_factory é obrigatório para o backend do Google Sheets")
+        return sheets_factory()
+    raise ValueError(f"Backend de armazenamento desconhecido: {backend_name}")
@@ -2,12 +2,27 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import functools
 import os
 from pathlib import Path
-import gspread
-from google.oauth2.service_account import Credentials
-import json
 import toml
+from concurrent.futures import ThreadPoolExecutor
+from catalog import DEFAULT_DATA_DIR, discover_partitions, load_shared_catalog, partition_label
+from export import (FORMAT_CSV, FORMAT_PARQUET, export_to_bytes, iter_dataframe_chunks,
+                    iter_worksheet_chunks)
+from facets import FacetIndex
+from search import SearchIndex
+from pending_items import build_validation_index, pending_positions
+from work_queue import WorkQueue
+from assignment import AssignmentQueue, DEFAULT_LEASE_SECONDS, DEFAULT_TARGET_REVIEWS, ReviewScheduler
+from sheets_client import SheetsClientPool, credentials_fingerprint
+from sheets_quota import DEFAULT_BURST, DEFAULT_READ_PER_MINUTE, DEFAULT_WRITE_PER_MINUTE, SheetsRequestScheduler
+from sheets_io import IncrementalWorksheetReader, LogSyncWorker, WriteBehindQueue
+from local_log import RECORD_ID_COLUMN, ValidationLog, default_owner
+from storage import BACKEND_SHEETS, DEFAULT_SQLITE_PATH, GoogleSheetsBackend, create_backend
+from validations_cache import DEFAULT_REFRESH_INTERVAL, SharedValidationsCache
+from perf import (DEFAULT_TRACE_MAX_BYTES, DEFAULT_TRACE_PATH, background_calls, begin_rerun, current_trace,
+                  end_rerun, instrument_client, profile_call, span, timed)
 
 # Configuração da página
 st.set_page_config(
@@ -17,63 +32,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Função para carregar dados do CSV
-@st.cache_data
-def load_data():
-    """Carrega os dados do arquivo CSV preparado"""
-    try:
-        # Caminho para o arquivo CSV - ajustado para Streamlit Cloud
-        csv_path = Path("data/chile_iip_2025_preparado.csv")
-        
-        # Se não encontrar no caminho local, tentar caminho relativo
-        if not csv_path.exists():
-            csv_path = Path("data/chile_iip_2025_preparado.csv")
-        
-        df = pd.read_csv(csv_path)
-        
-        # Limpar dados
-        df = df.fillna("")
-        
-        # Remover linhas completamente vazias
-        df = df.dropna(how='all')
-        
-        # Filtrar apenas linhas que têm Texto_Questao (questões)
-        df_questoes = df[df['Texto_Questao'].notna() & (df['Texto_Questao'] != '')].copy()
-        
-        return df, df_questoes
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        st.error(f"Tentando carregar de: {csv_path}")
-        return None, None
+# Caminho padrão do catálogo de itens
+DEFAULT_CSV_PATH = "data/chile_iip_2025_preparado.csv"
 
-# Função para converter tipos numpy/pandas para tipos Python nativos
-def convert_to_native_types(obj):
-    """Converte tipos numpy/pandas para tipos Python nativos (JSON serializáveis)"""
-    try:
-        if obj is None:
-            return None
-        elif isinstance(obj, (np.integer, np.int64, np.int32, np.int16, np.int8)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float64, np.float32, np.float16)):
-            if pd.isna(obj) or np.isnan(obj):
-                return None
-            return float(obj)
-        elif isinstance(obj, np.bool_):
-            return bool(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, dict):
-            return {str(key): convert_to_native_types(value) for key, value in obj.items()}
-        elif isinstance(obj, (list, tuple)):
-            return [convert_to_native_types(item) for item in obj]
-        elif pd.isna(obj):
-            return None
-        elif isinstance(obj, str):
-            return str(obj)
-        else:
-            return str(obj) if obj else None
-    except Exception as e:
-        return None
+# Campanhas (sistema/ano) mantidas em memória ao mesmo tempo; as menos usadas saem do cache
+MAX_LOADED_PARTITIONS = 3
 
 # Google Sheets scopes
 SCOPES = [
@@ -97,18 +60,52 @@ def get_sheet_id():
         st.error(f"Erro ao obter Sheet ID: {e}")
         return "1CNoUGOC82o7dF3Q0vv244gUYtuRndxRP6sNeeOpdqsY"
 
+def get_quota_settings():
+    """Cotas da API do Google Sheets ([quota] read_per_minute, write_per_minute e burst)"""
+    try:
+        if hasattr(st, 'secrets') and 'quota' in st.secrets:
+            quota = st.secrets['quota']
+            return (
+                float(quota.get('read_per_minute', DEFAULT_READ_PER_MINUTE)),
+                float(quota.get('write_per_minute', DEFAULT_WRITE_PER_MINUTE)),
+                int(quota.get('burst', DEFAULT_BURST)),
+            )
+    except Exception:
+        pass
+    return DEFAULT_READ_PER_MINUTE, DEFAULT_WRITE_PER_MINUTE, DEFAULT_BURST
+
+@st.cache_resource
+def get_request_scheduler(read_per_minute, write_per_minute, burst):
+    """Agendador das requisições ao Google Sheets (cotas de leitura/gravação) compartilhado pelo processo"""
+    return SheetsRequestScheduler(read_per_minute, write_per_minute, burst)
+
+@st.cache_resource
+def get_client_pool():
+    """Pool de clientes do Google Sheets compartilhado por todas as sessões do processo"""
+    return SheetsClientPool(SCOPES, instrument=instrument_client,
+                            scheduler=get_request_scheduler(*get_quota_settings()))
+
+@st.cache_data
+def load_local_secrets(path, mtime):
+    """Lê o secrets.toml local (relido apenas quando o arquivo muda)"""
+    return toml.load(path)
+
+@timed("connect_to_sheets")
 def connect_to_sheets():
     """Conecta ao Google Sheets priorizando st.secrets do Streamlit Cloud"""
+    # Pilha de autenticação do Google carregada só na primeira conexão
+    from google.oauth2.service_account import Credentials
+
+    pool = get_client_pool()
     try:
         # Estratégia 1: Tenta carregar de st.secrets (Streamlit Cloud) - PRIORIDADE
         if hasattr(st, 'secrets') and 'gcp_service_account' in st.secrets:
             try:
-                creds = Credentials.from_service_account_info(
-                    st.secrets['gcp_service_account'], 
-                    scopes=SCOPES
+                info = dict(st.secrets['gcp_service_account'])
+                return pool.get_client(
+                    f"st.secrets:{credentials_fingerprint(info)}",
+                    lambda scopes: Credentials.from_service_account_info(info, scopes=scopes)
                 )
-                client = gspread.authorize(creds)
-                return client
             except Exception as e:
                 st.sidebar.warning(f"⚠️ Erro com st.secrets: {e}")
         
@@ -116,14 +113,13 @@ def connect_to_sheets():
         secrets_path = Path(".streamlit/secrets.toml")
         if secrets_path.exists():
             try:
-                secrets_data = toml.load(str(secrets_path))
+                secrets_data = load_local_secrets(str(secrets_path), secrets_path.stat().st_mtime)
                 if 'gcp_service_account' in secrets_data:
-                    creds = Credentials.from_service_account_info(
-                        secrets_data['gcp_service_account'], 
-                        scopes=SCOPES
+                    info = secrets_data['gcp_service_account']
+                    return pool.get_client(
+                        f"secrets.toml:{credentials_fingerprint(info)}",
+                        lambda scopes: Credentials.from_service_account_info(info, scopes=scopes)
                     )
-                    client = gspread.authorize(creds)
-                    return client
             except Exception as e:
                 st.sidebar.warning(f"⚠️ Erro com secrets.toml: {e}")
         
@@ -131,9 +127,10 @@ def connect_to_sheets():
         creds_path = Path("credentials.json")
         if creds_path.exists():
             try:
-                creds = Credentials.from_service_account_file(str(creds_path), scopes=SCOPES)
-                client = gspread.authorize(creds)
-                return client
+                return pool.get_client(
+                    f"credentials.json:{creds_path.stat().st_mtime}",
+                    lambda scopes: Credentials.from_service_account_file(str(creds_path), scopes=scopes)
+                )
             except Exception as e:
                 st.sidebar.warning(f"⚠️ Erro com credentials.json: {e}")
         
@@ -154,8 +151,18 @@ def connect_to_sheets():
         st.error(f"❌ Erro ao conectar ao Google Sheets: {e}")
         return None
 
+def open_spreadsheet(client):
+    """Abre a planilha configurada reaproveitando o handle memoizado no pool"""
+    return get_client_pool().open_by_key(client, get_sheet_id())
+
+def open_worksheet(client, worksheet_name):
+    """Abre a worksheet pelo nome reaproveitando o handle memoizado no pool"""
+    return get_client_pool().worksheet(client, get_sheet_id(), worksheet_name)
+
 def test_google_sheets_connection():
     """Testa a conexão com o Google Sheets e fornece feedback detalhado"""
+    import gspread
+
     try:
         client = connect_to_sheets()
         if client:
@@ -169,6 +176,7 @@ def test_google_sheets_connection():
                 st.sidebar.error(f"❌ Planilha com ID {sheet_id} não encontrada. Verifique o ID.")
                 return False
             except Exception as e:
+                get_client_pool().report_error(client, e)
                 st.sidebar.error(f"❌ Erro ao acessar planilha: {e}")
                 return False
         else:
@@ -178,270 +186,520 @@ def test_google_sheets_connection():
         st.sidebar.error(f"❌ Erro na conexão: {e}")
         return False
 
-def save_validation_to_sheets_streamlit(validation_data, worksheet_name="Validações_Streamlit"):
-    """Salva a validação (dicionário) em uma worksheet específica no Google Sheets."""
-    client = connect_to_sheets()
-    if not client:
-        return False
+@st.cache_resource
+def get_write_queue(sheet_id, worksheet_name):
+    """Fila de gravação em lote da worksheet (compartilhada por todas as sessões)"""
+    return WriteBehindQueue()
+
+@st.cache_resource
+def get_validation_log():
+    """Log local das avaliações (primeiro destino de toda gravação)"""
+    return ValidationLog()
+
+@st.cache_resource
+def get_sync_worker(sheet_id, worksheet_name):
+    """Sincronizador do log local com a worksheet de validações"""
+    return LogSyncWorker(get_validation_log(), get_write_queue(sheet_id, worksheet_name), default_owner())
+
+@st.cache_resource
+def get_validations_reader(sheet_id, worksheet_name):
+    """Leitor incremental da worksheet de validações (snapshot compartilhado pelo processo)"""
+    return IncrementalWorksheetReader()
+
+def get_storage_settings():
+    """Obtém o backend de armazenamento dos secrets ([storage] backend = "sheets" | "sqlite" | "memory")"""
+    try:
+        if hasattr(st, 'secrets') and 'storage' in st.secrets:
+            storage = st.secrets['storage']
+            return storage.get('backend', BACKEND_SHEETS), storage.get('sqlite_path', str(DEFAULT_SQLITE_PATH))
+    except Exception:
+        pass
+    return BACKEND_SHEETS, str(DEFAULT_SQLITE_PATH)
+
+@st.cache_resource
+def get_storage_backend(backend_name, sqlite_path, sheet_id, worksheet_name):
+    """Backend de armazenamento das avaliações (compartilhado por todas as sessões)"""
+    return create_backend(
+        backend_name,
+        sqlite_path=sqlite_path,
+        sheets_factory=lambda: GoogleSheetsBackend(
+            get_validation_log(),
+            get_write_queue(sheet_id, worksheet_name),
+            get_validations_reader(sheet_id, worksheet_name),
+            get_sync_worker(sheet_id, worksheet_name),
+        ),
+    )
+
+def get_backend(worksheet_name="Validações_Streamlit"):
+    """Backend configurado para a worksheet informada"""
+    backend_name, sqlite_path = get_storage_settings()
+    return get_storage_backend(backend_name, sqlite_path, get_sheet_id(), worksheet_name)
+
+def get_refresh_interval():
+    """Intervalo de atualização do cache de avaliações ([storage] refresh_interval, em segundos)"""
+    try:
+        if hasattr(st, 'secrets') and 'storage' in st.secrets:
+            return float(st.secrets['storage'].get('refresh_interval', DEFAULT_REFRESH_INTERVAL))
+    except Exception:
+        pass
+    return DEFAULT_REFRESH_INTERVAL
+
+@st.cache_resource
+def get_shared_validations(backend_name, sqlite_path, sheet_id, worksheet_name, refresh_interval):
+    """Snapshot das avaliações compartilhado por todas as sessões do processo"""
+    return SharedValidationsCache(
+        get_storage_backend(backend_name, sqlite_path, sheet_id, worksheet_name),
+        refresh_interval=refresh_interval,
+    )
+
+def get_assignment_settings():
+    """Meta de avaliações por item e reserva dos itens ([assignment] target_reviews, lease_seconds)
+
+    target_reviews = 0 desativa a distribuição: cada avaliador segue a ordem do catálogo."""
+    try:
+        if hasattr(st, 'secrets') and 'assignment' in st.secrets:
+            assignment = st.secrets['assignment']
+            return (int(assignment.get('target_reviews', DEFAULT_TARGET_REVIEWS)),
+                    float(assignment.get('lease_seconds', DEFAULT_LEASE_SECONDS)))
+    except Exception:
+        pass
+    return DEFAULT_TARGET_REVIEWS, DEFAULT_LEASE_SECONDS
+
+@st.cache_resource(max_entries=MAX_LOADED_PARTITIONS)
+def get_review_scheduler(csv_path, mtime, target_reviews, lease_seconds):
+    """Distribuidor de itens entre os avaliadores da campanha (compartilhado por todas as sessões)"""
+    return ReviewScheduler(get_catalog(csv_path, mtime).item_keys, target=target_reviews, lease_seconds=lease_seconds)
+
+def get_validations_cache(worksheet_name="Validações_Streamlit"):
+    """Cache compartilhado de avaliações do backend configurado"""
+    backend_name, sqlite_path = get_storage_settings()
+    return get_shared_validations(backend_name, sqlite_path, get_sheet_id(), worksheet_name, get_refresh_interval())
+
+def open_or_create_worksheet(client, worksheet_name, headers):
+    """Abre a worksheet ou a cria com os headers informados"""
+    import gspread
 
     try:
+        return open_worksheet(client, worksheet_name)
+    except gspread.exceptions.WorksheetNotFound:
         sheet_id = get_sheet_id()
-        
-        try:
-            sheet = client.open_by_key(sheet_id)
-        except gspread.exceptions.SpreadsheetNotFound:
-            st.error(f"❌ Planilha com ID {sheet_id} não encontrada. Verifique o ID nos secrets.")
-            return False
+        sheet = open_spreadsheet(client)
+        worksheet = sheet.add_worksheet(title=worksheet_name, rows=1000, cols=max(20, len(headers)))
+        worksheet.append_row(headers)
+        get_client_pool().remember_worksheet(client, sheet_id, worksheet)
+        get_write_queue(sheet_id, worksheet_name).set_headers(headers)
+        return worksheet
 
-        # Selecionar ou criar worksheet
-        try:
-            worksheet = sheet.worksheet(worksheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            headers = list(validation_data.keys())
-            worksheet = sheet.add_worksheet(title=worksheet_name, rows=1000, cols=max(20, len(headers)))
-            worksheet.append_row(headers)
-
-        # Garantir headers
-        existing = worksheet.get_all_values()
-        if not existing or len(existing) == 0:
-            headers = list(validation_data.keys())
-            worksheet.append_row(headers)
-        else:
-            headers = existing[0]
-
-        # Preparar linha de dados na ordem dos headers
-        row = []
-        for h in headers:
-            v = validation_data.get(h, "")
-            if v is None:
-                row.append("")
-            elif isinstance(v, (int, float, bool, str)):
-                row.append(str(v))
-            else:
-                try:
-                    row.append(str(v))
-                except:
-                    row.append("")
+def save_validation_to_sheets_streamlit(validation_data, worksheet_name="Validações_Streamlit"):
+    """Salva a validação (dicionário) no backend configurado (log local + Google Sheets por padrão)."""
+    backend = get_backend(worksheet_name)
 
-        worksheet.append_row(row)
+    # 1. Gravação no backend (no Google Sheets, vai primeiro para o log local)
+    try:
+        record_id = backend.append(validation_data)
+    except Exception as e:
+        st.error(f"❌ Erro ao gravar avaliação: {e}")
+        return False
+    
+    # Write-through: todas as sessões veem a avaliação sem reler a planilha
+    get_validations_cache(worksheet_name).add(dict(validation_data, **{RECORD_ID_COLUMN: record_id}))
+
+    if not isinstance(backend, GoogleSheetsBackend):
         st.sidebar.success("✅ Dados salvos com sucesso!")
         return True
 
-    except Exception as e:
-        st.error(f"❌ Erro ao salvar no Google Sheets: {e}")
-        return False
+    # 2. Sincronização em segundo plano (idempotente pelo record_id)
+    import gspread
 
-def load_existing_validations(worksheet_name="Validações_Streamlit"):
-    """Carrega validações existentes da worksheet específica no Google Sheets."""
     client = connect_to_sheets()
     if not client:
-        return pd.DataFrame()
+        backend.detach()
+        st.sidebar.warning("📴 Modo offline: avaliação salva localmente e será enviada quando a conexão voltar.")
+        return True
 
+    try:
+        headers = list(validation_data.keys()) + [RECORD_ID_COLUMN]
+        backend.attach(open_or_create_worksheet(client, worksheet_name, headers))
+        st.sidebar.success("✅ Dados salvos com sucesso!")
+        return True
+
+    except gspread.exceptions.SpreadsheetNotFound:
+        backend.detach()
+        st.sidebar.warning(f"⚠️ Planilha com ID {get_sheet_id()} não encontrada. Avaliação mantida no log local.")
+        return True
+    except Exception as e:
+        backend.detach()
+        get_client_pool().report_error(client, e)
+        st.sidebar.warning(f"⚠️ Google Sheets indisponível ({e}). Avaliação mantida no log local.")
+        return True
+
+def attach_sheets_backend(backend, worksheet_name):
+    """Anexa a worksheet ao backend do Google Sheets (ou passa para o modo offline)"""
+    import gspread
+
+    client = connect_to_sheets()
+    if not client:
+        # Offline: as avaliações do log local continuam contando como validadas
+        backend.detach()
+        return
+    
     try:
         sheet_id = get_sheet_id()
-        sheet = client.open_by_key(sheet_id)
-        worksheet = sheet.worksheet(worksheet_name)
-        data = worksheet.get_all_records()
-        return pd.DataFrame(data)
+        # Anexar a worksheet também envia entradas pendentes do log local
+        backend.attach(open_worksheet(client, worksheet_name))
     except gspread.exceptions.WorksheetNotFound:
-        return pd.DataFrame()
+        # Worksheet removida (ou ainda não criada): não há avaliações remotas
+        backend.detach()
+        backend.reader.reset()
     except gspread.exceptions.SpreadsheetNotFound:
+        backend.detach()
         st.error(f"❌ Planilha com ID {sheet_id} não encontrada.")
-        return pd.DataFrame()
+    except Exception as e:
+        # Falha transitória: o último snapshot lido continua valendo enquanto offline
+        backend.detach()
+        get_client_pool().report_error(client, e)
+        st.error(f"❌ Erro ao carregar validações: {e}")
+
+def load_existing_validations(worksheet_name="Validações_Streamlit"):
+    """Carrega validações existentes (snapshot compartilhado, atualizado em segundo plano a partir do backend)."""
+    backend = get_backend(worksheet_name)
+    cache = get_validations_cache(worksheet_name)
+    
+    if isinstance(backend, GoogleSheetsBackend):
+        was_online = backend.online
+        attach_sheets_backend(backend, worksheet_name)
+        if backend.online != was_online and cache.status()['refreshes']:
+            # Conexão caiu ou voltou: atualizar o snapshot sem esperar o intervalo
+            cache.request_refresh()
+    
+    try:
+        return cache.snapshot()
     except Exception as e:
         st.error(f"❌ Erro ao carregar validações: {e}")
         return pd.DataFrame()
 
-def check_existing_validation(validations_df, item_data):
-    """Verifica se um item já foi validado pelo usuário atual"""
-    if validations_df.empty:
-        return None
+def load_user_validations(usuario, worksheet_name="Validações_Streamlit"):
+    """Avaliações do usuário (projeção do snapshot compartilhado, sem cópia por sessão)"""
+    try:
+        return get_validations_cache(worksheet_name).user_view(usuario)
+    except Exception:
+        return pd.DataFrame()
+
+@st.cache_data(ttl=60)
+def list_partitions(data_dir=str(DEFAULT_DATA_DIR)):
+    """Catálogos disponíveis em data/ (um por sistema/ano), redescobertos a cada minuto"""
+    return discover_partitions(data_dir)
+
+def default_partition_index(partitions):
+    """Posição da campanha padrão (a do CSV padrão, se existir; senão a mais recente)"""
+    for i, partition in enumerate(partitions):
+        if Path(partition.path) == Path(DEFAULT_CSV_PATH):
+            return i
+    return 0
+
+def catalog_mtime(csv_path):
+    """Data de modificação do CSV (parte da chave dos caches do catálogo)"""
+    return os.path.getmtime(csv_path) if os.path.exists(csv_path) else None
+
+@st.cache_resource
+def get_catalog_loader():
+    """Thread que carrega catálogos em segundo plano, compartilhada pelo processo"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-load")
+
+@st.cache_resource(max_entries=MAX_LOADED_PARTITIONS)
+def preload_catalog(csv_path, mtime):
+    """Inicia o carregamento do catálogo em segundo plano e devolve o Future compartilhado"""
+    return get_catalog_loader().submit(load_shared_catalog, csv_path)
+
+def preload_selected_catalog():
+    """Dispara a carga do catálogo da campanha selecionada antes de desenhar a página
     
+    Título, painel de armazenamento e barra lateral são desenhados enquanto o CSV é
+    lido; get_catalog só espera pelo que ainda faltar."""
+    csv_path = st.session_state.get('campanha')
+    if csv_path is None:
+        partitions = list_partitions()
+        csv_path = str(partitions[default_partition_index(partitions)].path) if partitions else DEFAULT_CSV_PATH
+    preload_catalog(csv_path, catalog_mtime(csv_path))
+
+@st.cache_resource(max_entries=MAX_LOADED_PARTITIONS)
+def get_catalog(csv_path, mtime):
+    """Catálogo de questões somente leitura, compartilhado por todas as sessões (None se não carregar)"""
     try:
-        numero_questao = str(item_data.get('Numero_Questao', '')) if 'Numero_Questao' in item_data.index else ''
-        sistema = str(item_data.get('sistema', '')) if 'sistema' in item_data.index else ''
-        ano = item_data.get('ano', None) if 'ano' in item_data.index else None
-    except (KeyError, AttributeError):
+        return preload_catalog(csv_path, mtime).result()
+    except Exception as e:
+        st.error(f"Erro ao carregar dados: {e}")
+        st.error(f"Tentando carregar de: {csv_path}")
         return None
+
+@st.cache_resource(max_entries=MAX_LOADED_PARTITIONS)
+def get_facet_index(csv_path, mtime):
+    """Índice de facetas do catálogo (reconstruído apenas quando o CSV muda)"""
+    return FacetIndex(get_catalog(csv_path, mtime).frame)
+
+@st.cache_resource(max_entries=MAX_LOADED_PARTITIONS)
+def get_search_index(csv_path, mtime):
+    """Índice invertido da busca por texto (reconstruído apenas quando o CSV muda)"""
+    return SearchIndex(get_catalog(csv_path, mtime).frame)
+
+def filter_item_ids(facet_index, search_index, dimensao_filtro='', capacidade_filtro='', busca=''):
+    """Posições (em df_questoes) dos itens que atendem aos filtros da barra lateral
     
-    if 'numero_questao' in validations_df.columns:
-        mask = (
-            (validations_df['usuario'] == st.session_state.get('usuario', '')) &
-            (validations_df['sistema'] == sistema) &
-            (validations_df['ano'] == ano) &
-            (validations_df['numero_questao'] == numero_questao)
-        )
-    else:
-        try:
-            texto_questao = str(item_data.get('Texto_Questao', '')) if 'Texto_Questao' in item_data.index else ''
-        except (KeyError, AttributeError):
-            texto_questao = ''
-        
-        if 'texto_questao' in validations_df.columns:
-            mask = (
-                (validations_df['usuario'] == st.session_state.get('usuario', '')) &
-                (validations_df['sistema'] == sistema) &
-                (validations_df['texto_questao'] == texto_questao)
-            )
-        else:
-            return None
+    Com busca por texto, os itens vêm ordenados pela relevância da busca."""
+    row_ids = facet_index.row_ids(dimensao_filtro, capacidade_filtro)
+    
+    ranked = search_index.search(busca) if busca else None
+    if ranked is not None:
+        if row_ids is facet_index.all_ids:
+            return ranked
+        return ranked[np.isin(ranked, row_ids, assume_unique=True)]
     
-    existing = validations_df[mask]
-    return existing.iloc[0] if not existing.empty else None
+    return row_ids
+
+def export_chunks(worksheet_name="Validações_Streamlit"):
+    """Blocos de avaliações para exportação: a worksheet em faixas (Google Sheets) ou o snapshot"""
+    backend = get_backend(worksheet_name)
+    if isinstance(backend, GoogleSheetsBackend) and backend.online:
+        client = connect_to_sheets()
+        if client:
+            # Handle novo: o número de linhas da grade precisa estar atualizado
+            return iter_worksheet_chunks(open_spreadsheet(client).worksheet(worksheet_name))
+    return iter_dataframe_chunks(load_existing_validations(worksheet_name))
+
+def render_export_panel():
+    """Exportação das avaliações (CSV ou Parquet particionado por sistema/ano/usuário)"""
+    with st.expander("📥 Exportar validações"):
+        formato = st.radio("Formato", [FORMAT_CSV, FORMAT_PARQUET], horizontal=True, key="export_format",
+                           format_func=lambda f: "CSV" if f == FORMAT_CSV else "Parquet (zip)")
+        if st.button("Gerar arquivo", key="export_generate"):
+            try:
+                with st.spinner("Exportando..."):
+                    data, file_name = export_to_bytes(export_chunks(), formato)
+                st.session_state['export_file'] = (data, file_name)
+            except Exception as e:
+                st.error(f"❌ Erro ao exportar validações: {e}")
+        export_file = st.session_state.get('export_file')
+        if export_file:
+            data, file_name = export_file
+            st.download_button(
+                f"⬇️ Baixar {file_name}",
+                data=data,
+                file_name=file_name,
+                mime="text/csv" if file_name.endswith(".csv") else "application/zip",
+            )
 
-def safe_get(item, key, default=''):
-    """Extrai valor do item de forma segura, convertendo para tipo nativo"""
+def load_validation_summary(usuario, sistema=None, ano=None, worksheet_name="Validações_Streamlit"):
+    """Resumo das validações do usuário na campanha, a partir dos contadores do snapshot compartilhado"""
     try:
-        if hasattr(item, 'get'):
-            value = item.get(key, default)
-        elif hasattr(item, '__getitem__'):
-            if hasattr(item, 'index') and key in item.index:
-                value = item[key]
-            elif key in item:
-                value = item[key]
-            else:
-                value = default
-        else:
-            value = default
-        
-        if pd.isna(value):
-            return default if default != None else None
-        
-        if isinstance(value, (np.integer, np.int64, np.int32, np.int16, np.int8)):
-            return int(value)
-        elif isinstance(value, (np.floating, np.float64, np.float32, np.float16)):
-            return float(value)
-        elif isinstance(value, np.bool_):
-            return bool(value)
+        return get_validations_cache(worksheet_name).aggregates().summary(usuario=usuario, sistema=sistema, ano=ano)
+    except Exception:
+        return {'total': 0}
+
+def load_agreement(worksheet_name="Validações_Streamlit"):
+    """Concordância entre avaliadores do snapshot compartilhado (None se as avaliações não carregarem)"""
+    try:
+        return get_validations_cache(worksheet_name).agreement()
+    except Exception:
+        return None
+
+def format_agreement_index(value):
+    """Alfa/kappa com três casas (— quando indefinido: sem pares ou sem variação nas respostas)"""
+    return "—" if value != value else f"{value:.3f}"
+
+def get_trace_settings():
+    """Arquivo JSONL do trace de desempenho e tamanho máximo antes da rotação
+
+    [perf] trace_path (vazio desativa) e trace_max_mb (0 desativa a rotação) nos secrets."""
+    try:
+        if hasattr(st, 'secrets') and 'perf' in st.secrets:
+            perf = st.secrets['perf']
+            max_mb = perf.get('trace_max_mb', DEFAULT_TRACE_MAX_BYTES / (1024 * 1024))
+            return perf.get('trace_path', str(DEFAULT_TRACE_PATH)), int(float(max_mb) * 1024 * 1024)
+    except Exception:
+        pass
+    return str(DEFAULT_TRACE_PATH), DEFAULT_TRACE_MAX_BYTES
+
+def get_session_id():
+    """Identificador da sessão do Streamlit (None fora do `streamlit run`)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx is not None else None
+    except Exception:
+        return None
+
+def measure_run(func, fragment=None):
+    """Executa a página (ou um fragmento) como um rerun medido; retorna (resultado, trace)
+
+    O trace é gravado no JSONL e, com o checkbox do painel marcado, a execução é
+    perfilada com cProfile (o perfil fica disponível no painel).
+    """
+    trace, token = begin_rerun(get_session_id(), fragment)
+    try:
+        if st.session_state.get('perf_profile_next'):
+            # Perfil de um único rerun: o checkbox é desmarcado antes de ser recriado
+            st.session_state['perf_profile_next'] = False
+            result, dump, summary = profile_call(func)
+            st.session_state['perf_profile'] = {
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'dump': dump,
+                'summary': summary,
+            }
         else:
-            return str(value) if value else default
-    except (KeyError, IndexError, AttributeError, TypeError):
-        return default
+            result = func()
+    finally:
+        end_rerun(trace, token, *get_trace_settings())
+    if fragment is not None:
+        # Fragmentos não desenham na barra lateral: o painel mostra o último no próximo rerun da página
+        st.session_state['perf_fragment'] = trace
+    return result, trace
+
+def traced_fragment(func):
+    """Mede as reexecuções só do fragmento (que não passam por run_with_perf) como um rerun próprio
+
+    Dentro do rerun da página a função é chamada diretamente: seus spans já entram no trace da página.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_trace() is not None:
+            return func(*args, **kwargs)
+        result, _ = measure_run(functools.partial(func, *args, **kwargs), fragment=func.__name__)
+        return result
+    return wrapper
 
 # Interface principal
-def main():
-    st.title("📊 Validação de Itens - Índice de Inovação Pública")
-    st.markdown("---")
+@st.fragment
+@traced_fragment
+def render_storage_panel():
+    """Planilha, status do armazenamento e exportação (fragmento: botões não recarregam a página)"""
+    # Exibir informações da planilha
+    sheet_id = get_sheet_id()
+    st.info(f"📊 ID da Planilha: `{sheet_id}`")
     
-    # Sidebar para configurações
-    with st.sidebar:
-        st.header("⚙️ Configurações")
-        
-        # Exibir informações da planilha
-        sheet_id = get_sheet_id()
-        st.info(f"📊 ID da Planilha: `{sheet_id}`")
-        
-        # Teste de conexão
-        if st.button("🧪 Testar Conexão Google Sheets"):
-            test_google_sheets_connection()
-        
-        # Identificação do usuário
-        usuario = st.text_input("Nome do Avaliador:", key="usuario_input")
-        if usuario:
-            st.session_state['usuario'] = usuario
-        
-        # Filtros
-        st.subheader("🔍 Filtros")
-        
-        # Carregar dados
-        df, df_questoes = load_data()
-        
-        if df is not None:
-            # Filtro por dimensão
-            dimensoes = [''] + sorted(df_questoes['Dimensao'].dropna().unique().tolist())
-            dimensao_filtro = st.selectbox("Dimensão:", dimensoes)
-            
-            # Filtro por capacidade chave (subdimensão)
-            if dimensao_filtro:
-                capacidades = [''] + sorted(df_questoes[df_questoes['Dimensao'] == dimensao_filtro]['Capacidade_Chave'].dropna().unique().tolist())
-            else:
-                capacidades = [''] + sorted(df_questoes['Capacidade_Chave'].dropna().unique().tolist())
-            capacidade_filtro = st.selectbox("Capacidade Chave:", capacidades)
-            
-            # Busca por texto
-            busca = st.text_input("Buscar por texto:")
-            
-            # Aplicar filtros
-            df_filtrado = df_questoes.copy()
-            
-            if dimensao_filtro:
-                df_filtrado = df_filtrado[df_filtrado['Dimensao'] == dimensao_filtro]
-            
-            if capacidade_filtro:
-                df_filtrado = df_filtrado[df_filtrado['Capacidade_Chave'] == capacidade_filtro]
-            
-            if busca:
-                mask = df_filtrado['Texto_Questao'].str.contains(busca, case=False, na=False)
-                df_filtrado = df_filtrado[mask]
-            
-            st.info(f"📈 Total de itens: {len(df_filtrado)}")
-            
-            # Estatísticas
-            if not df_filtrado.empty:
-                st.subheader("📊 Estatísticas")
-                st.write(f"**Dimensões:** {df_filtrado['Dimensao'].nunique()}")
-                st.write(f"**Capacidades Chave:** {df_filtrado['Capacidade_Chave'].nunique()}")
+    # Teste de conexão
+    if st.button("🧪 Testar Conexão Google Sheets"):
+        test_google_sheets_connection()
     
-    # Área principal
-    if df is None:
-        st.error("❌ Erro ao carregar dados. Verifique se o arquivo CSV existe.")
-        return
+    # Status do armazenamento (fila de gravação e log local no Google Sheets)
+    storage_status = get_backend().status()
+    if storage_status['backend'] == BACKEND_SHEETS:
+        st.caption(
+            f"📤 Não sincronizadas: {storage_status['unsynced']} · "
+            f"na fila: {storage_status['pending']} · "
+            f"gravadas: {storage_status['flushed']} · falhas: {storage_status['failed']}"
+        )
+        if storage_status['last_error']:
+            st.caption(f"⚠️ Última falha de sincronização: {storage_status['last_error']}")
+        quota_status = get_request_scheduler(*get_quota_settings()).status()
+        if quota_status['throttled'] or quota_status['retries'] or quota_status['coalesced']:
+            st.caption(
+                f"🚦 Cota da API: {quota_status['throttled']} limitadas · "
+                f"{quota_status['retries']} novas tentativas · "
+                f"{quota_status['coalesced']} leituras agrupadas"
+            )
+    else:
+        st.caption(f"💽 Armazenamento: {storage_status['backend']} · {storage_status['records']} avaliações")
     
-    if not usuario:
-        st.warning("⚠️ Por favor, identifique-se na barra lateral para começar a avaliação.")
-        return
+    # Snapshot compartilhado das avaliações
+    cache_status = get_validations_cache().status()
+    if cache_status['last_refresh_at']:
+        idade = datetime.now().timestamp() - cache_status['last_refresh_at']
+        st.caption(f"🔄 Snapshot v{cache_status['version']} · {cache_status['records']} avaliações · atualizado há {idade:.0f}s")
+    if cache_status['last_error']:
+        st.caption(f"⚠️ Última falha ao atualizar avaliações: {cache_status['last_error']}")
     
-    # Carregar validações existentes
-    validations_df = load_existing_validations()
+    render_export_panel()
+
+def mark_filters_changed():
+    """Callback dos filtros: a página inteira precisa ser recalculada"""
+    st.session_state['filtros_alterados'] = True
+
+@st.fragment
+@traced_fragment
+def render_filters(facet_index, search_index):
+    """Filtros da barra lateral (fragmento); retorna os IDs de linha dos itens filtrados"""
+    # Filtro por dimensão
+    dimensao_filtro = st.selectbox(
+        "Dimensão:",
+        [''] + facet_index.dimensions,
+        format_func=lambda d: f"{d} ({facet_index.item_count(d)})" if d else d,
+        key="filtro_dimensao",
+        on_change=mark_filters_changed
+    )
     
-    # Seleção de item para avaliação
-    st.subheader("🎯 Avaliação de Item")
+    # Filtro por capacidade chave (subdimensão)
+    capacidade_filtro = st.selectbox(
+        "Capacidade Chave:",
+        [''] + facet_index.capabilities(dimensao_filtro),
+        format_func=lambda c: f"{c} ({facet_index.item_count(dimensao_filtro, c)})" if c else c,
+        key="filtro_capacidade",
+        on_change=mark_filters_changed
+    )
     
-    if df_filtrado.empty:
-        st.warning("Nenhum item encontrado com os filtros aplicados.")
-        return
+    # Busca por texto (sem acentos, por prefixo; todos os termos precisam aparecer)
+    busca = st.text_input("Buscar por texto:", key="filtro_busca", on_change=mark_filters_changed)
     
-    # Selecionar item aleatório não validado
-    if 'current_item_index' not in st.session_state:
-        st.session_state['current_item_index'] = 0
+    # Aplicar filtros (interseção dos IDs de linha das facetas e da busca)
+    with span("filter_items"):
+        row_ids = filter_item_ids(facet_index, search_index, dimensao_filtro, capacidade_filtro, busca)
     
-    # Encontrar próximo item não validado
-    items_nao_validados = []
-    for idx, row in df_filtrado.iterrows():
-        existing = check_existing_validation(validations_df, row)
-        if existing is None:
-            items_nao_validados.append(idx)
+    # Filtros alterados: a lista de itens e o progresso dependem deles
+    if st.session_state.pop('filtros_alterados', False):
+        st.rerun()
     
-    if not items_nao_validados:
-        st.success("🎉 Todos os itens foram validados!")
-        return
+    st.info(f"📈 Total de itens: {len(row_ids)}")
     
-    # Selecionar item atual
-    current_idx = items_nao_validados[st.session_state['current_item_index'] % len(items_nao_validados)]
-    current_item = df_filtrado.loc[current_idx]
+    # Estatísticas
+    if len(row_ids):
+        facet_counts = facet_index.counts(row_ids)
+        st.subheader("📊 Estatísticas")
+        st.write(f"**Dimensões:** {facet_counts['Dimensao']}")
+        st.write(f"**Capacidades Chave:** {facet_counts['Capacidade_Chave']}")
+    
+    return row_ids
+
+def advance_item():
+    """Pula para o próximo item pendente (callback do botão Próximo Item)"""
+    st.session_state['fila_itens'].skip()
+
+@st.fragment
+@traced_fragment
+def render_evaluation(queue, usuario):
+    """Item atual e formulário de avaliação (fragmento)
+
+    Cliques no formulário reexecutam apenas este trecho, sem recarregar o catálogo
+    nem as avaliações; o armazenamento só é acessado ao salvar.
+    """
+    # Item atual da fila (registro nativo do catálogo: só leitura de atributos)
+    current_idx = queue.current()
+    item = queue.current_item()
     
     # Exibir informações do item
     col1, col2 = st.columns([1.5, 1.5])
     
     with col1:
         st.markdown("### 📋 Informações do Item")
+        if isinstance(queue, AssignmentQueue):
+            st.caption(
+                f"👥 Avaliações deste item: {queue.review_count(current_idx)} de {queue.scheduler.target}"
+            )
         
         # Informações iniciais (obrigatórias)
         st.markdown("#### 📌 Informações Principais")
         
         # 1. Número da Questão
-        numero_questao = safe_get(current_item, 'Numero_Questao', '')
+        numero_questao = item.numero_questao
         if numero_questao:
             st.write(f"**Número da Questão:** {numero_questao}")
         
         # 2. Questão
-        questao = safe_get(current_item, 'Texto_Questao', '')
+        questao = item.texto_questao
         if questao:
             st.markdown(f"**Questão:**")
             st.text_area("", value=questao, height=100, disabled=True, key=f"questao_display_{current_idx}")
         
         # 3. Respuesta
-        respuesta = safe_get(current_item, 'Respuesta', '')
+        respuesta = item.respuesta
         if respuesta:
             st.write(f"**Respuesta:** {respuesta}")
         
@@ -451,46 +709,46 @@ def main():
         st.markdown("#### ℹ️ Informações Adicionais")
         
         # Dimensão
-        dimensao = safe_get(current_item, 'Dimensao', '')
+        dimensao = item.dimensao
         if dimensao:
             st.write(f"**Dimensão:** {dimensao}")
         
         # Capacidade Chave
-        capacidade_chave = safe_get(current_item, 'Capacidade_Chave', '')
+        capacidade_chave = item.capacidade_chave
         if capacidade_chave:
             st.write(f"**Capacidade Chave:** {capacidade_chave}")
         
         # Pontuação Máx. Dimensão
-        pont_max_dimensao = safe_get(current_item, 'Pontuacao_Maxima_Dimensao', None)
+        pont_max_dimensao = item.pontuacao_maxima_dimensao
         if pont_max_dimensao is not None and pont_max_dimensao != '':
             st.write(f"**Pontuação Máx. Dimensão:** {pont_max_dimensao}")
         
         # Pontuação Máx. Capacidade Chave
-        pont_max_capacidade = safe_get(current_item, 'Pontuacao_Maxima_Capacidadclave', None)
+        pont_max_capacidade = item.pontuacao_maxima_capacidade_chave
         if pont_max_capacidade is not None and pont_max_capacidade != '':
             st.write(f"**Pontuação Máx. Capacidade Chave:** {pont_max_capacidade}")
         
         # Pontuação Máx. Questão
-        pont_max_questao = safe_get(current_item, 'Pontuacao_Maxima_Questao', None)
+        pont_max_questao = item.pontuacao_maxima_questao
         if pont_max_questao is not None and pont_max_questao != '':
             st.write(f"**Pontuação Máx. Questão:** {pont_max_questao}")
         
         # Pontuação Item
-        pont_item = safe_get(current_item, 'Pontuação_item', '')
+        pont_item = item.pontuacao_item
         if pont_item:
             st.write(f"**Pontuação Item:** {pont_item}")
         
         # Nome da Variável
-        nome_variavel = safe_get(current_item, 'Nomble de la variable', '')
+        nome_variavel = item.nome_variavel
         if nome_variavel:
             st.write(f"**Nome da Variável:** {nome_variavel}")
         
         # Sistema e Ano
-        sistema = safe_get(current_item, 'sistema', '')
+        sistema = item.sistema
         if sistema:
             st.write(f"**Sistema:** {sistema}")
         
-        ano = safe_get(current_item, 'ano', None)
+        ano = item.ano
         if ano is not None:
             st.write(f"**Ano:** {ano}")
     
@@ -614,18 +872,18 @@ def main():
                     validation_data = {
                         'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                         'usuario': str(usuario),
-                        'sistema': safe_get(current_item, 'sistema'),
-                        'ano': safe_get(current_item, 'ano', None),
-                        'dimensao': safe_get(current_item, 'Dimensao'),
-                        'pontuacao_maxima_dimensao': safe_get(current_item, 'Pontuacao_Maxima_Dimensao', None),
-                        'capacidade_chave': safe_get(current_item, 'Capacidade_Chave'),
-                        'pontuacao_maxima_capacidade_chave': safe_get(current_item, 'Pontuacao_Maxima_Capacidadclave', None),
-                        'nome_variavel': safe_get(current_item, 'Nomble de la variable'),
-                        'numero_questao': safe_get(current_item, 'Numero_Questao'),
-                        'texto_questao': safe_get(current_item, 'Texto_Questao'),
-                        'respuesta': safe_get(current_item, 'Respuesta'),
-                        'pontuacao_maxima_questao': safe_get(current_item, 'Pontuacao_Maxima_Questao', None),
-                        'pontuacao_item': safe_get(current_item, 'Pontuação_item'),
+                        'sistema': item.sistema,
+                        'ano': item.ano,
+                        'dimensao': item.dimensao,
+                        'pontuacao_maxima_dimensao': item.pontuacao_maxima_dimensao,
+                        'capacidade_chave': item.capacidade_chave,
+                        'pontuacao_maxima_capacidade_chave': item.pontuacao_maxima_capacidade_chave,
+                        'nome_variavel': item.nome_variavel,
+                        'numero_questao': item.numero_questao,
+                        'texto_questao': item.texto_questao,
+                        'respuesta': item.respuesta,
+                        'pontuacao_maxima_questao': item.pontuacao_maxima_questao,
+                        'pontuacao_item': item.pontuacao_item,
                         # Novas questões de avaliação
                         'adequacao_realidade_brasileira': str(adequacao),
                         'justificativa_adequacao': str(justificativa_adequacao) if justificativa_adequacao else '',
@@ -640,123 +898,323 @@ def main():
                     }
                     
                     # Salvar no Google Sheets
-                    if save_validation_to_sheets_streamlit(validation_data):
+                    with span("save_validation"):
+                        saved = save_validation_to_sheets_streamlit(validation_data)
+                    if saved:
                         st.success("✅ Avaliação salva com sucesso!")
-                        st.session_state['current_item_index'] += 1
+                        # O item sai da fila; a versão do snapshot já inclui esta avaliação
+                        queue.pop(get_validations_cache().version)
+                        # Itens pendentes e progresso mudaram: recarregar a página inteira
                         st.rerun()
                     else:
                         st.error("❌ Erro ao salvar avaliação.")
         
         with col_btn2:
-            if st.button("⏭️ Próximo Item", key=f"next_{current_idx}"):
-                st.session_state['current_item_index'] += 1
-                st.rerun()
+            # O clique já reexecuta só o fragmento; o callback avança o índice antes disso
+            st.button("⏭️ Próximo Item", key=f"next_{current_idx}", on_click=advance_item)
     
-    # Progresso
+    # Preparar o próximo item enquanto o atual é avaliado
+    queue.prefetch()
+
+@st.fragment(run_every=get_refresh_interval())
+@traced_fragment
+def render_progress(usuario, campanha, total_items):
+    """Progresso e resumo das avaliações (fragmento atualizado periodicamente a partir do snapshot)"""
     st.markdown("---")
     st.subheader("📈 Progresso")
     
-    total_items = len(df_filtrado)
-    items_validados = len(validations_df[validations_df['usuario'] == usuario]) if not validations_df.empty else 0
+    # Contadores das avaliações do usuário na campanha selecionada
+    with span("summarize_validations"):
+        summary = load_validation_summary(
+            usuario,
+            campanha.sistema if campanha else None,
+            campanha.ano if campanha else None
+        )
+    
+    items_validados = summary['total']
     
     progress = items_validados / total_items if total_items > 0 else 0
     st.progress(progress)
     st.write(f"**Progresso:** {items_validados}/{total_items} itens validados ({progress:.1%})")
     
     # Resumo das validações (CORRIGIDO)
-    if not validations_df.empty:
-        user_validations = validations_df[validations_df['usuario'] == usuario]
-        if not user_validations.empty:
-            st.subheader("📊 Resumo das Suas Validações")
-            
-            colunas_disponiveis = user_validations.columns.tolist()
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                if 'adequacao_realidade_brasileira' in colunas_disponiveis:
-                    try:
-                        adequados = len(user_validations[user_validations['adequacao_realidade_brasileira'] == 'Sim'])
-                        st.metric("✅ Adequados", adequados)
-                    except:
-                        st.metric("✅ Adequados", 0)
-                else:
-                    st.metric("✅ Total", len(user_validations))
-            
-            with col2:
-                if 'adequacao_realidade_brasileira' in colunas_disponiveis:
-                    try:
-                        em_partes = len(user_validations[user_validations['adequacao_realidade_brasileira'] == 'Em partes'])
-                        st.metric("⚠️ Em Partes", em_partes)
-                    except:
-                        st.metric("⚠️ Em Partes", 0)
+    if summary['total']:
+        st.subheader("📊 Resumo das Suas Validações")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            if 'adequados' in summary:
+                st.metric("✅ Adequados", summary['adequados'])
+            else:
+                st.metric("✅ Total", summary['total'])
+        
+        with col2:
+            if 'em_partes' in summary:
+                st.metric("⚠️ Em Partes", summary['em_partes'])
+            else:
+                st.metric("📝 Validações", summary['total'])
+        
+        with col3:
+            if 'nao_adequados' in summary:
+                st.metric("❌ Não Adequados", summary['nao_adequados'])
+            else:
+                st.metric("📊 Itens", summary['total'])
+        
+        with col4:
+            if 'alta_relevancia' in summary:
+                st.metric("⭐ Alta Relevância", summary['alta_relevancia'])
+            else:
+                st.metric("📈 Total", summary['total'])
+        
+        # Estatísticas adicionais
+        st.markdown("---")
+        st.markdown("#### 📈 Estatísticas Detalhadas")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            if 'relevancia_counts' in summary:
+                st.markdown("**Distribuição de Relevância:**")
+                if summary['relevancia_counts'] is None:
+                    st.write("  Erro ao carregar distribuição")
                 else:
-                    st.metric("📝 Validações", len(user_validations))
-            
-            with col3:
-                if 'adequacao_realidade_brasileira' in colunas_disponiveis:
-                    try:
-                        nao_adequados = len(user_validations[user_validations['adequacao_realidade_brasileira'] == 'Não'])
-                        st.metric("❌ Não Adequados", nao_adequados)
-                    except:
-                        st.metric("❌ Não Adequados", 0)
+                    for nivel, count in summary['relevancia_counts'].items():
+                        st.write(f"  {nivel}: {count}")
+        
+        with col2:
+            if 'com_norma' in summary:
+                st.markdown("**Normas Exigentes:**")
+                if summary['com_norma'] is None:
+                    st.write("  Dados indisponíveis")
                 else:
-                    st.metric("📊 Itens", len(user_validations))
-            
-            with col4:
-                if 'grau_relevancia' in colunas_disponiveis:
-                    try:
-                        alta_relevancia = len(user_validations[
-                            user_validations['grau_relevancia'].astype(str).str.contains('5', na=False, regex=False)
-                        ])
-                        st.metric("⭐ Alta Relevância", alta_relevancia)
-                    except Exception as e:
-                        try:
-                            alta_relevancia = len(user_validations[user_validations['grau_relevancia'] == '5 - Alta relevância'])
-                            st.metric("⭐ Alta Relevância", alta_relevancia)
-                        except:
-                            st.metric("⭐ Alta Relevância", 0)
+                    st.write(f"  Com norma: {summary['com_norma']}")
+                    st.write(f"  Sem norma: {summary['sem_norma']}")
+        
+        with col3:
+            if 'com_base' in summary:
+                st.markdown("**Bases de Dados:**")
+                if summary['com_base'] is None:
+                    st.write("  Dados indisponíveis")
                 else:
-                    st.metric("📈 Total", len(user_validations))
-            
-            # Estatísticas adicionais
-            st.markdown("---")
-            st.markdown("#### 📈 Estatísticas Detalhadas")
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if 'grau_relevancia' in colunas_disponiveis:
-                    st.markdown("**Distribuição de Relevância:**")
-                    try:
-                        relevancia_counts = user_validations['grau_relevancia'].astype(str).value_counts().sort_index()
-                        for nivel, count in relevancia_counts.items():
-                            if nivel and str(nivel).strip() != 'nan' and str(nivel).strip() != '':
-                                st.write(f"  {nivel}: {count}")
-                    except Exception as e:
-                        st.write("  Erro ao carregar distribuição")
-            
-            with col2:
-                if 'tem_norma_exigente' in colunas_disponiveis:
-                    st.markdown("**Normas Exigentes:**")
-                    try:
-                        com_norma = len(user_validations[user_validations['tem_norma_exigente'] == 'Sim'])
-                        sem_norma = len(user_validations[user_validations['tem_norma_exigente'] == 'Não'])
-                        st.write(f"  Com norma: {com_norma}")
-                        st.write(f"  Sem norma: {sem_norma}")
-                    except:
-                        st.write("  Dados indisponíveis")
+                    st.write(f"  Com base: {summary['com_base']}")
+                    st.write(f"  Sem base: {summary['sem_base']}")
+
+@st.fragment
+@traced_fragment
+def render_agreement(campanha):
+    """Concordância entre avaliadores na campanha (fragmento: trocar escala ou agrupamento não recarrega a página)"""
+    with st.expander("🤝 Concordância entre Avaliadores"):
+        agreement = load_agreement()
+        if agreement is None:
+            st.write("Dados indisponíveis")
+            return
+        
+        scales = {scale.name: scale for scale in agreement.scales}
+        escala = st.radio(
+            "Escala:", list(scales), format_func=lambda name: scales[name].label,
+            horizontal=True, key="concordancia_escala"
+        )
+        agrupamento = st.radio(
+            "Agrupar por:", ['dimensao', 'capacidade_chave'],
+            format_func={'dimensao': "Dimensão", 'capacidade_chave': "Capacidade Chave"}.get,
+            horizontal=True, key="concordancia_grupo"
+        )
+        
+        # Recorte da campanha selecionada; os índices ficam em cache até a próxima avaliação
+        filtros = {'sistema': campanha.sistema, 'ano': campanha.ano} if campanha else {}
+        with span("agreement"):
+            summary = agreement.summary(escala, **filtros)
+            por_grupo = agreement.breakdown(escala, by=agrupamento, **filtros)
+            dispersao = agreement.item_dispersion(escala, **filtros)
+        
+        if not summary['itens_pareaveis']:
+            st.info("Ainda não há itens com duas ou mais avaliações.")
+            return
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("α de Krippendorff", format_agreement_index(summary['alpha']))
+        with col2:
+            st.metric("κ de Fleiss", format_agreement_index(summary['kappa']))
+        with col3:
+            st.metric("Itens com 2+ avaliações", summary['itens_pareaveis'])
+        with col4:
+            st.metric("Avaliações", summary['avaliacoes'])
+        
+        st.dataframe(por_grupo, hide_index=True)
+        st.markdown("**Itens com mais discordância:**")
+        st.dataframe(dispersao, hide_index=True)
+
+def main():
+    # Leitura do catálogo começa antes de qualquer elemento ser desenhado
+    preload_selected_catalog()
+    
+    st.title("📊 Validação de Itens - Índice de Inovação Pública")
+    st.markdown("---")
+    
+    # Sidebar para configurações
+    with st.sidebar:
+        st.header("⚙️ Configurações")
+        
+        render_storage_panel()
+        
+        # Identificação do usuário
+        usuario = st.text_input("Nome do Avaliador:", key="usuario_input")
+        if usuario:
+            st.session_state['usuario'] = usuario
+        
+        # Campanha (sistema/ano): só o catálogo selecionado é carregado
+        partitions = list_partitions()
+        campanha = None
+        csv_path = DEFAULT_CSV_PATH
+        if partitions:
+            by_path = {str(partition.path): partition for partition in partitions}
+            csv_path = st.selectbox(
+                "🌎 Campanha:",
+                list(by_path),
+                index=default_partition_index(partitions),
+                format_func=lambda path: partition_label(by_path[path]),
+                key="campanha"
+            )
+            campanha = by_path[csv_path]
+        
+        # Filtros
+        st.subheader("🔍 Filtros")
+        
+        # Carregar dados (catálogo único do processo; a sessão guarda só posições de linha)
+        with span("load_data"):
+            mtime = catalog_mtime(csv_path)
+            catalog = get_catalog(csv_path, mtime)
+        
+        if catalog is not None:
+            # Índice de facetas (dimensão → capacidades e IDs de linha por valor)
+            facet_index = get_facet_index(csv_path, mtime)
+            search_index = get_search_index(csv_path, mtime)
             
-            with col3:
-                if 'tem_base_dados_publica' in colunas_disponiveis:
-                    st.markdown("**Bases de Dados:**")
-                    try:
-                        com_base = len(user_validations[user_validations['tem_base_dados_publica'] == 'Sim'])
-                        sem_base = len(user_validations[user_validations['tem_base_dados_publica'] == 'Não'])
-                        st.write(f"  Com base: {com_base}")
-                        st.write(f"  Sem base: {sem_base}")
-                    except:
-                        st.write("  Dados indisponíveis")
+            row_ids = render_filters(facet_index, search_index)
+    
+    # Área principal
+    if catalog is None:
+        st.error("❌ Erro ao carregar dados. Verifique se o arquivo CSV existe.")
+        return
+    
+    if not usuario:
+        st.warning("⚠️ Por favor, identifique-se na barra lateral para começar a avaliação.")
+        return
+    
+    # Carregar validações existentes
+    with span("load_existing_validations"):
+        load_existing_validations()
+    
+    # Seleção de item para avaliação
+    st.subheader("🎯 Avaliação de Item")
+    
+    if not len(row_ids):
+        st.warning("Nenhum item encontrado com os filtros aplicados.")
+        return
+    
+    selection = (
+        csv_path,
+        st.session_state.get('filtro_dimensao', ''),
+        st.session_state.get('filtro_capacidade', ''),
+        st.session_state.get('filtro_busca', ''),
+    )
+    queue_key = selection + (usuario,)
+    queue = st.session_state.get('fila_itens')
+    target_reviews, lease_seconds = get_assignment_settings()
+    if target_reviews > 0:
+        # Distribuição balanceada: cada avaliador recebe o item da seleção mais distante
+        # da meta de avaliações, com reserva para não coincidir com outro avaliador
+        scheduler = get_review_scheduler(csv_path, mtime, target_reviews, lease_seconds)
+        with span("review_counts"):
+            scheduler.sync(get_validations_cache().review_counts())
+        if not isinstance(queue, AssignmentQueue) or queue.scheduler is not scheduler or not queue.is_current(queue_key):
+            queue = st.session_state['fila_itens'] = AssignmentQueue(
+                scheduler, usuario, selection, row_ids, queue_key, catalog.item
+            )
+        st.caption(
+            f"🎯 Cobertura: {scheduler.covered(row_ids)} de {len(row_ids)} itens com "
+            f"{target_reviews}+ avaliações"
+        )
+    else:
+        # Fila de itens não validados: recalculada só quando a campanha, os filtros, o
+        # avaliador ou a versão das avaliações mudam (trocar de campanha recomeça a fila)
+        validations_version = get_validations_cache().version
+        if not isinstance(queue, WorkQueue) or not queue.is_current(queue_key, validations_version):
+            with span("pending_items"):
+                # Projeção do snapshot compartilhado com as avaliações deste avaliador
+                user_df = load_user_validations(usuario)
+                validation_index = build_validation_index(user_df, usuario)
+                items_nao_validados = pending_positions(
+                    catalog.item_keys(validation_index.key_spec), row_ids, validation_index
+                ).tolist()
+            if isinstance(queue, WorkQueue) and queue.key == queue_key:
+                # Só a versão mudou (gravação de outro avaliador ou atualização): os itens pulados
+                # continuam no fim da fila
+                queue.update(items_nao_validados, validations_version)
+            else:
+                # A fila guarda posições no catálogo; os registros dos itens são os do catálogo compartilhado
+                queue = st.session_state['fila_itens'] = WorkQueue(
+                    items_nao_validados, queue_key, validations_version, catalog.item
+                )
+    
+    if not len(queue):
+        st.success("🎉 Todos os itens foram validados!")
+    else:
+        render_evaluation(queue, usuario)
+        
+        render_progress(usuario, campanha, len(row_ids))
+    
+    render_agreement(campanha)
+
+def render_perf_panel(trace):
+    """Painel "Performance" na barra lateral com os spans e as chamadas do último rerun"""
+    with st.sidebar.expander("⏱️ Performance"):
+        st.write(f"**Rerun:** {trace.total_s * 1000:.0f} ms")
+        if trace.spans:
+            spans_df = pd.DataFrame(trace.spans)
+            spans_df['nome'] = ["  " * depth + name for name, depth in zip(spans_df['name'], spans_df['depth'])]
+            spans_df['ms'] = (spans_df['duration_s'] * 1000).round(1)
+            st.dataframe(spans_df[['nome', 'ms']], hide_index=True)
+            # Tempo fora dos spans de primeiro nível: widgets e renderização
+            top_level = spans_df.loc[spans_df['depth'] == 0, 'duration_s'].sum()
+            st.caption(f"Renderização e demais etapas: {(trace.total_s - top_level) * 1000:.0f} ms")
+        
+        fragment_trace = st.session_state.get('perf_fragment')
+        if fragment_trace is not None:
+            st.caption(
+                f"Último fragmento: {fragment_trace.fragment} · {fragment_trace.total_s * 1000:.0f} ms · "
+                f"{sum(fragment_trace.sheets_calls.values())} chamadas à API"
+            )
+        
+        calls = sum(trace.sheets_calls.values())
+        st.write(f"**Chamadas à API do Sheets:** {calls} ({trace.sheets_bytes / 1024:.1f} KB)")
+        for method, count in sorted(trace.sheets_calls.items()):
+            st.caption(f"{method}: {count}")
+        background = background_calls()
+        if background['calls']:
+            st.caption(
+                f"Em segundo plano (desde o início): {sum(background['calls'].values())} chamadas, "
+                f"{background['bytes'] / 1024:.1f} KB"
+            )
+        
+        st.checkbox("🔬 Perfilar o próximo rerun (cProfile)", key="perf_profile_next")
+        profile = st.session_state.get('perf_profile')
+        if profile:
+            st.caption(f"Perfil capturado em {profile['timestamp']}")
+            st.download_button(
+                "⬇️ Baixar perfil (.prof)",
+                data=profile['dump'],
+                file_name=f"rerun_{profile['timestamp'].replace(':', '').replace(' ', '_')}.prof",
+                mime="application/octet-stream",
+            )
+            st.text(profile['summary'])
+
+def run_with_perf(page):
+    """Executa a página medindo o rerun; grava o trace e exibe o painel de desempenho"""
+    _, trace = measure_run(page)
+    render_perf_panel(trace)
 
 if __name__ == "__main__":
-    main()
+    run_with_perf(main)
@@ -0,0 +1,745 @@
+"""Testes dos componentes da aplicação (sem Streamlit nem acesso à API do Google)
+
+A planilha é substituída pela FakeWorksheet de benchmarks/fake_sheets.py. Uso:
+
+    pytest test_app.py -v
+"""
+import io
+import json
+import queue
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+import catalog
+import export
+import migrate_legacy
+import perf
+import validations_cache
+from aggregations import ValidationAggregates
+from agreement import AgreementAnalytics
+from assignment import ReviewCounts, ReviewScheduler
+from benchmarks.fake_sheets import FakeWorksheet, quota_error
+from local_log import RECORD_ID_COLUMN, ValidationLog
+from pending_items import NUMBER_KEY, TEXT_KEY, build_item_keys, build_validation_index, compute_pending_items
+from search import SearchIndex
+from sheets_io import IncrementalWorksheetReader, LogSyncWorker, WriteBehindQueue
+from sheets_quota import READ, WRITE, SheetsRequestScheduler
+from storage import GoogleSheetsBackend, MemoryBackend, StaleRowError
+from work_queue import WorkQueue
+
+
+class FakeClock:
+    """Relógio controlado pelo teste (reservas do ReviewScheduler)"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def catalog_items(count):
+    """Catálogo mínimo com as colunas da chave por número da questão"""
+    return pd.DataFrame({'sistema': 'chile', 'ano': 2025, 'Numero_Questao': list(range(1, count + 1))})
+
+
+def review(usuario, numero_questao):
+    return {'usuario': usuario, 'sistema': 'chile', 'ano': 2025, 'numero_questao': numero_questao}
+
+
+def make_scheduler(items, reviews=(), target=3, lease_seconds=600):
+    clock = FakeClock()
+    scheduler = ReviewScheduler(lambda spec: build_item_keys(items, spec), target=target,
+                                lease_seconds=lease_seconds, clock=clock)
+    review_counts = ReviewCounts(pd.DataFrame(list(reviews), columns=list(review('', 0))))
+    scheduler.sync(review_counts)
+    return scheduler, review_counts, clock
+
+
+# --- Itens pendentes (user-001) ---------------------------------------------
+
+def test_pending_items_anti_join_normalizes_the_key():
+    items = catalog_items(4)
+    # Planilha lida com números como float/texto: 2025.0 e "2" casam com 2025 e 2 do catálogo
+    validations = pd.DataFrame([
+        {'usuario': 'ana', 'sistema': 'chile', 'ano': 2025.0, 'numero_questao': '2'},
+        {'usuario': 'ana', 'sistema': 'chile ', 'ano': '2025', 'numero_questao': 4.0},
+        {'usuario': 'bia', 'sistema': 'chile', 'ano': 2025, 'numero_questao': 1},
+        {'usuario': 'ana', 'sistema': 'peru', 'ano': 2025, 'numero_questao': 3},
+    ])
+    index = build_validation_index(validations, 'ana')
+
+    assert index.key_spec == NUMBER_KEY
+    assert compute_pending_items(items, index) == [0, 2]
+    assert compute_pending_items(items, build_validation_index(validations, 'cris')) == [0, 1, 2, 3]
+
+
+def test_pending_items_falls_back_to_the_question_text():
+    items = catalog_items(3).assign(Texto_Questao=['Primeira', 'Segunda', 'Terceira'])
+    validations = pd.DataFrame([{'usuario': 'ana', 'sistema': 'chile', 'texto_questao': 'Segunda'}])
+    index = build_validation_index(validations, 'ana')
+
+    assert index.key_spec == TEXT_KEY
+    assert compute_pending_items(items, index) == [0, 2]
+
+
+# --- IncrementalWorksheetReader (user-003) -----------------------------------
+
+def sheet_rows(count):
+    return [['usuario', 'numero_questao']] + [[f'u{i}', str(i)] for i in range(count)]
+
+
+def test_reader_appends_new_rows_incrementally():
+    worksheet = FakeWorksheet("Validações_Streamlit", sheet_rows(3))
+    reader = IncrementalWorksheetReader()
+    assert len(reader.read(worksheet)) == 3
+
+    worksheet.append_rows([['u3', '3'], ['u4', '4']])
+    df = reader.read(worksheet)
+    assert df['numero_questao'].tolist() == [0, 1, 2, 3, 4]
+    assert (reader.full_reloads, reader.incremental_reads) == (1, 1)
+
+
+def test_reader_reloads_when_the_last_row_is_edited():
+    worksheet = FakeWorksheet("Validações_Streamlit", sheet_rows(3))
+    reader = IncrementalWorksheetReader()
+    reader.read(worksheet)
+
+    worksheet.update_cell(4, 1, 'editado')
+    df = reader.read(worksheet)
+    assert df['usuario'].tolist() == ['u0', 'u1', 'editado']
+    assert reader.full_reloads == 2
+
+
+def test_reader_reloads_when_rows_are_removed_or_the_header_changes():
+    reader = IncrementalWorksheetReader()
+    reader.read(FakeWorksheet("Validações_Streamlit", sheet_rows(3)))
+
+    assert len(reader.read(FakeWorksheet("Validações_Streamlit", sheet_rows(2)))) == 2
+    assert reader.full_reloads == 2
+
+    renamed = sheet_rows(2)
+    renamed[0] = ['usuario', 'questao']
+    assert list(reader.read(FakeWorksheet("Validações_Streamlit", renamed)).columns) == ['usuario', 'questao']
+    assert reader.full_reloads == 3
+
+
+def test_reader_full_reload_every():
+    worksheet = FakeWorksheet("Validações_Streamlit", sheet_rows(2))
+    reader = IncrementalWorksheetReader(full_reload_every=2)
+    for _ in range(4):
+        reader.read(worksheet)
+    assert (reader.full_reloads, reader.incremental_reads) == (2, 2)
+
+
+# --- WriteBehindQueue (user-004) ---------------------------------------------
+
+class FailAfterAppendWorksheet(FakeWorksheet):
+    """Grava as linhas e falha na primeira vez (timeout depois de a API aplicar o append)"""
+
+    failures = 1
+
+    def append_rows(self, values, *args, **kwargs):
+        super().append_rows(values, *args, **kwargs)
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("timeout")
+
+
+def test_write_behind_queue_sends_submissions_in_batches():
+    worksheet = FakeWorksheet("Validações_Streamlit", [['usuario', 'numero_questao']])
+    write_queue = WriteBehindQueue(batch_size=2, flush_interval=0.2)
+    tickets = [write_queue.submit({'numero_questao': i, 'usuario': 'ana'}, worksheet) for i in range(5)]
+
+    assert write_queue.flush(timeout=5)
+    assert all(ticket.wait(1) and ticket.persisted for ticket in tickets)
+    # Cabeçalho lido uma vez; cinco avaliações em três append_rows (2 + 2 + 1)
+    assert worksheet.stats.snapshot()['calls'] == {'row_values': 1, 'append_rows': 3}
+    assert worksheet.column_snapshot('numero_questao') == ['0', '1', '2', '3', '4']
+    assert write_queue.status()['batches'] == 3
+
+
+def test_write_behind_queue_resolves_tickets_with_the_error():
+    worksheet = FailAfterAppendWorksheet("Validações_Streamlit", [['usuario', 'numero_questao']])
+    write_queue = WriteBehindQueue(flush_interval=0.01)
+    ticket = write_queue.submit({'usuario': 'ana', 'numero_questao': 1}, worksheet)
+
+    assert ticket.wait(5)
+    assert not ticket.persisted and isinstance(ticket.error, TimeoutError)
+    assert write_queue.status()['failed'] == 1
+
+
+# --- LogSyncWorker (user-005) -----------------------------------------------
+
+HEADERS = ['usuario', 'numero_questao', RECORD_ID_COLUMN]
+
+
+def make_sync_worker(tmp_path, worksheet):
+    log = ValidationLog(tmp_path / "log.sqlite3")
+    worker = LogSyncWorker(log, WriteBehindQueue(flush_interval=0.01), owner="teste")
+    # Sem kick(): a rodada de sincronização é chamada pelo teste, sem a thread em segundo plano
+    worker._worksheet = worksheet
+    return log, worker
+
+
+
+def test_sync_once_skips_records_already_in_the_sheet(tmp_path):
+    worksheet = FakeWorksheet("Validações_Streamlit", [HEADERS, ['ana', '1', 'r1']])
+    log, worker = make_sync_worker(tmp_path, worksheet)
+    log.append({'usuario': 'ana', 'numero_questao': 1, RECORD_ID_COLUMN: 'r1'})
+    log.append({'usuario': 'ana', 'numero_questao': 2, RECORD_ID_COLUMN: 'r2'})
+
+    assert worker.sync_once() == 2
+    assert worksheet.column_snapshot(RECORD_ID_COLUMN) == ['r1', 'r2']
+    assert log.counts()['unsynced'] == 0
+    assert worker.sync_once() == 0
+    assert len(worksheet) == 3
+
+
+def test_sync_once_retry_after_ambiguous_failure_does_not_duplicate(tmp_path):
+    worksheet = FailAfterAppendWorksheet("Validações_Streamlit", [HEADERS])
+    log, worker = make_sync_worker(tmp_path, worksheet)
+    log.append({'usuario': 'ana', 'numero_questao': 1, RECORD_ID_COLUMN: 'r1'})
+
+    assert worker.sync_once() == 0
+    assert log.counts()['unsynced'] == 1
+    # A nova tentativa relê os IDs remotos e reconhece a linha já gravada
+    assert worker.sync_once() == 1
+    assert worksheet.column_snapshot(RECORD_ID_COLUMN) == ['r1']
+    assert log.counts()['unsynced'] == 0
+
+
+
+class LimitedWriteQueue(WriteBehindQueue):
+    """Aceita ``accept`` envios e depois se comporta como a fila cheia"""
+
+    def __init__(self, accept, **kwargs):
+        super().__init__(**kwargs)
+        self.accept = accept
+
+    def submit(self, validation_data, worksheet, timeout=5):
+        if not self.accept:
+            raise queue.Full
+        self.accept -= 1
+        return super().submit(validation_data, worksheet, timeout=timeout)
+
+
+def test_sync_once_releases_the_claim_when_the_write_queue_is_full(tmp_path):
+    worksheet = FakeWorksheet("Validações_Streamlit", [HEADERS])
+    log = ValidationLog(tmp_path / "log.sqlite3")
+    worker = LogSyncWorker(log, LimitedWriteQueue(1, flush_interval=0.01), owner="teste")
+    worker._worksheet = worksheet
+    for i in range(3):
+        log.append({'usuario': 'ana', 'numero_questao': i, RECORD_ID_COLUMN: f'r{i}'})
+
+    assert worker.sync_once() == 1
+    assert worksheet.column_snapshot(RECORD_ID_COLUMN) == ['r0']
+    assert worker.status()['last_error'] == "Fila de gravação cheia"
+    # O restante do lote fica livre para outro sincronizador antes de a reserva expirar
+    assert [e[RECORD_ID_COLUMN] for e in log.claim_unsynced("outro")] == ['r1', 'r2']
+
+
+# --- Backend do Google Sheets (user-006) -------------------------------------
+
+def make_sheets_backend(tmp_path, worksheet):
+    log = ValidationLog(tmp_path / "log.sqlite3")
+    write_queue = WriteBehindQueue(flush_interval=0.01)
+    backend = GoogleSheetsBackend(log, write_queue, IncrementalWorksheetReader(),
+                                  LogSyncWorker(log, write_queue, owner="teste", interval=3600))
+    backend.attach(worksheet)
+    return backend
+
+
+class DeleteRowBeforeCheckWorksheet(FakeWorksheet):
+    """Remove a primeira linha de dados entre a localização e a conferência dos IDs"""
+
+    def col_values(self, col, *args, **kwargs):
+        with self._lock:
+            del self._rows[1]
+        return super().col_values(col, *args, **kwargs)
+
+
+def test_sheets_update_locates_the_row_by_record_id(tmp_path):
+    worksheet = FakeWorksheet("Validações_Streamlit", [HEADERS, ['ana', '1', 'r1'], ['bia', '2', 'r2'], ['cris', '3', 'r3']])
+    backend = make_sheets_backend(tmp_path, worksheet)
+    assert len(backend.load_all()) == 3
+
+    # Linha removida por fora: o snapshot em cache ficou com as posições antigas
+    with worksheet._lock:
+        del worksheet._rows[1]
+    assert backend.update({RECORD_ID_COLUMN: 'r3', 'usuario': 'cris'}, {'numero_questao': 30}) == 1
+    assert worksheet.get_all_values()[1:] == [['bia', '2', 'r2'], ['cris', '30', 'r3']]
+
+
+def test_sheets_update_fails_when_the_row_changes_before_the_write(tmp_path):
+    worksheet = DeleteRowBeforeCheckWorksheet("Validações_Streamlit", [HEADERS, ['ana', '1', 'r1'], ['bia', '2', 'r2']])
+    backend = make_sheets_backend(tmp_path, worksheet)
+
+    with pytest.raises(StaleRowError):
+        backend.update({RECORD_ID_COLUMN: 'r2'}, {'numero_questao': 20})
+    assert worksheet.get_all_values()[1:] == [['bia', '2', 'r2']]
+
+
+# --- Rastreamento de desempenho (user-008) ----------------------------------
+
+def test_perf_trace_rotates_by_size(tmp_path):
+    trace_path = tmp_path / "perf_trace.jsonl"
+    for _ in range(50):
+        trace, token = perf.begin_rerun('sessao')
+        perf.end_rerun(trace, token, trace_path, max_bytes=1000)
+
+    assert trace_path.stat().st_size < 1000 + 300
+    assert (tmp_path / "perf_trace.jsonl.1").exists()
+    assert not (tmp_path / "perf_trace.jsonl.2").exists()
+
+
+# --- Catálogo compilado (user-009) -------------------------------------------
+
+def test_catalog_recompiles_only_when_the_csv_hash_changes(tmp_path, monkeypatch):
+    compiled = []
+    compile_catalog = catalog.compile_catalog
+
+    def counting_compile(*args, **kwargs):
+        compiled.append(args)
+        return compile_catalog(*args, **kwargs)
+
+    monkeypatch.setattr(catalog, 'compile_catalog', counting_compile)
+    csv_path = tmp_path / "chile_iip_2025_preparado.csv"
+    pd.DataFrame({'sistema': ['chile'], 'ano': [2025], 'Texto_Questao': ['Primeira']}).to_csv(csv_path, index=False)
+
+    df = catalog.load_catalog(csv_path)
+    assert catalog.compiled_path_for(csv_path).exists()
+    assert str(df['ano'].dtype) == 'Int64' and str(df['sistema'].dtype) == 'category'
+    catalog.load_catalog(csv_path)
+    assert len(compiled) == 1
+
+    pd.DataFrame({'sistema': ['chile'], 'ano': [2025], 'Texto_Questao': ['Editada']}).to_csv(csv_path, index=False)
+    assert catalog.load_catalog(csv_path)['Texto_Questao'].tolist() == ['Editada']
+    assert len(compiled) == 2
+
+
+# --- Busca por texto (user-011) ----------------------------------------------
+
+def test_search_folds_accents_matches_prefixes_and_combines_terms_with_and():
+    df_questoes = pd.DataFrame({'Texto_Questao': [
+        'Existe política de inovação?',
+        'A política pública é avaliada?',
+        'Há orçamento para inovação',
+        'Outro tema',
+    ]})
+    index = SearchIndex(df_questoes)
+
+    assert index.search('POLITICA').tolist() == [0, 1]
+    assert sorted(index.search('inov').tolist()) == [0, 2]
+    assert index.search('polít inova').tolist() == [0]
+    assert index.search('orcamento politica').tolist() == []
+    assert index.search('  ?! ') is None
+
+
+def test_search_ranks_whole_token_matches_before_prefix_matches():
+    index = SearchIndex(pd.DataFrame({'Texto_Questao': ['Planos de gestão', 'Plano anual', 'Planejamento']}))
+
+    # "planos" e "plano" casam por prefixo; o token inteiro recebe o bônus
+    assert index.search('plano').tolist() == [1, 0]
+    assert index.search('plan').tolist() == [0, 1, 2]
+
+
+# --- Catálogos por sistema e ano (user-012) ----------------------------------
+
+def test_discover_partitions_ignores_csv_with_non_numeric_ano(tmp_path):
+    pd.DataFrame({'sistema': ['chile'], 'ano': ['2025']}).to_csv(tmp_path / "catalogo.csv", index=False)
+    pd.DataFrame({'sistema': ['peru'], 'ano': ['sem ano']}).to_csv(tmp_path / "outro.csv", index=False)
+
+    assert [(p.sistema, p.ano) for p in catalog.discover_partitions(tmp_path)] == [('chile', 2025)]
+
+
+# --- Snapshot compartilhado e backend offline (user-013) ----------------------
+
+def test_cache_add_skips_a_record_the_refresh_already_loaded():
+    backend = MemoryBackend()
+    cache = validations_cache.SharedValidationsCache(backend, refresh_interval=3600)
+    cache.snapshot()
+    cache.aggregates()
+
+    record = review('ana', 1)
+    record_id = backend.append(record)
+    cache.refresh()  # a atualização em segundo plano roda entre a gravação e o add()
+    cache.add(dict(record, **{RECORD_ID_COLUMN: record_id}))
+
+    assert len(cache.snapshot()) == 1
+    assert cache.aggregates().summary(usuario='ana')['total'] == 1
+
+
+def test_offline_sheets_backend_keeps_the_last_remote_snapshot(tmp_path):
+    backend = make_sheets_backend(
+        tmp_path, FakeWorksheet("Validações_Streamlit", [HEADERS, ['bia', '1', 'r1'], ['cris', '2', 'r2']])
+    )
+    assert len(backend.load_all()) == 2
+
+    backend.detach()
+    backend.log.append({'usuario': 'ana', 'numero_questao': 3, RECORD_ID_COLUMN: 'r3'})
+    assert sorted(backend.load_all()[RECORD_ID_COLUMN]) == ['r1', 'r2', 'r3']
+
+
+
+def test_cache_does_not_keep_derived_counters_built_before_a_write(monkeypatch):
+    backend = MemoryBackend()
+    cache = validations_cache.SharedValidationsCache(backend, refresh_interval=3600)
+    cache.snapshot()
+
+    def build_while_another_session_saves(snapshot):
+        # Gravação de outra sessão chega enquanto os contadores são calculados
+        cache.add(dict(review('bia', 2), **{RECORD_ID_COLUMN: 'r2'}))
+        return ValidationAggregates(snapshot)
+
+    monkeypatch.setattr(validations_cache, 'ValidationAggregates', build_while_another_session_saves)
+    assert cache.aggregates().summary(usuario='bia')['total'] == 0
+    monkeypatch.undo()
+
+    # Os contadores calculados sobre o snapshot antigo não ficaram em cache
+    assert cache.aggregates().summary(usuario='bia')['total'] == 1
+    cache.add(dict(review('bia', 3), **{RECORD_ID_COLUMN: 'r3'}))
+    assert cache.aggregates().summary(usuario='bia')['total'] == 2
+    assert len(cache.user_view('bia')) == 2
+
+
+# --- Resumo das validações (user-014) ----------------------------------------
+
+def summary_record(usuario, numero_questao, adequacao, relevancia, norma, dimensao='D1'):
+    return dict(review(usuario, numero_questao), dimensao=dimensao, capacidade_chave='C',
+                adequacao_realidade_brasileira=adequacao, grau_relevancia=relevancia,
+                tem_norma_exigente=norma, tem_base_dados_publica='Sim')
+
+
+def test_aggregates_add_matches_a_full_rebuild():
+    records = [
+        summary_record('ana', 1, 'Sim', '5 - Muito alta', 'Sim'),
+        summary_record('ana', 2, 'Em partes', '3 - Média', 'Não', dimensao='D2'),
+        summary_record('bia', 1, 'Não', '5 - Muito alta', None),
+        summary_record('bia', 2, 'Sim', '1 - Muito baixa', 'Sim', dimensao='D2'),
+        summary_record('ana', 3, 'Não', '', 'Não'),
+    ]
+    incremental = ValidationAggregates(pd.DataFrame(records[:2]))
+    # Consultas já calculadas também recebem as avaliações novas
+    incremental.summary(usuario='ana')
+    incremental.summary(dimensao='D2')
+    for record in records[2:]:
+        incremental.add(record)
+    rebuilt = ValidationAggregates(pd.DataFrame(records))
+
+    for filters in ({}, {'usuario': 'ana'}, {'usuario': 'bia'}, {'dimensao': 'D2'}, {'usuario': 'ana', 'ano': 2025.0}):
+        assert incremental.summary(**filters) == rebuilt.summary(**filters)
+    assert rebuilt.summary(usuario='ana')['alta_relevancia'] == 1
+
+
+# --- Agendador de cotas da API (user-015) -------------------------------------
+
+def api_error(code, retry_after=None):
+    """APIError do gspread com o código HTTP informado"""
+    if code == 429:
+        return quota_error(retry_after)
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({'error': {'code': code, 'message': "Backend error", 'status': 'UNAVAILABLE'}}).encode()
+    return APIError(response)
+
+
+def failing_call(errors, result='ok'):
+    """Chamada que levanta os erros informados, um por tentativa, e depois retorna ``result``"""
+    errors = list(errors)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    call.calls = calls
+    return call
+
+
+def test_scheduler_retries_429_and_read_5xx():
+    scheduler = SheetsRequestScheduler(base_delay=0.01, max_delay=0.02)
+
+    read = failing_call([api_error(429, retry_after=0.01), api_error(503)])
+    assert scheduler.execute(READ, read) == 'ok'
+    write = failing_call([api_error(429)])
+    assert scheduler.execute(WRITE, write) == 'ok'
+    assert (len(read.calls), len(write.calls)) == (3, 2)
+    assert (scheduler.status()['retries'], scheduler.status()['throttled']) == (3, 2)
+
+
+def test_scheduler_does_not_repeat_a_write_after_5xx():
+    scheduler = SheetsRequestScheduler(base_delay=0.01)
+    write = failing_call([api_error(503)])
+
+    with pytest.raises(APIError):
+        scheduler.execute(WRITE, write)
+    assert len(write.calls) == 1
+    assert scheduler.status()['failed'] == 1
+
+
+def test_scheduler_coalesces_identical_concurrent_reads():
+    class BlockingHTTPClient:
+        def __init__(self):
+            self.started = threading.Event()
+            self.release = threading.Event()
+            self.calls = 0
+
+        def request(self, method, endpoint, *args, **kwargs):
+            self.calls += 1
+            self.started.set()
+            self.release.wait(5)
+            return f"{method} {endpoint}"
+
+    scheduler = SheetsRequestScheduler()
+    client = BlockingHTTPClient()
+    scheduler.wrap_client(client)
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(client.request('get', 'values/A1')))
+               for _ in range(3)]
+    readers[0].start()
+    assert client.started.wait(5)
+    for reader in readers[1:]:
+        reader.start()
+    deadline = time.monotonic() + 5
+    while scheduler.status()['coalesced'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    client.release.set()
+    for reader in readers:
+        reader.join(5)
+
+    assert client.calls == 1
+    assert results == ['get values/A1'] * 3
+
+
+def test_write_paused_by_429_does_not_block_reads():
+    scheduler = SheetsRequestScheduler()
+    write = failing_call([api_error(429, retry_after=2)])
+    writer = threading.Thread(target=scheduler.execute, args=(WRITE, write))
+    writer.start()
+    deadline = time.monotonic() + 5
+    while scheduler.status()['waiting_writes'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    assert scheduler.execute(READ, lambda: 'leitura') == 'leitura'
+    assert time.monotonic() - started < 1
+    writer.join(5)
+    assert len(write.calls) == 2
+
+
+# --- Exportação (user-016) ----------------------------------------------------
+
+def test_export_reads_the_worksheet_in_row_ranges():
+    rows = [['usuario', 'ano', 'numero_questao']] + [['ana', '2025', str(i)] for i in range(1, 6)] + [[], []]
+    worksheet = FakeWorksheet("Validações_Streamlit", rows)
+
+    ranges = list(export.iter_worksheet_ranges(worksheet, chunk_rows=2))
+    assert [(end, [r['numero_questao'] for r in records]) for end, records in ranges] == [
+        (3, [1, 2]), (5, [3, 4]), (7, [5]),
+    ]
+    # A faixa seguinte (linha 8, em branco) encerra a leitura
+    assert worksheet.stats.snapshot()['calls'] == {'row_values': 1, 'get': 4}
+    # Valores numéricos chegam como tipos nativos do Python
+    assert type(ranges[0][1][0]['ano']) is int
+
+    assert [len(c) for c in export.iter_dataframe_chunks(pd.DataFrame({'x': range(5)}), chunk_rows=2)] == [2, 2, 1]
+
+
+def test_export_parquet_is_hive_partitioned(tmp_path):
+    records = [
+        {'sistema': 'chile', 'ano': 2025, 'usuario': 'ana', 'numero_questao': 1, 'comentario': 'a'},
+        {'sistema': 'chile', 'ano': 2025, 'usuario': 'bia', 'numero_questao': 1, 'comentario': ''},
+        {'sistema': 'chile', 'ano': 2025, 'usuario': 'ana', 'numero_questao': 2, 'comentario': None},
+        {'sistema': 'peru', 'ano': 2024, 'usuario': 'João Silva', 'numero_questao': 3, 'comentario': 'b'},
+    ]
+    content, filename = export.export_to_bytes([records[:2], records[2:]], export.FORMAT_PARQUET)
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        archive.extractall(tmp_path)
+        names = sorted(archive.namelist())
+
+    assert filename == "validacoes_parquet.zip"
+    assert names == [
+        'validacoes/sistema=chile/ano=2025/usuario=ana/part-0.parquet',
+        'validacoes/sistema=chile/ano=2025/usuario=bia/part-0.parquet',
+        'validacoes/sistema=peru/ano=2024/usuario=Jo%C3%A3o%20Silva/part-0.parquet',
+    ]
+    # Um row group por bloco; as colunas de partição ficam só no caminho
+    ana = pq.ParquetFile(tmp_path / names[0])
+    assert ana.metadata.num_row_groups == 2
+    assert ana.read().to_pydict() == {'numero_questao': ['1', '2'], 'comentario': ['a', None]}
+    dataset = pq.read_table(tmp_path / "validacoes", partitioning='hive')
+    assert dataset.num_rows == 4
+
+
+# --- Migração da versão original (user-017) ----------------------------------
+
+def legacy_row(usuario, elemento, status='Aprovar', novo_item='False', texto_novo_item=''):
+    """Linha como gravada por app.py (append_row, sem cabeçalho)"""
+    return ['2024-05-01 10:00:00', usuario, 'chile', '2025', 'Dimensão', 'Subdimensão', 'Questão',
+            str(elemento), '1', 'tipo', f'Texto {elemento}', status, 'obs', novo_item, texto_novo_item]
+
+
+def run_migration(tmp_path, legacy_rows, target_rows=(), dry_run=False):
+    legacy = FakeWorksheet(migrate_legacy.LEGACY_WORKSHEET, legacy_rows)
+    target = FakeWorksheet(migrate_legacy.TARGET_WORKSHEET, list(target_rows))
+    migration = migrate_legacy.LegacyMigration(
+        legacy, target, checkpoint_path=tmp_path / "checkpoint.json", batch_size=2, chunk_rows=2, dry_run=dry_run
+    )
+    return migration.run(), target
+
+
+def test_migration_reads_headerless_legacy_rows_by_position(tmp_path):
+    report, target = run_migration(tmp_path, [legacy_row('ana', 1), legacy_row('bia', 2)], dry_run=True)
+
+    assert (report['read'], report['invalid'], report['written']) == (2, 0, 2)
+    assert report['by_user'] == {'ana': 1, 'bia': 1}
+    assert len(target) == 0
+
+
+def test_migration_skips_a_real_header_row(tmp_path):
+    rows = [list(migrate_legacy.LEGACY_COLUMNS), legacy_row('ana', 1), legacy_row('ana', 2), legacy_row('bia', 1)]
+    report, target = run_migration(tmp_path, rows)
+
+    assert (report['read'], report['written']) == (3, 3)
+    records = target.get_all_records()
+    assert [(r['usuario'], r['numero_questao']) for r in records] == [('ana', 1), ('ana', 2), ('bia', 1)]
+    # O checkpoint aponta para depois da última faixa lida: retomar não relê nada
+    assert json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))['next_row'] > len(rows)
+
+
+def test_migration_skips_existing_and_repeated_keys(tmp_path):
+    headers = list(migrate_legacy.CURRENT_COLUMNS) + [RECORD_ID_COLUMN]
+    existing = dict.fromkeys(headers, '')
+    existing.update(usuario='ana', sistema='chile', ano='2025', numero_questao='1')
+    rows = [legacy_row('ana', 1), legacy_row('bia', 2), legacy_row('bia', 2, status='Reprovar')]
+    report, target = run_migration(tmp_path, rows, [headers, [existing[h] for h in headers]])
+
+    assert (report['written'], report['existing'], report['duplicates']) == (1, 1, 1)
+    assert len(target) == 3
+
+
+def test_map_legacy_record():
+    record = dict(zip(migrate_legacy.LEGACY_COLUMNS,
+                      legacy_row('ana', 7, status='Sugerir Redação', novo_item='True', texto_novo_item='Outro')))
+    mapped = migrate_legacy.map_legacy_record(record)
+
+    assert mapped['numero_questao'] == '7'
+    assert mapped['dimensao'] == 'Dimensão'
+    assert mapped['capacidade_chave'] == 'Subdimensão'
+    assert mapped['adequacao_realidade_brasileira'] == 'Em partes'
+    assert mapped['justificativa_adequacao'] == "Status na versão original: Sugerir Redação"
+    assert mapped['comentario'] == "obs\nNovo item sugerido: Outro"
+    assert mapped[RECORD_ID_COLUMN] == migrate_legacy.map_legacy_record(record)[RECORD_ID_COLUMN]
+
+
+# --- Fila de itens por avaliador (user-019) ---------------------------------
+
+def test_work_queue_update_keeps_the_skip_order():
+    work_queue = WorkQueue([1, 2, 3, 4], 'selecao', 0, lambda item_id: item_id)
+    work_queue.skip()
+    work_queue.skip()
+
+    work_queue.update([2, 3, 4, 5], 1)
+    assert [work_queue.current()] + [work_queue.item(i) for i in (4, 2, 5)] == [3, 4, 2, 5]
+    assert len(work_queue) == 4 and work_queue.is_current('selecao', 1)
+
+
+# --- ReviewScheduler (user-024) ---------------------------------------------
+
+def test_assign_prefers_items_with_fewest_reviews():
+    items = catalog_items(4)
+    reviews = [review('x', 1), review('y', 1), review('x', 2), review('x', 4)]
+    scheduler, _, _ = make_scheduler(items, reviews)
+
+    assert scheduler.assign('ana', 'todos', items.index) == 2
+    assert scheduler.count(0) == 2
+
+
+def test_assign_skips_items_already_reviewed_by_the_evaluator():
+    items = catalog_items(2)
+    scheduler, _, _ = make_scheduler(items, [review('ana', 1)])
+
+    assert scheduler.assign('ana', 'todos', items.index) == 1
+    scheduler.release('ana')
+    scheduler, _, _ = make_scheduler(items, [review('ana', 1), review('ana', 2)])
+    assert scheduler.assign('ana', 'todos', items.index) is None
+
+
+def test_assign_keeps_the_held_item_and_avoids_items_leased_to_others():
+    items = catalog_items(3)
+    scheduler, _, _ = make_scheduler(items)
+
+    assert scheduler.assign('ana', 'todos', items.index) == 0
+    # Enquanto a reserva vale, o avaliador recebe o mesmo item
+    assert scheduler.assign('ana', 'todos', items.index) == 0
+    assert scheduler.assign('bia', 'todos', items.index) == 1
+    assert scheduler.status()['leases'] == 2
+
+
+def test_leased_item_is_the_fallback_when_nothing_else_is_pending():
+    items = catalog_items(1)
+    scheduler, _, _ = make_scheduler(items)
+
+    assert scheduler.assign('ana', 'todos', items.index) == 0
+    assert scheduler.assign('bia', 'todos', items.index) == 0
+
+
+def test_release_and_lease_expiry_free_the_item():
+    items = catalog_items(2)
+    scheduler, _, clock = make_scheduler(items, lease_seconds=60)
+
+    assert scheduler.assign('ana', 'todos', items.index) == 0
+    scheduler.release('ana')
+    assert scheduler.assign('bia', 'todos', items.index) == 0
+
+    clock.now += 61
+    assert scheduler.assign('cris', 'todos', items.index) == 0
+
+
+def test_sync_drops_stale_heap_entries():
+    items = catalog_items(3)
+    scheduler, review_counts, _ = make_scheduler(items)
+    assert scheduler.assign('ana', 'todos', items.index) == 0
+    scheduler.release('ana')
+
+    # O item 0 ganha avaliações: a entrada antiga (0 avaliações) do heap não vale mais
+    review_counts.add(review('x', 1))
+    review_counts.add(review('y', 1))
+    scheduler.sync(review_counts)
+    assert scheduler.count(0) == 2
+    assert scheduler.assign('bia', 'todos', items.index) == 1
+    scheduler.release('bia')
+
+    # Quando os demais alcançam a meta, a entrada atualizada do item 0 volta a ser a primeira
+    for usuario in ('x', 'y', 'z'):
+        review_counts.add(review(usuario, 2))
+        review_counts.add(review(usuario, 3))
+    scheduler.sync(review_counts)
+    assert scheduler.assign('cris', 'todos', items.index) == 0
+    assert scheduler.covered(items.index) == 2
+
+
+# --- Concordância entre avaliadores (user-025) -------------------------------
+
+@pytest.mark.parametrize('scale', ['relevancia', 'adequacao'])
+def test_agreement_is_perfect_when_evaluators_agree(scale):
+    rows = []
+    for numero, (relevancia, adequacao) in enumerate([('1', 'Não'), ('3', 'Em partes'), ('5', 'Sim')], start=1):
+        for usuario in ('ana', 'bia'):
+            rows.append(dict(review(usuario, numero), dimensao='D', capacidade_chave='C',
+                             grau_relevancia=relevancia, adequacao_realidade_brasileira=adequacao))
+    summary = AgreementAnalytics(pd.DataFrame(rows)).summary(scale)
+
+    assert summary['itens_pareaveis'] == 3
+    assert np.isclose(summary['alpha'], 1.0)
@@ -0,0 +1,241 @@
+import threading
+import time
+
+import pandas as pd
+
+from agreement import AgreementAnalytics
+from aggregations import ValidationAggregates
+from assignment import ReviewCounts
+from local_log import RECORD_ID_COLUMN
+
+# Intervalo (segundos) entre atualizações do snapshot a partir do backend
+DEFAULT_REFRESH_INTERVAL = 30
+
+# Sem leituras por este tempo (segundos), a thread deixa de consultar o backend
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+def _positions_by_user(snapshot):
+    """Posições das linhas do snapshot agrupadas por usuário"""
+    if 'usuario' not in snapshot.columns:
+        return {}
+    return snapshot.groupby('usuario', sort=False).indices
+
+
+class SharedValidationsCache:
+    """Snapshot versionado das avaliações, compartilhado por todas as sessões do processo
+
+    As leituras não acessam o backend: devolvem o snapshot atual, que deve ser
+    tratado como somente leitura. Gravações feitas por este processo entram no
+    snapshot na hora (write-through, via add); mudanças feitas fora do processo
+    chegam por uma única thread de atualização, a cada ``refresh_interval``.
+    """
+
+    def __init__(self, backend, refresh_interval=DEFAULT_REFRESH_INTERVAL, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.backend = backend
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._base = None
+        self._base_ids = None
+        self._written = []
+        self._snapshot = None
+        self._user_positions = None
+        self._user_views = {}
+        self._aggregates = None
+        self._review_counts = None
+        self._agreement = None
+        self._last_access = time.monotonic()
+        self.version = 0
+        self.refreshes = 0
+        self.last_refresh_at = None
+        self.last_error = None
+
+    # --- Leitura -----------------------------------------------------------
+
+    def snapshot(self):
+        """DataFrame com todas as avaliações (carregado na primeira chamada)"""
+        return self._versioned_snapshot()[0]
+
+    def _versioned_snapshot(self):
+        """(snapshot, versão) lidos juntos, sob a mesma trava"""
+        with self._lock:
+            loaded = self._base is not None
+            self._last_access = time.monotonic()
+            # Depois de um período ocioso o snapshot pode estar antigo: atualizar já
+            stale = self.last_refresh_at is not None and time.time() - self.last_refresh_at > 2 * self.refresh_interval
+        if not loaded:
+            self.refresh()
+        self._ensure_refresher()
+        if stale:
+            self._wakeup.set()
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._materialize()
+            return self._snapshot, self.version
+
+    def user_view(self, usuario):
+        """Avaliações do usuário: projeção do snapshot, calculada uma vez por versão"""
+        snapshot, version = self._versioned_snapshot()
+        with self._lock:
+            current = self.version == version
+            if current:
+                view = self._user_views.get(usuario)
+                if view is not None:
+                    return view
+                if self._user_positions is None:
+                    self._user_positions = _positions_by_user(snapshot)
+                positions = self._user_positions
+        if not current:
+            # Houve gravação depois da leitura do snapshot: projeção sem cache
+            positions = _positions_by_user(snapshot)
+        rows = positions.get(usuario)
+        view = snapshot.iloc[rows] if rows is not None else snapshot.iloc[0:0]
+        if current:
+            with self._lock:
+                if self.version == version:
+                    self._user_views[usuario] = view
+        return view
+
+    def aggregates(self):
+        """Contadores do resumo (ValidationAggregates) do snapshot, atualizados a cada gravação"""
+        return self._derived('_aggregates', ValidationAggregates)
+
+    def review_counts(self):
+        """Avaliadores distintos por item (ReviewCounts) do snapshot, atualizados a cada gravação"""
+        return self._derived('_review_counts', ReviewCounts)
+
+    def agreement(self):
+        """Concordância entre avaliadores (AgreementAnalytics) do snapshot, atualizada a cada gravação"""
+        return self._derived('_agreement', AgreementAnalytics)
+
+    def _derived(self, attribute, build):
+        """Objeto derivado do snapshot, calculado uma vez e depois mantido por add()"""
+        snapshot, version = self._versioned_snapshot()
+        with self._lock:
+            cached = getattr(self, attribute)
+            if cached is not None:
+                return cached
+        derived = build(snapshot)
+        with self._lock:
+            # Só entra no cache se nenhuma gravação chegou depois da leitura do snapshot:
+            # add() atualiza apenas objetos já em cache, e este não teria o registro novo
+            if getattr(self, attribute) is None and self.version == version:
+                setattr(self, attribute, derived)
+        return derived
+
+    def _materialize(self):
+        if not self._written:
+            return self._base
+        written = pd.DataFrame(self._written)
+        if self._base.empty:
+            return written
+        return pd.concat([self._base, written], ignore_index=True, sort=False)
+
+    def _invalidate_views(self):
+        self._snapshot = None
+        self._user_positions = None
+        self._user_views = {}
+
+    def _reset_derived(self):
+        self._aggregates = None
+        self._review_counts = None
+        self._agreement = None
+
+    def _in_base(self, record_id):
+        if self._base is None or not record_id or RECORD_ID_COLUMN not in self._base.columns:
+            return False
+        if self._base_ids is None:
+            self._base_ids = set(self._base[RECORD_ID_COLUMN].astype(str))
+        return str(record_id) in self._base_ids
+
+    # --- Escrita -----------------------------------------------------------
+
+    def add(self, record):
+        """Write-through: inclui no snapshot uma avaliação recém-gravada no backend
+
+        Se a atualização em segundo plano já trouxe o registro (entre a gravação no
+        backend e esta chamada), ele não é incluído de novo.
+        """
+        with self._lock:
+            if self._in_base(record.get(RECORD_ID_COLUMN)):
+                return
+            self._written.append(dict(record))
+            self.version += 1
+            self._invalidate_views()
+            # Os contadores são atualizados incrementalmente, sem recalcular
+            if self._aggregates is not None:
+                self._aggregates.add(record)
+            if self._review_counts is not None:
+                self._review_counts.add(record)
+            if self._agreement is not None:
+                self._agreement.add(record)
+
+    # --- Atualização -------------------------------------------------------
+
+    def refresh(self):
+        """Recarrega o snapshot do backend; retorna True se o conteúdo mudou"""
+        with self._refresh_lock:
+            df = self.backend.load_all()
+            if df is None:
+                df = pd.DataFrame()
+            with self._lock:
+                changed = self._base is None or not df.equals(self._base)
+                # Gravações deste processo que o backend já devolve saem da lista de write-through
+                if self._written and RECORD_ID_COLUMN in df.columns:
+                    remote_ids = set(df[RECORD_ID_COLUMN].astype(str))
+                    written = [r for r in self._written if str(r.get(RECORD_ID_COLUMN)) not in remote_ids]
+                    if len(written) != len(self._written):
+                        self._written = written
+                        self._invalidate_views()
+                        # Os contadores incluíam os registros removidos: recalcular a partir do snapshot
+                        self._reset_derived()
+                if changed:
+                    self._base = df
+                    self._base_ids = None
+                    self.version += 1
+                    self._invalidate_views()
+                    self._reset_derived()
+                self.refreshes += 1
+                self.last_refresh_at = time.time()
+                self.last_error = None
+            return changed
+
+    def request_refresh(self):
+        """Pede uma atualização imediata à thread em segundo plano"""
+        self._ensure_refresher()
+        self._wakeup.set()
+
+    def _ensure_refresher(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="validations-cache-refresh", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            with self._lock:
+                idle = time.monotonic() - self._last_access > self.idle_timeout
+            if idle:
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = str(e)
+
+    def status(self):
+        """Informações de diagnóstico para a barra lateral"""
+        with self._lock:
+            return {
+                'version': self.version,
+                'records': (len(self._base) if self._base is not None else 0) + len(self._written),
+                'refreshes': self.refreshes,
+                'last_refresh_at': self.last_refresh_at,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,83 @@
+from collections import deque
+
+# Itens seguintes preparados (dados de exibição extraídos) enquanto o atual é avaliado
+DEFAULT_PREFETCH = 1
+
+
+class WorkQueue:
+    """Fila de itens pendentes de um avaliador, mantida na sessão
+
+    Calculada uma vez por seleção (campanha, filtros, avaliador); quando a versão
+    do snapshot de avaliações muda, os pendentes são recalculados com update(),
+    que preserva a ordem atual. Salvar retira o item atual da fila e pular o
+    manda para o fim, sem recalcular os pendentes. ``load_item`` extrai os dados de
+    exibição de um item; o resultado fica guardado para o atual e os próximos
+    ``prefetch`` itens, de modo que avançar não precisa ler o catálogo.
+    """
+
+    def __init__(self, item_ids, key, version, load_item, prefetch=DEFAULT_PREFETCH):
+        self.key = key
+        self.version = version
+        self.prefetch_depth = prefetch
+        self._load_item = load_item
+        self._ids = deque(item_ids)
+        self._prepared = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def is_current(self, key, version):
+        """True se a fila ainda vale para esta seleção e versão das avaliações"""
+        return self.key == key and self.version == version
+
+    def current(self):
+        """ID do item atual (None se a fila estiver vazia)"""
+        return self._ids[0] if self._ids else None
+
+    def item(self, item_id):
+        """Dados de exibição do item (extraídos uma única vez)"""
+        prepared = self._prepared.get(item_id)
+        if prepared is None:
+            prepared = self._prepared[item_id] = self._load_item(item_id)
+        return prepared
+
+    def current_item(self):
+        """Dados de exibição do item atual (None se a fila estiver vazia)"""
+        item_id = self.current()
+        return None if item_id is None else self.item(item_id)
+
+    def prefetch(self):
+        """Prepara os próximos itens da fila antes de o avaliador avançar"""
+        for position in range(1, min(self.prefetch_depth + 1, len(self._ids))):
+            self.item(self._ids[position])
+
+    def skip(self):
+        """Pula o item atual, que volta no fim da fila"""
+        if self._ids:
+            item_id = self._ids[0]
+            self._ids.rotate(-1)
+            # Só o início da fila fica preparado; o item pulado é extraído de novo quando voltar
+            if len(self._ids) > self.prefetch_depth + 1:
+                self._prepared.pop(item_id, None)
+
+    def pop(self, version=None):
+        """Retira o item atual (avaliado); ``version`` é a versão do snapshot que já inclui a avaliação"""
+        if self._ids:
+            self._prepared.pop(self._ids.popleft(), None)
+        if version is not None:
+            self.version = version
+
+    def update(self, item_ids, version):
+        """Substitui os pendentes pelos de uma nova versão do snapshot, mantendo a ordem da fila
+
+        Gravações de outros avaliadores (ou a atualização em segundo plano) mudam a
+        versão sem que a seleção mude: os itens que deixaram de estar pendentes
+        saem, os novos entram no fim e os pulados continuam onde estavam.
+        """
+        pending = dict.fromkeys(item_ids)
+        ids = [item_id for item_id in self._ids if item_id in pending]
+        queued = set(ids)
+        ids.extend(item_id for item_id in pending if item_id not in queued)
+        self._ids = deque(ids)
+        self._prepared = {item_id: item for item_id, item in self._prepared.items() if item_id in pending}
+        self.version = version